@@ -1,24 +1,43 @@
 #!/usr/bin/env python3
 # -*- coding: UTF-8 -*-
+"""
+Prints a Big5 (or other encoded) file as UTF-8:
+
+    python ReadFile.py <filename> [encoding]
+
+The file is streamed through transcode.py in chunks, so memory stays constant;
+Big5 is decoded as CP950, then Big5-HKSCS, and bytes neither can decode are
+printed as U+FFFD and reported with their byte offsets on stderr.
+"""
 import sys
 
+from transcode import Transcoder, encoding_chain, iter_text
+
 def read_file(name, encoding='Big5'):
     try:
-        with open(name, 'r', encoding=encoding) as file:
-            content = file.read()
-            print(content)
+        transcoder = Transcoder(encoding_chain(encoding))
+        with open(name, 'rb') as file:
+            for text in iter_text(file, transcoder):
+                sys.stdout.write(text)
+        # Ends like print(content) did
+        sys.stdout.write("\n")
+        transcoder.report(name, sys.stderr)
     except FileNotFoundError:
         print(f"File '{name}' not found.")
-    except UnicodeDecodeError:
-        print(f"Cannot decode file '{name}' with encoding '{encoding}'.")
+    except LookupError:
+        print(f"Unknown encoding '{encoding}'.")
 
-if __name__ == "__main__":
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
     # Check if at least one argument (filename) is provided
-    if len(sys.argv) < 2:
+    if len(args) < 1:
         print("Usage: ReadFile.py <filename> [encoding]")
     else:
-        filename = sys.argv[1]
-        encoding = sys.argv[2] if len(sys.argv) > 2 else 'Big5'
+        filename = args[0]
+        encoding = args[1] if len(args) > 1 else 'Big5'
         sys.stdin.reconfigure(encoding='utf-8')
         sys.stdout.reconfigure(encoding='utf-8')
-        read_file(filename, encoding)
\ No newline at end of file
+        read_file(filename, encoding)
+
+if __name__ == "__main__":
+    main()
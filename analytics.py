@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Aggregate tables of the valid IPO filings
+(TWSE_TPEX-IPO-utf8-filter-sort-no-duplicate.csv), kept up to date by the
+pipeline and written next to the badge JSONs:
+
+    TWSE_TPEX-durations.csv     average days 申請 -> 審議 -> 董事會 -> 上櫃買賣, per filing year
+    TWSE_TPEX-underwriters.csv  filings, listings, success rate and capital per 主辦承銷商
+    TWSE_TPEX-monthly.csv       filings and listings per filing month
+    TWSE_TPEX-price.csv         承銷價 distribution
+    TWSE_TPEX-analytics.json    the aggregates the tables are made from
+
+Every aggregate is a sum (counts, days, capital, prices in cents), so a run
+only subtracts the contribution of the rows that changed or disappeared
+since the previous run and adds that of the new and changed rows; all other
+history is not looked at again. The contributions of a batch of rows are
+computed column-wise with numpy date arithmetic and pandas groupby. If the
+previous table no longer matches the one the aggregates were made from, or
+the aggregation itself changed (buckets, views, underwriter names; see
+schema_hash), they are rebuilt from the whole table.
+
+    python analytics.py [--workdir .] [--previous OLD.csv]
+"""
+import argparse
+import csv
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+from delta_log import index_records, read_table
+from metrics import TAIWAN
+
+SOURCE = "TWSE_TPEX-IPO-utf8-filter-sort-no-duplicate.csv"
+STATE_FILE = "TWSE_TPEX-analytics.json"
+
+DURATIONS_FILE = "TWSE_TPEX-durations.csv"
+UNDERWRITERS_FILE = "TWSE_TPEX-underwriters.csv"
+MONTHLY_FILE = "TWSE_TPEX-monthly.csv"
+PRICE_FILE = "TWSE_TPEX-price.csv"
+EXPORTS = [DURATIONS_FILE, UNDERWRITERS_FILE, MONTHLY_FILE, PRICE_FILE]
+
+FILED = "申請日期"
+LISTED = "股票上櫃買賣日期"
+UNDERWRITER = "主辦承銷商"
+CAPITAL = "申請時股本(仟元)"
+PRICE = "承銷價"
+
+# (label, from column, to column)
+DURATIONS = [
+    ("申請→審議", FILED, "上櫃審議委員會審議日期"),
+    ("審議→董事會", "上櫃審議委員會審議日期", "櫃買董事會通過上櫃日期"),
+    ("董事會→上櫃買賣", "櫃買董事會通過上櫃日期", LISTED),
+    ("申請→上櫃買賣", FILED, LISTED),
+]
+
+# Lower bounds of the 承銷價 buckets
+PRICE_BUCKETS = [0, 20, 40, 60, 100, 200, 500]
+
+# The sums kept per group of every view; the first one is the row count
+VIEWS = {
+    "durations": ["filings", "days"],
+    "underwriters": ["filings", "listed", "capital"],
+    "monthly": ["filings", "listed"],
+    "price": ["filings", "cents"],
+}
+
+
+# Removed from 主辦承銷商, so 元大證券, 元大 and 元大(原...) are the same underwriter
+UNDERWRITER_PATTERNS = [r'[(（].*?[)）]', r'(綜合證券|證券|綜合)$']
+
+# The number in a 承銷價 cell
+PRICE_PATTERN = r'(\d+(?:\.\d+)?)'
+
+
+def schema_hash():
+    """
+    Hash of everything that decides which group a row adds what to. Stored
+    aggregates made with another schema are rebuilt instead of updated, so
+    groups of the old definitions do not linger next to the new ones.
+    """
+    definitions = json.dumps([DURATIONS, PRICE_BUCKETS, VIEWS, UNDERWRITER_PATTERNS, PRICE_PATTERN,
+                              FILED, LISTED, UNDERWRITER, CAPITAL, PRICE], ensure_ascii=False)
+    code = inspect.getsource(contributions) + inspect.getsource(price_bucket)
+    return hashlib.sha256((definitions + code).encode('utf-8')).hexdigest()[:16]
+
+
+def price_bucket(index):
+    low = PRICE_BUCKETS[index]
+    return f"{low}-{PRICE_BUCKETS[index + 1]}" if index + 1 < len(PRICE_BUCKETS) else f"{low}+"
+
+
+def table_digest(records):
+    """Digest of a table indexed by delta_log.index_records, independent of the row order."""
+    digest = hashlib.sha256()
+    for key in sorted(records):
+        digest.update(f"{key}\t{records[key][0]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def grouped_sums(frame, keys, columns):
+    """{key: [sum of every column]} of a DataFrame grouped by keys (a column name or a list of them)."""
+    sums = frame.groupby(keys, sort=False)[columns].sum()
+    result = {}
+    for key, values in zip(sums.index.tolist(), sums.to_numpy().tolist()):
+        key = "|".join(str(part) for part in key) if isinstance(key, tuple) else str(key)
+        result[key] = [int(value) for value in values]
+    return result
+
+
+def contributions(header, rows):
+    """
+    Computes what a batch of rows adds to every view.
+
+    Args:
+        header (list): The column names
+        rows (list): The rows (lists of strings)
+
+    Returns:
+        dict: view -> {group key: [sums in the order of VIEWS[view]]}
+    """
+    import numpy as np
+    import pandas as pd
+    from snapshot import parse_dates
+
+    if not rows:
+        return {view: {} for view in VIEWS}
+    width = len(header)
+    frame = pd.DataFrame([row[:width] + [""] * (width - len(row)) for row in rows], columns=header)
+    dates = {column: parse_dates(frame[column].str.strip().tolist())
+             for column in {FILED, LISTED} | {column for _, start, end in DURATIONS for column in (start, end)}}
+    filed = dates[FILED]
+    year = np.where(np.isnat(filed), -1, filed.astype('datetime64[Y]').astype(np.int64) + 1970)
+    listed = (~np.isnat(dates[LISTED])).astype(np.int64)
+    ones = np.ones(len(frame), dtype=np.int64)
+
+    parts = []
+    for label, start, end in DURATIONS:
+        days = dates[end] - dates[start]
+        valid = ~np.isnat(days) & (year >= 0)
+        parts.append(pd.DataFrame({"year": year[valid], "stage": label, "filings": ones[valid],
+                                   "days": days[valid].astype(np.int64)}))
+    durations = pd.concat(parts, ignore_index=True)
+
+    underwriter = frame[UNDERWRITER].str.strip()
+    for pattern in UNDERWRITER_PATTERNS:
+        underwriter = underwriter.str.replace(pattern, '', regex=True)
+    capital = pd.to_numeric(frame[CAPITAL].str.replace(',', ''), errors='coerce').fillna(0).round().astype(np.int64)
+    underwriters = pd.DataFrame({"underwriter": underwriter, "filings": ones, "listed": listed, "capital": capital})
+
+    month = np.datetime_as_string(filed.astype('datetime64[M]'))
+    monthly = pd.DataFrame({"month": month, "filings": ones, "listed": listed})[~np.isnat(filed)]
+
+    price = pd.to_numeric(frame[PRICE].str.extract(PRICE_PATTERN, expand=False), errors='coerce').to_numpy()
+    valid = ~np.isnan(price)
+    bucket = np.searchsorted(PRICE_BUCKETS, price[valid], side='right') - 1
+    prices = pd.DataFrame({"bucket": [price_bucket(i) for i in bucket.tolist()], "filings": ones[valid],
+                           "cents": np.round(price[valid] * 100).astype(np.int64)})
+
+    return {
+        "durations": grouped_sums(durations, ["year", "stage"], VIEWS["durations"]),
+        "underwriters": grouped_sums(underwriters, "underwriter", VIEWS["underwriters"]),
+        "monthly": grouped_sums(monthly, "month", VIEWS["monthly"]),
+        "price": grouped_sums(prices, "bucket", VIEWS["price"]),
+    }
+
+
+def apply(views, delta, sign=1):
+    """Adds (sign=1) or subtracts (sign=-1) contributions; groups left without rows are dropped."""
+    for view, groups in delta.items():
+        target = views.setdefault(view, {})
+        for key, values in groups.items():
+            current = [a + sign * b for a, b in zip(target.get(key, [0] * len(values)), values)]
+            if current[0]:
+                target[key] = current
+            else:
+                target.pop(key, None)
+    return views
+
+
+def update_views(previous, current, state=None):
+    """
+    Brings the aggregates from the previous version of the table to the current one.
+
+    Args:
+        previous (list): The table (header first) the aggregates in state were made from, or None
+        current (list): The table as written by this run
+        state (dict, optional): The content of STATE_FILE
+
+    Returns:
+        dict: The new state
+    """
+    records = index_records(current)
+    old = index_records(previous) if previous else None
+    schema = schema_hash()
+    if (state and old is not None and previous[0] == current[0] and state.get("digest") == table_digest(old)
+            and state.get("schema") == schema):
+        removed = [row for key, (digest, row) in old.items() if key not in records or records[key][0] != digest]
+        added = [row for key, (digest, row) in records.items() if key not in old or old[key][0] != digest]
+        views = {view: dict(groups) for view, groups in state["views"].items()}
+        views = apply(apply(views, contributions(current[0], removed), -1), contributions(current[0], added))
+        print(f"Analytics: {len(removed)} old rows subtracted, {len(added)} new rows added, "
+              f"{len(records) - len(added)} unchanged rows not aggregated again")
+    else:
+        if state and state.get("schema") != schema:
+            print("Analytics: the aggregation changed since the stored aggregates were made")
+        views = contributions(current[0], [row for _, row in records.values()])
+        print(f"Analytics: rebuilt from {len(records)} rows")
+    views = {view: dict(sorted(groups.items())) for view, groups in views.items()}
+    unchanged = state and state.get("views") == views and state.get("updated")
+    return {"source": SOURCE, "schema": schema, "digest": table_digest(records), "rows": len(records),
+            "updated": state["updated"] if unchanged else datetime.now(TAIWAN).strftime('%Y-%m-%d'),
+            "views": views}
+
+
+def average(total, count, digits=1):
+    return round(total / count, digits) if count else ""
+
+
+def export_rows(views):
+    """The exported tables, as {file name: rows (header first)}."""
+    durations = [["申請年度", "階段", "件數", "平均天數"]]
+    overall = {}
+    for key, (filings, days) in views["durations"].items():
+        year, stage = key.split("|")
+        overall.setdefault(stage, [0, 0])
+        overall[stage] = [overall[stage][0] + filings, overall[stage][1] + days]
+    labels = [label for label, _, _ in DURATIONS]
+    for stage in labels:
+        if stage in overall:
+            durations.append(["全部", stage, overall[stage][0], average(overall[stage][1], overall[stage][0])])
+    years = sorted({key.split("|")[0] for key in views["durations"]}, reverse=True)
+    for year in years:
+        for stage in labels:
+            if f"{year}|{stage}" in views["durations"]:
+                filings, days = views["durations"][f"{year}|{stage}"]
+                durations.append([year, stage, filings, average(days, filings)])
+
+    underwriters = [["主辦承銷商", "件數", "已上櫃", "成功率", "申請時股本合計(仟元)"]]
+    for name, (filings, listed, capital) in sorted(views["underwriters"].items(), key=lambda item: (-item[1][0], item[0])):
+        underwriters.append([name, filings, listed, average(listed, filings, 3), capital])
+
+    monthly = [["申請月份", "件數", "已上櫃"]]
+    for month, (filings, listed) in sorted(views["monthly"].items(), reverse=True):
+        monthly.append([month, filings, listed])
+
+    price = [["承銷價區間", "件數", "平均承銷價"]]
+    for i in range(len(PRICE_BUCKETS)):
+        filings, cents = views["price"].get(price_bucket(i), [0, 0])
+        price.append([price_bucket(i), filings, average(cents / 100, filings, 2)])
+
+    return {DURATIONS_FILE: durations, UNDERWRITERS_FILE: underwriters, MONTHLY_FILE: monthly, PRICE_FILE: price}
+
+
+def load_state(workdir="."):
+    try:
+        with open(os.path.join(workdir, STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"Ignoring unreadable {STATE_FILE}: {e}")
+        return None
+
+
+def write_views(state, workdir="."):
+    for name, rows in export_rows(state["views"]).items():
+        path = os.path.join(workdir, name)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f, lineterminator='\n').writerows(rows)
+        print(f"Wrote {path}")
+    path = os.path.join(workdir, STATE_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=4, ensure_ascii=False)
+    print(f"Wrote {path}")
+
+
+def update_tables(previous, current, workdir="."):
+    """Updates the aggregates in workdir from the previous to the current table and writes every export."""
+    state = update_views(previous, current, load_state(workdir))
+    write_views(state, workdir)
+    return state
+
+
+def update_files(current_path, baseline_path, workdir="."):
+    """
+    Like update_tables, for the table as written to current_path; a copy of
+    it is kept in baseline_path as the previous table of the next run.
+    """
+    update_tables(read_table(baseline_path), read_table(current_path), workdir)
+    os.makedirs(os.path.dirname(baseline_path) or ".", exist_ok=True)
+    shutil.copyfile(current_path, f"{baseline_path}.part")
+    os.replace(f"{baseline_path}.part", baseline_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Update the aggregate tables of the valid IPO filings.')
+    parser.add_argument('--workdir', default='.', help=f'Directory with {SOURCE} and {STATE_FILE}')
+    parser.add_argument('--previous', default=None,
+                        help='The table the stored aggregates were made from; without it they are rebuilt')
+    args = parser.parse_args(argv)
+    try:
+        current = read_table(os.path.join(args.workdir, SOURCE))
+        if current is None:
+            raise FileNotFoundError(f"{SOURCE} not found in {args.workdir}")
+        update_tables(read_table(args.previous) if args.previous else None, current, args.workdir)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import time
+from urllib.parse import urlparse
+
+import fetch_cache
+
+# GitHub URL for auction data
+GITHUB_AUCTION_URL = os.environ.get(
+    "AUCTION_CSV_URL",
+    "https://raw.githubusercontent.com/wenchiehlee/Selenium-Actions.Auction/refs/heads/main/auction-company.csv")
+
+# The cached CSV and its validators live here, shared by every invocation in the same directory
+CACHE_DIR = ".auction-cache"
+CACHE_NAME = "auction-company"
+
+# A cached copy younger than this is used without asking the server at all
+DEFAULT_TTL = 6 * 60 * 60
+
+
+def local_path(source):
+    """Returns the file path of a local-path or file:// source, or None for an HTTP(S) URL."""
+    parsed = urlparse(source)
+    if parsed.scheme == "file":
+        # urllib.request pulls in http.client, so it is only imported for file:// sources
+        from urllib.request import url2pathname
+
+        return url2pathname(parsed.path)
+    if parsed.scheme in ("http", "https"):
+        return None
+    return source
+
+
+def cache_paths(cache_dir=CACHE_DIR):
+    """Returns (CSV path, metadata path) of the cached auction data."""
+    return (os.path.join(cache_dir, f"{CACHE_NAME}.csv"),
+            os.path.join(cache_dir, f"{CACHE_NAME}.json"))
+
+
+def read_cached(cache_dir=CACHE_DIR):
+    """Returns (content, metadata) of the cached auction data; content is None if nothing is cached."""
+    csv_path, meta_path = cache_paths(cache_dir)
+    meta = fetch_cache.load_cache(meta_path)
+    try:
+        with open(csv_path, 'rb') as f:
+            return f.read(), meta
+    except FileNotFoundError:
+        return None, meta
+
+
+def load_auction_bytes(source=GITHUB_AUCTION_URL, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, timeout=30):
+    """
+    Returns the raw auction CSV, using the on-disk cache where possible.
+
+    - Local paths and file:// URLs are read directly and never cached.
+    - A cached copy younger than ttl seconds is returned without a request.
+    - Otherwise the cache is revalidated with If-None-Match/If-Modified-Since;
+      a 304 Not Modified answer keeps the cached bytes.
+    - If the request fails, a stale cached copy is returned instead (stale-if-error).
+
+    Args:
+        source (str): HTTP(S) URL, file:// URL or local path of auction-company.csv
+        cache_dir (str): Directory holding the cached copy and its validators
+        ttl (float): Seconds a cached copy is used without revalidation (0 always revalidates)
+        timeout (float): HTTP timeout in seconds
+
+    Returns:
+        bytes: The auction CSV content
+    """
+    path = local_path(source)
+    if path is not None:
+        print(f"Reading auction data from {path}")
+        with open(path, 'rb') as f:
+            return f.read()
+
+    csv_path, meta_path = cache_paths(cache_dir)
+    cached, meta = read_cached(cache_dir)
+    # A copy downloaded from another URL is neither served nor revalidated
+    entry = meta.get(CACHE_NAME, {}) if cached is not None and meta.get("url") == source else {}
+    if not entry:
+        cached = None
+    age = time.time() - entry.get("checked_at", 0)
+    if entry and age < ttl:
+        print(f"Using cached auction data from {csv_path} ({age / 60:.0f} minutes old)")
+        return cached
+
+    import requests
+    try:
+        print(f"Downloading auction data from {source}...")
+        response = requests.get(source, headers=fetch_cache.validators(entry), timeout=timeout)
+        if response.status_code == 304:
+            print(f"Auction data not modified, using {csv_path}")
+            content = cached
+        else:
+            response.raise_for_status()  # Raise exception for HTTP errors
+            content = response.content
+    except Exception as e:
+        if cached is None:
+            raise
+        print(f"Error downloading auction data: {e}")
+        print(f"Falling back to the stale cached copy in {csv_path}")
+        return cached
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if content is not cached:
+        fetch_cache.write_atomic(csv_path, content)
+        fetch_cache.update(meta, CACHE_NAME, content, response.headers)
+    meta["url"] = source
+    meta[CACHE_NAME]["checked_at"] = time.time()
+    fetch_cache.save_cache(meta, meta_path)
+    return content
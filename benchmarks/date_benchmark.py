@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Micro-benchmark of the date conversions in date_normalizer, per row before
+(one datetime/strftime or pandas format guess per value) and after
+(memoized / parsed once per distinct value).
+
+The dates are drawn from a pool of distinct filing dates, so values repeat
+like they do in the real listings.
+
+Usage: python benchmarks/date_benchmark.py [--rows 200000] [--distinct 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import date_normalizer
+import duplicate_remover
+
+
+def roc_dates(rows, distinct, seed=0):
+    """Returns rows ROC date strings drawn from `distinct` different dates."""
+    rng = np.random.default_rng(seed)
+    days = np.datetime64('1990-01-01') + rng.integers(0, 13000, size=distinct).astype('timedelta64[D]')
+    pool = [f"{d.year - 1911}/{d.month:02d}/{d.day:02d}" for d in pd.to_datetime(days)]
+    return [pool[i] for i in rng.integers(0, distinct, size=rows)]
+
+
+def per_row(label, func, values):
+    start = time.perf_counter()
+    result = func(values)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44} {elapsed * 1e9 / len(values):8.0f} ns/row")
+    return result
+
+
+def old_convert_dates(values):
+    """duplicate_remover.convert_dates before date_normalizer: pd.to_datetime on every value."""
+    return pd.to_datetime(values, format='%Y/%m/%d', errors='coerce', cache=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the date conversions before and after memoization.')
+    parser.add_argument('--rows', type=int, default=200000, help='Number of date values')
+    parser.add_argument('--distinct', type=int, default=5000, help='Number of distinct dates among them')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    values = roc_dates(args.rows, args.distinct, args.seed)
+    print(f"{args.rows} values, {args.distinct} distinct dates")
+
+    # TWSE-IPO.py: ROC -> YYYY/MM/DD
+    uncached = date_normalizer._roc_to_gregorian.__wrapped__
+    before = per_row("ROC -> Gregorian, datetime per value", lambda v: [uncached(x) for x in v], values)
+    date_normalizer._roc_to_gregorian.cache_clear()
+    after = per_row("ROC -> Gregorian, memoized", lambda v: [date_normalizer.roc_to_gregorian(x) for x in v], values)
+    assert before == after
+
+    # ConvertDateFormat.py: YYYYMMDD -> YYYY/MM/DD
+    compact = [x.replace('/', '') for x in before]
+    per_row("YYYYMMDD -> YYYY/MM/DD", lambda v: [date_normalizer.compact_to_slashed(x) for x in v], compact)
+
+    # duplicate_remover.py: YYYY/MM/DD column -> datetime64
+    column = pd.Series(before, name='申請日期')
+    parsed_before = per_row("column -> datetime64, every value", old_convert_dates, column)
+    parsed_after = per_row("column -> datetime64, once per distinct", date_normalizer.parse_column, column)
+    assert parsed_before.equals(parsed_after)
+
+    # datetime64 -> YYYY-MM-DD (dedupe state keys and printed reasoning)
+    per_row("datetime64 -> ISO, strftime per value", lambda v: [duplicate_remover.format_date(x) for x in v], parsed_after)
+    per_row("datetime64 -> ISO, vectorized", date_normalizer.iso_strings, parsed_after)
+
+
+if __name__ == "__main__":
+    main()
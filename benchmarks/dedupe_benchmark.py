@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Benchmarks duplicate_remover's batched decide_groups against the row-by-row
+decide_group on synthetic IPO and auction tables, and checks that both give
+the same verdicts and printed reasoning.
+
+Usage: python benchmarks/dedupe_benchmark.py [--rows 100000] [--reference-rows 100000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import duplicate_remover
+
+
+def synthetic_tables(rows, seed=0):
+    """Returns (df_ipo, df_auction) with about three applications per stock code."""
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(1000, 1000 + max(rows // 3, 1), size=rows)
+    start = np.datetime64('2000-01-01')
+    ipo_dates = start + rng.integers(0, 9000, size=rows).astype('timedelta64[D]')
+    df_ipo = pd.DataFrame({
+        '申請日期': pd.Series(ipo_dates).dt.strftime('%Y-%m-%d'),
+        '股票代號': codes,
+        '公司名稱': [f"公司{code}" for code in codes],
+    }).sort_values('申請日期', ascending=False, kind='stable').reset_index(drop=True)
+
+    # Auctions a few weeks to a few years after some of the applications
+    picked = rng.choice(rows, size=rows, replace=True)
+    auction_dates = ipo_dates[picked] + rng.integers(-120, 900, size=rows).astype('timedelta64[D]')
+    df_auction = pd.DataFrame({
+        '開標日期': pd.Series(auction_dates).dt.strftime('%Y/%m/%d'),
+        '股票代號': codes[picked],
+    })
+    return df_ipo, df_auction
+
+
+def prepare(rows, seed):
+    df_ipo, df_auction = synthetic_tables(rows, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        duplicate_remover.convert_dates(df_ipo, '申請日期')
+        duplicate_remover.convert_dates(df_auction, '開標日期')
+    duplicates = df_ipo[df_ipo.duplicated('股票代號', keep=False)].sort_values('股票代號')
+    return df_ipo, df_auction, duplicates
+
+
+def run_reference(df_ipo, df_auction, duplicates):
+    results = {}
+    auction_groups = dict(list(df_auction.groupby('股票代號')))
+    no_auction = df_auction.iloc[0:0]
+    for code, group in duplicates.groupby('股票代號'):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            verdicts = duplicate_remover.decide_group(df_ipo, group, auction_groups.get(code, no_auction))
+        results[code] = (verdicts, out.getvalue().splitlines())
+    return results
+
+
+def run_batched(df_ipo, df_auction, duplicates):
+    return duplicate_remover.decide_groups(df_ipo, duplicates, df_auction)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the batched duplicate resolution engine.')
+    parser.add_argument('--rows', type=int, default=100000, help='IPO and auction rows for the batched engine')
+    parser.add_argument('--reference-rows', type=int, default=100000,
+                        help='IPO and auction rows for the row-by-row reference (0 to skip)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    tables = prepare(args.rows, args.seed)
+    print(f"Synthetic data: {args.rows} IPO rows, {len(tables[2])} duplicate rows, {args.rows} auction rows")
+    batched, batched_time = timed(run_batched, *tables)
+    print(f"batched    decide_groups: {batched_time:8.2f}s ({len(batched)} groups)")
+
+    if args.reference_rows:
+        if args.reference_rows != args.rows:
+            tables = prepare(args.reference_rows, args.seed)
+            batched, batched_time = timed(run_batched, *tables)
+            print(f"batched    decide_groups: {batched_time:8.2f}s at {args.reference_rows} rows")
+        reference, reference_time = timed(run_reference, *tables)
+        print(f"row-by-row decide_group:  {reference_time:8.2f}s at {args.reference_rows} rows")
+        print(f"speedup: {reference_time / batched_time:.1f}x")
+
+        mismatches = [code for code in reference if reference[code] != batched.get(code)]
+        if mismatches:
+            print(f"MISMATCH in {len(mismatches)} groups, e.g. {mismatches[:5]}")
+            sys.exit(1)
+        print("Verdicts and printed reasoning are identical.")
+
+
+if __name__ == "__main__":
+    main()
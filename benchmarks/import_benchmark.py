@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Start-up cost of every `ipo.py` command, measured with `python -X importtime`
+on `ipo.py <command> --help`.
+
+For each command the import time of everything the interpreter does not
+import on its own (`python -c pass`) is summed and checked against a budget,
+and none of the heavy dependencies may be imported just to show the help.
+
+Usage: python benchmarks/import_benchmark.py [--budget-ms 60] [--repeat 5] [command ...]
+
+Exits with 1 if a command is over budget or imports a heavy dependency.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from ipo import COMMANDS
+
+# Only the subcommands that need them may import these, and never for --help
+HEAVY_MODULES = ["pandas", "numpy", "selenium", "chromedriver_autoinstaller", "chardet", "requests", "dateutil"]
+
+
+def import_times(args):
+    """
+    Runs python -X importtime with args.
+
+    Returns:
+        dict: top-level module -> cumulative import time in microseconds
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+    return times, result.stderr
+
+
+def command_cost(command, startup, repeat):
+    """Best-of-repeat import time (ms) of a command beyond the interpreter start-up, and the heavy modules it imported."""
+    best, heavy = None, []
+    for _ in range(repeat):
+        times, log = import_times([os.path.join(ROOT, "ipo.py"), command, "--help"])
+        cost = sum(us for name, us in times.items() if name not in startup) / 1000
+        best = cost if best is None else min(best, cost)
+        imported = {line.split("|")[-1].strip() for line in log.splitlines() if "|" in line}
+        heavy = [name for name in HEAVY_MODULES if name in imported]
+    return best, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the import time of every ipo.py command against a budget.')
+    parser.add_argument('commands', nargs='*', default=list(COMMANDS), help='Commands to check (default: all)')
+    parser.add_argument('--budget-ms', type=float, default=60.0, help='Import time budget per command in ms')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per command; the fastest counts')
+    args = parser.parse_args()
+
+    startup, _ = import_times(["-c", "pass"])
+    failures = []
+    print(f"{'command':<14} {'imports':>9}  heavy dependencies")
+    for command in args.commands:
+        cost, heavy = command_cost(command, startup, args.repeat)
+        print(f"{command:<14} {cost:>7.1f}ms  {', '.join(heavy) or '-'}")
+        if cost > args.budget_ms:
+            failures.append(f"{command}: {cost:.1f} ms of imports, budget {args.budget_ms:.0f} ms")
+        if heavy:
+            failures.append(f"{command}: imports {', '.join(heavy)} for --help")
+
+    if failures:
+        print("\nOVER BUDGET:")
+        for message in failures:
+            print(f"  {message}")
+        sys.exit(1)
+    print(f"\nEvery command is within {args.budget_ms:.0f} ms and imports no heavy dependency for --help.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Offline benchmark of every pipeline stage on the committed IPO lists, scaled
+up to larger synthetic tables, compared against a stored baseline.
+
+The fixtures are built from the files in the repository:
+
+- applylisting.csv (TWSE, Big5/CP950, ROC dates) and TPEX-IPO-utf8.csv are
+  repeated `scale` times; copy k shifts every stock code by k * 10000 and
+  suffixes the company name, so each copy has the same duplicate structure
+- the auction list is generated from TWSE_TPEX-IPO-utf8-sort.csv: about a
+  third of the stock codes get an auction 1-6 months after their newest
+  filing (fixed seed), repeated per copy like the IPO lists
+
+Each scale runs `pipeline.py` in its own process (so peak RSS is not carried
+over from a smaller run) with a run report, and the per stage timings are
+read from it. The best wall time of --repeat runs is kept.
+
+Usage: python benchmarks/pipeline_benchmark.py [--scales 1,10,100] [--repeat 3]
+       python benchmarks/pipeline_benchmark.py --scales 1000 --repeat 1
+       python benchmarks/pipeline_benchmark.py --update-baseline
+
+Exits with 1 if a stage is slower (or uses more memory) than the baseline by
+more than --tolerance. The baseline is only meaningful on the machine that
+recorded it; re-record it with --update-baseline after a deliberate change.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+TWSE_FIXTURE = "applylisting.csv"
+TPEX_FIXTURE = "TPEX-IPO-utf8.csv"
+MERGED_FIXTURE = "TWSE_TPEX-IPO-utf8-sort.csv"
+AUCTION_FILE = "auction.csv"
+
+# Copy k of a stock code is code + k * CODE_STEP
+CODE_STEP = 10000
+
+# Differences below this many seconds are noise, never a regression
+MIN_DELTA_S = 0.05
+
+
+def shift_code(code, copy):
+    code = code.strip()
+    if copy == 0 or not code.isdigit():
+        return code if copy == 0 else f"{code}-{copy}"
+    return str(int(code) + copy * CODE_STEP)
+
+
+def scaled_rows(rows, scale, code_column, name_column):
+    """Repeats data rows scale times with shifted stock codes and suffixed names."""
+    scaled = []
+    for copy in range(scale):
+        for row in rows:
+            row = list(row)
+            row[code_column] = shift_code(row[code_column], copy)
+            if copy:
+                row[name_column] = f"{row[name_column]}{copy}"
+            scaled.append(row)
+    return scaled
+
+
+def write_twse_fixture(path, scale):
+    """applylisting.csv: a title line, the header, then the data rows, Big5 (CP950) encoded."""
+    with open(os.path.join(ROOT, TWSE_FIXTURE), 'rb') as f:
+        rows = list(csv.reader(io.StringIO(f.read().decode('cp950'), newline='')))
+    head, body = rows[:2], [row for row in rows[2:] if len(row) >= 13]
+    buffer = io.StringIO(newline='')
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(head + scaled_rows(body, scale, 1, 2))
+    with open(path, 'wb') as f:
+        f.write(buffer.getvalue().encode('cp950'))
+    return len(body) * scale
+
+
+def write_tpex_fixture(path, scale):
+    with open(os.path.join(ROOT, TPEX_FIXTURE), 'r', encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    header, body = rows[0], [row for row in rows[1:] if row]
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n').writerows([header] + scaled_rows(body, scale, 1, 2))
+    return len(body) * scale
+
+
+def write_auction_fixture(path, scale, seed=0):
+    """Auction list in the layout of auction-company.csv for the stock codes of the merged table."""
+    merged = pd.read_csv(os.path.join(ROOT, MERGED_FIXTURE), dtype=str, keep_default_na=False)
+    filed = pd.to_datetime(merged['申請日期'], errors='coerce')
+    newest = filed.groupby(merged['股票代號']).max().dropna()
+    rng = np.random.default_rng(seed)
+    picked = newest[rng.random(len(newest)) < 1 / 3]
+    dates = picked + pd.to_timedelta(rng.integers(30, 180, size=len(picked)), unit='D')
+    rows = []
+    for copy in range(scale):
+        for code, date in dates.items():
+            rows.append([len(rows) + 1, date.strftime('%Y/%m/%d'), f"公司{code}", shift_code(code, copy), "上市"])
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(["序號", "開標日期", "證券名稱", "股票代號", "發行市場"])
+        writer.writerows(rows)
+    return len(rows)
+
+
+def build_fixtures(directory, scale):
+    os.makedirs(directory, exist_ok=True)
+    sizes = {
+        "twse": write_twse_fixture(os.path.join(directory, TWSE_FIXTURE), scale),
+        "tpex": write_tpex_fixture(os.path.join(directory, TPEX_FIXTURE), scale),
+        "auction": write_auction_fixture(os.path.join(directory, AUCTION_FILE), scale),
+    }
+    print(f"x{scale}: {sizes['twse']} TWSE rows, {sizes['tpex']} TPEX rows, {sizes['auction']} auctions")
+    return sizes
+
+
+def run_once(fixtures, run_dir):
+    """Runs the pipeline on a fresh copy of the fixtures; returns its stages from the run report."""
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    for name in (TWSE_FIXTURE, TPEX_FIXTURE):
+        shutil.copy(os.path.join(fixtures, name), run_dir)
+    report = os.path.join(run_dir, "run-report.json")
+    with open(os.path.join(run_dir, "pipeline.log"), 'w', encoding='utf-8') as log:
+        result = subprocess.run([sys.executable, os.path.join(ROOT, "pipeline.py"), "--workdir", run_dir,
+                                 "--auction-file", os.path.join(fixtures, AUCTION_FILE), "--report", report],
+                                stdout=log, stderr=subprocess.STDOUT, env=dict(os.environ, IPO_RUN_REPORT=""))
+    if result.returncode != 0:
+        raise RuntimeError(f"pipeline.py failed, see {log.name}")
+    with open(report, 'r', encoding='utf-8') as f:
+        return json.load(f)["runs"][-1]["stages"]
+
+
+def measure(fixtures, run_dir, repeat):
+    """
+    Runs the pipeline repeat times.
+
+    Returns:
+        dict: Per stage the best wall/CPU time, the highest peak RSS, the rows
+              processed and the throughput in rows/s
+    """
+    results = {}
+    for _ in range(repeat):
+        for stage in run_once(fixtures, run_dir):
+            rows = stage["rows_in"] if stage["rows_in"] is not None else stage["rows_out"] or 0
+            best = results.setdefault(stage["stage"], {"wall_s": float("inf"), "cpu_s": float("inf"),
+                                                       "peak_rss_mb": 0.0, "rows": rows})
+            best["wall_s"] = min(best["wall_s"], stage["wall_s"])
+            best["cpu_s"] = min(best["cpu_s"], stage["cpu_s"])
+            best["peak_rss_mb"] = max(best["peak_rss_mb"], stage["peak_rss_mb"] or 0.0)
+    for best in results.values():
+        best["rows_per_s"] = round(best["rows"] / best["wall_s"]) if best["wall_s"] > 0 else None
+    return results
+
+
+def compare(scale, results, baseline, tolerance):
+    """Prints the results next to the baseline; returns the regression messages."""
+    regressions = []
+    print(f"\n{'x' + str(scale):<6} {'stage':<10} {'rows':>9} {'wall':>8} {'rows/s':>11} {'RSS MB':>7}  vs baseline")
+    for name, result in results.items():
+        base = baseline.get(name)
+        note = ""
+        if base:
+            change = result["wall_s"] / base["wall_s"] - 1 if base["wall_s"] else 0.0
+            note = f"{change:+.0%} wall"
+            if change > tolerance and result["wall_s"] - base["wall_s"] > MIN_DELTA_S:
+                regressions.append(f"x{scale} {name}: {result['wall_s']:.2f}s vs {base['wall_s']:.2f}s ({change:+.0%})")
+            if base.get("peak_rss_mb") and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+                regressions.append(f"x{scale} {name}: peak RSS {result['peak_rss_mb']:.0f} MB "
+                                   f"vs {base['peak_rss_mb']:.0f} MB")
+                note += ", more memory"
+        rate = f"{result['rows_per_s']:,}" if result["rows_per_s"] is not None else "-"
+        print(f"{'':<6} {name:<10} {result['rows']:>9} {result['wall_s']:>7.2f}s {rate:>11} "
+              f"{result['peak_rss_mb']:>7.0f}  {note}")
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"results": {}}
+
+
+def save_baseline(path, baseline, measured):
+    baseline["results"].update(measured)
+    baseline["recorded"] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    baseline["machine"] = f"{platform.system()} {platform.machine()}, Python {platform.python_version()}"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=4, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+    print(f"Wrote baseline {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages on scaled copies of the IPO lists.')
+    parser.add_argument('--scales', default='1,10,100', help='Comma separated scale factors (e.g. 1,10,100,1000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scale; the best wall time is kept')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline JSON to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown or memory growth over the baseline (0.25 = 25%%)')
+    parser.add_argument('--workdir', default=None, help='Keep the fixtures and outputs here instead of a temp directory')
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    baseline = load_baseline(args.baseline)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ipo-benchmark-")
+    measured, regressions = {}, []
+    try:
+        for scale in scales:
+            fixtures = os.path.join(workdir, f"x{scale}")
+            build_fixtures(fixtures, scale)
+            results = measure(fixtures, os.path.join(fixtures, "run"), args.repeat)
+            measured[str(scale)] = results
+            regressions += compare(scale, results, baseline["results"].get(str(scale), {}), args.tolerance)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.update_baseline:
+        save_baseline(args.baseline, baseline, measured)
+    elif regressions:
+        print(f"\nREGRESSION against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    elif any(str(scale) in baseline["results"] for scale in scales):
+        print("\nNo regressions against the baseline.")
+    else:
+        print(f"\nNo baseline for these scales in {args.baseline}; record one with --update-baseline")
+
+
+if __name__ == "__main__":
+    main()
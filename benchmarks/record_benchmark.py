@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Memory benchmark of the IPO rows the pure-Python stages keep in memory, per
+row before (a list of str per row, as csv.reader returns it) and after
+(ipo_record.IPORecord: __slots__, interned low-cardinality columns, int
+申請時股本).
+
+The fixtures are the TWSE and TPEX lists scaled like pipeline_benchmark.py
+does (every copy with shifted stock codes and suffixed company names), the
+TWSE list converted by twse_ipo.py. Each table is read from its CSV file for
+both measurements, so neither side shares strings with the other; the
+retained memory is measured with tracemalloc.
+
+Usage: python benchmarks/record_benchmark.py [--scale 100]
+"""
+import argparse
+import contextlib
+import csv
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import convert_date_format
+import twse_ipo
+from ipo_record import IPORecord, records
+from pipeline_benchmark import write_tpex_fixture, write_twse_fixture
+
+
+def build_fixtures(directory, scale):
+    """Writes the scaled TWSE-IPO-utf8.csv and TPEX-IPO-utf8.csv; returns their paths."""
+    raw_twse = os.path.join(directory, "applylisting.csv")
+    raw_tpex = os.path.join(directory, "TPEX-raw.csv")
+    twse = os.path.join(directory, "TWSE-IPO-utf8.csv")
+    tpex = os.path.join(directory, "TPEX-IPO-utf8.csv")
+    write_twse_fixture(raw_twse, scale)
+    write_tpex_fixture(raw_tpex, scale)
+    with contextlib.redirect_stdout(io.StringIO()):
+        twse_ipo.process_file(raw_twse, twse)
+        convert_date_format.convert_and_fix_csv(raw_tpex, tpex)
+    return [twse, tpex]
+
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [row for row in reader if row]
+
+
+def read_records(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        return list(records(reader))
+
+
+def retained(load, path):
+    """Returns (table, bytes still allocated by load(path) after it returned, seconds)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    table = load(path)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return table, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the per-row memory of list rows and IPORecords.')
+    parser.add_argument('--scale', type=int, default=100, help='Copies of the committed IPO lists')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for path in build_fixtures(directory, args.scale):
+            rows, before, before_s = retained(read_rows, path)
+            count = len(rows)
+            del rows
+            table, after, after_s = retained(read_records, path)
+            if [record.to_row() for record in table] != read_rows(path):
+                print(f"{os.path.basename(path)}: the records do not convert back to the same rows")
+                sys.exit(1)
+            del table
+            print(f"{os.path.basename(path)} x{args.scale}: {count} rows")
+            print(f"  list of str  {before / count:7.0f} B/row  {before / 2**20:7.1f} MB  {before_s:6.2f}s")
+            print(f"  IPORecord    {after / count:7.0f} B/row  {after / 2**20:7.1f} MB  {after_s:6.2f}s"
+                  f"  ({1 - after / before:.0%} less)")
+
+
+if __name__ == "__main__":
+    main()
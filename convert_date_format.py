@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+TPEX-IPO-utf8.csv: YYYYMMDD dates -> YYYY/MM/DD, every cell quoted:
+
+    python ipo.py convert-tpex <input_file> <output_file>
+
+ConvertDateFormat.py is a thin wrapper around main().
+"""
+import csv
+import os
+import sys
+
+import instrument
+from date_normalizer import compact_to_slashed
+
+# Columns with date data
+DATE_COLUMNS = [
+    "申請日期",
+    "上櫃審議委員會審議日期",
+    "櫃買董事會通過上櫃日期",
+    "櫃買同意上櫃契約日期或證期局核准上櫃契約日期",
+    "股票上櫃買賣日期"
+]
+
+# Cells pandas.read_csv used to read as NaN (and wrote back as ""), kept so the
+# output stays identical to the former pandas implementation
+NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+])
+
+def convert_rows(header, rows):
+    """
+    Converts the date columns of already parsed rows from 'YYYYMMDD' to 'YYYY/MM/DD'.
+    Blank lines are dropped and missing or NA cells become empty strings.
+    """
+    date_indexes = [header.index(column) for column in DATE_COLUMNS if column in header]
+    converted = []
+    for row in rows:
+        if not row:
+            continue
+        row = [("" if value in NA_VALUES else value) for value in row]
+        row += [""] * (len(header) - len(row))
+        for i in date_indexes:
+            row[i] = compact_to_slashed(row[i])
+        converted.append(row)
+    return converted
+
+def write_rows(output_file, header, rows):
+    """Writes rows with all cells wrapped in double quotes."""
+    with open(output_file, mode='w', encoding='utf-8', newline='') as outfile:
+        writer = csv.writer(outfile, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def convert_and_fix_csv(input_file, output_file):
+    """
+    Converts specified date columns to 'YYYY/MM/DD' format and ensures all cells
+    in the output CSV are wrapped in double quotes.
+    """
+    try:
+        with instrument.stage("normalize") as stage:
+            # Read the input CSV file with quotation wrapping preserved
+            with open(input_file, mode='r', encoding='utf-8-sig', newline='') as infile:
+                reader = csv.reader(infile, quotechar='"')
+                header = next(reader)
+                rows = convert_rows(header, instrument.counted(reader, "rows_in"))
+
+            # Save the modified rows to the output file with all cells quoted
+            write_rows(output_file, header, rows)
+            stage.add_rows(rows_out=len(rows))
+        print(f"File successfully processed and saved to: {output_file}")
+
+    except Exception as e:
+        print(f"Error processing file: {e}")
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    # Check if the correct number of arguments are provided
+    if len(args) != 2:
+        print(f"Usage: python {os.path.basename(sys.argv[0])} <input_file> <output_file>")
+    else:
+        input_file = args[0]
+        output_file = args[1]
+        convert_and_fix_csv(input_file, output_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Filters the IPO CSV on stdin by the rules in filter-rules.json:
+
+    python ipo.py filter [--rules filter-rules.json] < TWSE-IPO-utf8.csv > TWSE-IPO-utf8-filter.csv
+
+csv-filter.py is a thin wrapper around main().
+"""
+import argparse
+import sys
+import csv
+from functools import lru_cache
+
+import instrument
+from filter_rules import RULES_FILE, RowFilter, load_rules
+from ipo_record import IPORecord
+
+# Cells after this many are dropped (csvfilter's Processor(fields=range(26)) did the same)
+MAX_FIELDS = 26
+
+HEADER = ["申請日期", "股票代號", "公司名稱", "董事長", "申請時股本(仟元)", "上櫃審議委員會審議日期", "櫃買董事會通過上櫃日期", "櫃買同意上櫃契約日期或證期局核准上櫃契約日期", "股票上櫃買賣日期", "主辦承銷商", "承銷價", "備註"]
+
+@lru_cache(maxsize=None)
+def default_filter():
+    """The rules in filter-rules.json, read and compiled on first use."""
+    return RowFilter()
+
+def filter_rows(row):
+    """
+    Filters rows based on the rules in filter-rules.json:
+    - row[11]("備註") must not contain any of the forbidden keywords
+      ("自撤", "自行撤件", "撤件", "退件", "已下櫃", "管理股票", "撤銷上市", "撤銷上櫃", ...).
+    - row[0]("申請日期") must be a date from min_year (2000) on, with no upper bound.
+    """
+    return default_filter()(row)
+
+def filter_records(rows, rules=None):
+    """Yields the rows (header row included, as read from the CSV) that pass the rules, as IPORecords."""
+    keep = default_filter() if rules is None else rules
+    for row in rows:
+        row = row[:MAX_FIELDS]
+        # The rules reject rows shorter than an IPO row, so every kept row makes a record
+        if row and keep(row):
+            yield IPORecord.from_row(row)
+
+def filter_table(rows, rules=None):
+    """Returns the rows (header row included, as read from the CSV) that pass the rules."""
+    return list(filter_records(rows, rules))
+
+def filter_file(input_file, output_file, rules_file=RULES_FILE):
+    """
+    Filters a CSV file into another, like `csv-filter.py < input_file > output_file`,
+    and prints the rule hits.
+    """
+    rules = RowFilter(load_rules(rules_file))
+    with instrument.stage("filter", quiet=True) as stage:
+        # Rows are filtered and written one at a time
+        with open(input_file, 'r', encoding='utf-8', newline='') as infile, \
+                open(output_file, 'w', encoding='utf-8', newline='') as outfile:
+            writer = csv.writer(outfile, quotechar='"', quoting=csv.QUOTE_ALL)
+            writer.writerow(HEADER)
+            writer.writerows(filter_records(csv.reader(infile), rules))
+        stage.add_rows(rows_in=sum(rules.hits.values()), rows_out=rules.hits["kept"])
+    print(f"Filter rule hits for {input_file}:")
+    rules.report()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Filter the IPO CSV on stdin by the rules in filter-rules.json.')
+    parser.add_argument('--rules', default=RULES_FILE, help='JSON rules file (default: filter-rules.json)')
+    args = parser.parse_args(argv)
+    rules = RowFilter(load_rules(args.rules))
+
+    # Modify the output stream to avoid additional newlines
+    sys.stdin.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(newline='')
+
+    # Set up CSV writer for standard output, with all items quoted
+    writer = csv.writer(sys.stdout, quotechar='"', quoting=csv.QUOTE_ALL)
+
+    # Write header row to standard output
+    writer.writerow(HEADER)
+
+    # Process rows and write each filtered row to standard output
+    with instrument.stage("filter", quiet=True) as stage:
+        writer.writerows(filter_records(csv.reader(sys.stdin), rules))
+        stage.add_rows(rows_in=sum(rules.hits.values()), rows_out=rules.hits["kept"])
+
+    # Rule hit counts go to stderr, stdout is the filtered CSV
+    print("Filter rule hits:", file=sys.stderr)
+    rules.report(sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+Prints a CSV file as a Markdown table:
+
+    python ipo.py render TWSE-IPO-utf8.csv utf-8 > TWSE-IPO-utf8.md
+
+csv-to-md.py is a thin wrapper around main().
+"""
+import argparse
+import csv
+import sys
+
+import instrument
+import markdown_table
+
+COLUMNS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25]
+
+def select_columns(rows):
+    return [[row[i] for i in COLUMNS if 0 <= i < len(row)] for row in rows]
+
+def render_rows(rows, pad=False):
+    """Returns the Markdown table for already parsed CSV rows (header row first)."""
+    return markdown_table.render(select_columns(rows), pad)
+
+def read_file(name, encoding='Big5', pad=False, pages=None, page_size=None):
+    try:
+        # stdout is the Markdown table, so the stage timing is only recorded
+        with instrument.stage("render", quiet=True) as stage:
+            with open(name, 'r', encoding=encoding) as file:
+                rows = select_columns(csv.reader(file))
+            stage.add_rows(rows_in=len(rows) - 1)
+            if pages:
+                for path in markdown_table.write_pages(pages, rows, page_size, per_year=not page_size, pad=pad):
+                    print(f"Wrote {path}", file=sys.stderr)
+            else:
+                # Written row by row, nothing but the parsed rows is kept in memory
+                for line in markdown_table.render_lines(rows, pad):
+                    sys.stdout.write(line + "\n")
+    except FileNotFoundError:
+        print(f"File '{name}' not found.")
+    except UnicodeDecodeError:
+        print(f"Cannot decode file '{name}' with encoding '{encoding}'.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print a CSV file as a Markdown table.')
+    parser.add_argument('filename')
+    parser.add_argument('encoding', nargs='?', default='Big5')
+    parser.add_argument('--pad', action='store_true', help='Pad the columns to equal width (larger output, like csv2md)')
+    parser.add_argument('--pages', metavar='MD_FILE', default=None,
+                        help='Write per-year pages into a directory named after MD_FILE instead of printing the table')
+    parser.add_argument('--page-size', type=int, default=None, help='Split into pages of this many rows instead of per year')
+    args = parser.parse_args(argv)
+    if args.page_size is not None and args.page_size < 1:
+        parser.error("--page-size must be greater than 0")
+    sys.stdout.reconfigure(encoding='utf-8')
+    read_file(args.filename, args.encoding, args.pad, args.pages, args.page_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+from datetime import datetime
+from functools import lru_cache
+
+# Distinct date strings kept per converter; the listings only have a few thousand
+CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _roc_to_gregorian(roc_date):
+    try:
+        parts = roc_date.strip().split('/')
+        if len(parts) == 3:
+            # A four-digit year is already Gregorian (ROC years have at most three digits)
+            year = int(parts[0]) + (0 if len(parts[0].strip()) == 4 else 1911)
+            month = int(parts[1])
+            day = int(parts[2])
+            return datetime(year, month, day).strftime('%Y/%m/%d')
+        else:
+            raise ValueError(f"Invalid date format: {roc_date}")
+    except Exception as e:
+        print(f"Error converting date '{roc_date}': {e}")
+        return ""
+
+
+def roc_to_gregorian(roc_date):
+    """
+    Converts a ROC date (e.g. '113/01/05') to a Gregorian date in YYYY/MM/DD format;
+    a date that is already 'YYYY/MM/DD' is kept. Results are memoized, since many
+    filings share the same dates; an invalid date is reported once and converted to "".
+    """
+    if not roc_date or roc_date.strip() == "":
+        return ""
+    return _roc_to_gregorian(roc_date)
+
+
+def compact_to_slashed(value):
+    """Converts 'YYYYMMDD' to 'YYYY/MM/DD'; any other value is returned unchanged."""
+    # Three slices are cheaper than an LRU lookup, so this one is not memoized
+    if len(value) == 8:
+        return f"{value[:4]}/{value[4:6]}/{value[6:8]}"
+    return value
+
+
+def detect_format(sample):
+    """
+    Guesses the strptime format of a date column from one sample value.
+
+    Returns:
+        str: The format, or None to let pandas infer it
+    """
+    if '/' in sample:
+        # Format like YY/MM/DD or YYYY/MM/DD
+        return '%y/%m/%d' if len(sample.split('/')[0]) == 2 else '%Y/%m/%d'
+    if '-' in sample:
+        # Format like YYYY-MM-DD
+        return '%Y-%m-%d'
+    return None
+
+
+def parse_column(values, date_format=None):
+    """
+    Parses a pandas Series of date strings into datetime64 values, NaT where a
+    value cannot be parsed. Each distinct string is parsed only once.
+
+    Args:
+        values (pandas.Series): The date strings
+        date_format (str, optional): strptime format; detected from the first value if omitted
+
+    Returns:
+        pandas.Series: The parsed dates, with the index of values
+    """
+    import numpy as np
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if date_format is None and len(values) and isinstance(values.iloc[0], str):
+        date_format = detect_format(values.iloc[0])
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=date_format, errors='coerce')
+    # Missing values have code -1, which picks the NaT appended at the end
+    parsed = parsed.to_numpy()
+    parsed = np.append(parsed, np.array(['NaT'], dtype=parsed.dtype))
+    return pd.Series(parsed[codes], index=values.index, name=values.name)
+
+
+def iso_strings(dates):
+    """
+    Formats a datetime64 Series as 'YYYY-MM-DD' strings (much faster than
+    dt.strftime); missing dates become None.
+    """
+    import numpy as np
+
+    values = dates.to_numpy()
+    strings = np.datetime_as_string(values, unit='D').tolist()
+    missing = np.isnat(values)
+    if missing.any():
+        for i in np.flatnonzero(missing).tolist():
+            strings[i] = None
+    return strings
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Row level changes of the merged IPO table between two runs, kept in an
+append-only JSON Lines log (ipo-delta.jsonl).
+
+Every record is keyed by (股票代號, 申請日期) and hashed; a run appends one line
+with the new filings, the removed ones and, for records whose hash changed,
+the old and new value of every changed column (審議/董事會/上櫃買賣 dates,
+備註, ...). Runs without changes append nothing.
+
+The newest entries are read from the end of the file, so reading today's
+changes costs O(delta), not O(table):
+
+    python delta_log.py [--workdir .] [--last 1 | --since 2026-10-01 | --after 2026-10-18T07:00:00Z]
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+
+from metrics import TAIWAN
+
+DELTA_LOG = "ipo-delta.jsonl"
+
+# The table the delta is computed on: every filing of both exchanges
+DELTA_SOURCE = "TWSE_TPEX-IPO-utf8-sort.csv"
+
+KEY_COLUMNS = ["股票代號", "申請日期"]
+
+# Columns that describe the progress of a filing; a change in any of them
+# marks the record as a status change
+STATUS_COLUMNS = [
+    "上櫃審議委員會審議日期", "櫃買董事會通過上櫃日期",
+    "櫃買同意上櫃契約日期或證期局核准上櫃契約日期", "股票上櫃買賣日期", "備註",
+]
+
+BLOCK_SIZE = 64 * 1024
+
+
+def record_key(row, positions):
+    return "|".join(row[i].strip() for i in positions)
+
+
+def record_hash(row):
+    return hashlib.sha1("\x1f".join(row).encode('utf-8')).hexdigest()[:16]
+
+
+def index_records(rows):
+    """
+    Indexes a table (header row first) by record key.
+
+    Returns:
+        dict: key -> (hash, row); a key that occurs more than once gets a #n suffix
+    """
+    header = rows[0]
+    positions = [header.index(column) for column in KEY_COLUMNS]
+    records = {}
+    for row in rows[1:]:
+        if not row:
+            continue
+        key = record_key(row, positions)
+        if key in records:
+            n = 2
+            while f"{key}#{n}" in records:
+                n += 1
+            key = f"{key}#{n}"
+        records[key] = (record_hash(row), row)
+    return records
+
+
+def diff_tables(previous, current):
+    """
+    Compares two versions of a table (header row first).
+
+    Returns:
+        dict: added and removed records (as column -> value dicts) and the
+              changed ones with {column: [old, new]} per changed column
+    """
+    header = current[0]
+    old, new = index_records(previous), index_records(current)
+    added = [dict(zip(header, new[key][1])) for key in new if key not in old]
+    removed = [dict(zip(previous[0], old[key][1])) for key in old if key not in new]
+    changed = []
+    for key, (digest, row) in new.items():
+        if key not in old or old[key][0] == digest:
+            continue
+        before = dict(zip(previous[0], old[key][1]))
+        changes = {column: [before.get(column, ""), value]
+                   for column, value in zip(header, row) if before.get(column, "") != value}
+        entry = {column: row[header.index(column)] for column in KEY_COLUMNS}
+        entry["status_change"] = any(column in changes for column in STATUS_COLUMNS)
+        entry["changes"] = changes
+        changed.append(entry)
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+def is_empty(delta):
+    return not (delta["added"] or delta["changed"] or delta["removed"])
+
+
+def summary(delta):
+    return (f"{len(delta['added'])} new, {len(delta['changed'])} changed "
+            f"({sum(1 for entry in delta['changed'] if entry['status_change'])} status), "
+            f"{len(delta['removed'])} removed")
+
+
+def append_delta(path, delta, source=DELTA_SOURCE, now=None):
+    """
+    Appends a delta to the log as one JSON line (nothing if it is empty).
+
+    Returns:
+        dict: The entry written, or None
+    """
+    if is_empty(delta):
+        return None
+    now = now or datetime.now(timezone.utc)
+    entry = {
+        "run": now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "date": now.astimezone(TAIWAN).strftime('%Y-%m-%d'),
+        "source": source,
+        **delta,
+    }
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return entry
+
+
+def reversed_lines(path):
+    """Yields the lines of a file last to first, reading it backwards in blocks."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position, tail = f.tell(), b""
+        while position > 0:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + tail).split(b"\n")
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line.decode('utf-8')
+        if tail.strip():
+            yield tail.decode('utf-8')
+
+
+def read_entries(path, last=None, since=None, after=None):
+    """
+    Reads the newest log entries without reading the rest of the log.
+
+    Args:
+        path (str): The delta log
+        last (int, optional): Number of entries to return
+        since (str, optional): Return the entries of this Taiwan date (YYYY-MM-DD) and later
+        after (str, optional): Return the entries of the runs at or after this UTC time (YYYY-MM-DDTHH:MM:SSZ)
+
+    Returns:
+        list: The entries, oldest first
+    """
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    for line in reversed_lines(path):
+        entry = json.loads(line)
+        if (since and entry["date"] < since) or (after and entry["run"] < after):
+            break
+        entries.append(entry)
+        if last and len(entries) >= last:
+            break
+    return entries[::-1]
+
+
+def read_table(path):
+    """Reads a CSV table (header first), None if the file does not exist."""
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return list(csv.reader(f))
+    except FileNotFoundError:
+        return None
+
+
+def record_delta(current_path, baseline_path, log_path=DELTA_LOG):
+    """
+    Appends the changes between a baseline copy of the table and its current
+    version to the log, then makes the current version the new baseline.
+
+    Args:
+        current_path (str): The table as written by this run
+        baseline_path (str): Copy of the table the previous delta was computed on
+        log_path (str): The delta log
+
+    Returns:
+        dict: The entry written, or None
+    """
+    previous, current = read_table(baseline_path), read_table(current_path)
+    entry = None
+    if previous is None:
+        print(f"No previous {os.path.basename(current_path)}, the delta log starts with the next run")
+    else:
+        delta = diff_tables(previous, current)
+        entry = append_delta(log_path, delta, os.path.basename(current_path))
+        print(f"Changes since the previous run: {summary(delta)}")
+    os.makedirs(os.path.dirname(baseline_path) or ".", exist_ok=True)
+    shutil.copyfile(current_path, f"{baseline_path}.part")
+    os.replace(f"{baseline_path}.part", baseline_path)
+    return entry
+
+
+def print_entry(entry):
+    print(f"{entry['run']} ({entry['source']}): {summary(entry)}")
+    for row in entry["added"]:
+        print(f"  + {row.get('股票代號')} {row.get('公司名稱', '')} filed {row.get('申請日期')}")
+    for change in entry["changed"]:
+        columns = ", ".join(f"{column}: {old or '-'} -> {new or '-'}" for column, (old, new) in change["changes"].items())
+        print(f"  ~ {change['股票代號']} ({change['申請日期']}) {columns}")
+    for row in entry["removed"]:
+        print(f"  - {row.get('股票代號')} {row.get('公司名稱', '')} filed {row.get('申請日期')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show the newest changes of the merged IPO table.')
+    parser.add_argument('--workdir', default='.', help=f'Directory with {DELTA_LOG}')
+    parser.add_argument('--last', type=int, default=None, help='Number of runs to show (default: 1)')
+    parser.add_argument('--since', default=None, metavar='YYYY-MM-DD', help='Show every run since this Taiwan date')
+    parser.add_argument('--after', default=None, metavar='YYYY-MM-DDTHH:MM:SSZ',
+                        help='Show only the runs recorded at or after this UTC time (e.g. when the pipeline started)')
+    args = parser.parse_args(argv)
+    try:
+        entries = read_entries(os.path.join(args.workdir, DELTA_LOG),
+                               last=args.last or (None if args.since or args.after else 1),
+                               since=args.since, after=args.after)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not entries:
+        print("No changes recorded." if not args.after else f"No changes recorded since {args.after}.")
+    for entry in entries:
+        print_entry(entry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import time
+
+# Suffixes Chrome/Firefox use while a download is still being written
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".tmp", ".download")
+
+
+def snapshot(download_dir):
+    """Returns {file name: (mtime, size)} for the files currently in download_dir."""
+    files = {}
+    for entry in os.scandir(download_dir):
+        if entry.is_file():
+            stat = entry.stat()
+            files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def wait_for_download(download_dir, before, timeout=10, idle_timeout=10, max_timeout=120, poll=0.1):
+    """
+    Waits until a new, completed file shows up in download_dir and returns its path.
+
+    A file counts as completed when it is new (or modified) compared to the
+    before snapshot, has no partial-download suffix and its size did not change
+    between two polls. The deadline starts at timeout seconds and is pushed back
+    by idle_timeout whenever an in-progress download grows, up to max_timeout.
+
+    Args:
+        download_dir (str): Browser download directory
+        before (dict): snapshot() taken before the download was triggered
+        timeout (float): Seconds to wait for a download to start
+        idle_timeout (float): Seconds a growing download may stall before giving up
+        max_timeout (float): Hard limit in seconds
+        poll (float): Polling interval in seconds
+
+    Returns:
+        str: Path of the downloaded file
+
+    Raises:
+        TimeoutError: If no completed download appeared before the deadline
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    sizes = {}
+    while True:
+        now = time.monotonic()
+        current = snapshot(download_dir)
+        for name, (mtime, size) in current.items():
+            if before.get(name) == (mtime, size):
+                continue
+            previous = sizes.get(name)
+            sizes[name] = size
+            if name.endswith(PARTIAL_SUFFIXES):
+                if previous is None or size != previous:
+                    deadline = min(max(deadline, now + idle_timeout), start + max_timeout)
+                continue
+            if previous == size and size > 0:
+                return os.path.join(download_dir, name)
+        if now > deadline:
+            raise TimeoutError(f"No completed download in {download_dir} after {now - start:.1f}s")
+        time.sleep(poll)
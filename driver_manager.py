@@ -0,0 +1,224 @@
+"""
+One warm Chrome session for the Selenium downloads.
+
+- The chromedriver matching the installed Chrome is cached per Chrome version
+  in .chromedriver-cache/<version>/, so chromedriver_autoinstaller (which
+  looks the version up online and may download) only runs after a Chrome
+  update.
+- Chrome runs with --headless=new, so no Xvfb display is needed (headless=False
+  still starts one through pyvirtualdisplay).
+- The profile lives in .chrome-profile/ and is reused between runs, which
+  keeps the HTTP cache of the exchange pages warm.
+- All sources share one driver. Before it is handed out it is health checked,
+  and a call that fails with a WebDriverException restarts the browser and is
+  retried, up to max_restarts times.
+
+The cold start (driver lookup + browser launch) is timed as instrument stages
+and reported.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import instrument
+
+DRIVER_CACHE = ".chromedriver-cache"
+PROFILE_DIR = ".chrome-profile"
+
+# The Chrome versions whose drivers are kept in the cache
+KEEP_VERSIONS = 2
+
+# Left behind in the profile by a Chrome that did not exit cleanly; they make
+# the next Chrome refuse the profile
+PROFILE_LOCKS = ["SingletonLock", "SingletonSocket", "SingletonCookie"]
+
+
+def chrome_version():
+    """Version of the installed Chrome (read from the binary, no network), None if not found."""
+    from chromedriver_autoinstaller import utils
+
+    try:
+        return utils.get_chrome_version()
+    except Exception:
+        return None
+
+
+def cached_chromedriver(cache_dir=DRIVER_CACHE):
+    """
+    Returns the path of a chromedriver for the installed Chrome, installing
+    it into the cache only if this Chrome version has none yet.
+
+    Returns:
+        tuple: (path or None, True if it came from the cache). None lets
+               Selenium resolve a driver itself (Selenium Manager).
+    """
+    import chromedriver_autoinstaller
+    from chromedriver_autoinstaller import utils
+
+    version = chrome_version()
+    if not version:
+        print("Chrome version not found, letting Selenium resolve the driver")
+        return None, False
+    path = os.path.join(cache_dir, version, utils.get_chromedriver_filename())
+    if os.path.isfile(path):
+        return path, True
+
+    staging = tempfile.mkdtemp(prefix="chromedriver-")
+    try:
+        installed = chromedriver_autoinstaller.install(path=staging)
+        if not installed:
+            print(f"No chromedriver found for Chrome {version}, letting Selenium resolve the driver")
+            return None, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copy2(installed, f"{path}.part")
+        os.replace(f"{path}.part", path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    print(f"Cached chromedriver for Chrome {version} in {os.path.dirname(path)}")
+    prune_cache(cache_dir)
+    return path, False
+
+
+def prune_cache(cache_dir=DRIVER_CACHE, keep=KEEP_VERSIONS):
+    """Removes the drivers of all but the `keep` most recently cached Chrome versions."""
+    versions = sorted((os.path.join(cache_dir, name) for name in os.listdir(cache_dir)),
+                      key=os.path.getmtime, reverse=True)
+    for stale in versions[keep:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def start_display():
+    """Starts an Xvfb display for a headed Chrome (Linux only)."""
+    from pyvirtualdisplay import Display
+    display = Display(visible=0, size=(1200, 1200))
+    display.start()
+    return display
+
+
+def chrome_options(download_dir, profile_dir=PROFILE_DIR, headless=True):
+    from selenium import webdriver
+
+    preferences = {"download.default_directory": os.path.abspath(download_dir),
+                   "download.prompt_for_download": False,
+                   "directory_upgrade": True,
+                   "safebrowsing.enabled": True}
+    options = webdriver.ChromeOptions()
+    options.add_experimental_option("prefs", preferences)
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    if headless:
+        options.add_argument("--headless=new")
+    if profile_dir:
+        # A persistent profile keeps the HTTP cache (and cookies) between runs
+        options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+    options.add_argument("--window-size=1200,1200")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return options
+
+
+class DriverManager:
+    """
+    Hands out one shared, health checked Chrome driver and restarts it on failure.
+
+        with DriverManager(download_dir) as manager:
+            manager.run(lambda driver: download_csv(driver, ...))
+    """
+
+    def __init__(self, download_dir, profile_dir=PROFILE_DIR, cache_dir=DRIVER_CACHE, headless=True, max_restarts=2):
+        self.download_dir = download_dir
+        self.profile_dir = profile_dir
+        self.cache_dir = cache_dir
+        self.headless = headless
+        self.max_restarts = max_restarts
+        self.driver = None
+        self.display = None
+        self.restarts = 0
+        self.cold_start = None  # seconds, of the first start
+
+    def start(self):
+        """Starts Chrome (and the Xvfb display if not headless) and records the start-up time."""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        start = time.perf_counter()
+        with instrument.stage("driver lookup", quiet=True):
+            path, cached = cached_chromedriver(self.cache_dir)
+        if not self.headless and self.display is None:
+            self.display = start_display()
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            for lock in PROFILE_LOCKS:
+                if os.path.lexists(os.path.join(self.profile_dir, lock)):
+                    os.remove(os.path.join(self.profile_dir, lock))
+        with instrument.stage("browser start", quiet=True):
+            service = Service(executable_path=path) if path else Service()
+            self.driver = webdriver.Chrome(service=service,
+                                           options=chrome_options(self.download_dir, self.profile_dir, self.headless))
+        elapsed = time.perf_counter() - start
+        if self.cold_start is None:
+            self.cold_start = elapsed
+        print(f"Chrome started in {elapsed:.2f}s (chromedriver {'cached' if cached else 'installed'}, "
+              f"{'headless' if self.headless else 'Xvfb'})")
+        return self.driver
+
+    def healthy(self):
+        """True if the browser still answers a trivial script."""
+        if self.driver is None:
+            return False
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def get(self):
+        """Returns a working driver, (re)starting the browser if needed."""
+        if not self.healthy():
+            if self.driver is not None:
+                print("Chrome is not responding, restarting it")
+                self.stop_driver()
+            self.start()
+        return self.driver
+
+    def run(self, action):
+        """
+        Calls action(driver); a WebDriverException restarts the browser and
+        the action is tried again, at most max_restarts times per manager.
+        """
+        from selenium.common.exceptions import WebDriverException
+
+        while True:
+            driver = self.get()
+            try:
+                return action(driver)
+            except WebDriverException as e:
+                if self.restarts >= self.max_restarts:
+                    raise
+                self.restarts += 1
+                print(f"Browser error ({e.__class__.__name__}), restart {self.restarts}/{self.max_restarts}")
+                self.stop_driver()
+
+    def stop_driver(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+    def close(self):
+        self.stop_driver()
+        if self.display is not None:
+            self.display.stop()
+            self.display = None
+        if self.cold_start is not None:
+            print(f"Chrome cold start: {self.cold_start:.2f}s, restarts: {self.restarts}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -1,173 +1,437 @@
-import pandas as pd
 import argparse
 import sys
-import requests
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 import os
 import io
+import json
+import csv
 
-# GitHub URL for auction data
-GITHUB_AUCTION_URL = "https://raw.githubusercontent.com/wenchiehlee/Selenium-Actions.Auction/refs/heads/main/auction-company.csv"
+import date_normalizer
+import instrument
+import snapshot
 
-def download_auction_data(url=GITHUB_AUCTION_URL, local_file=None):
+from auction_cache import GITHUB_AUCTION_URL, CACHE_DIR, DEFAULT_TTL, load_auction_bytes
+
+def download_auction_data(url=GITHUB_AUCTION_URL, local_file=None, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, timeout=30):
     """
-    Download the auction data from GitHub and return as a DataFrame.
+    Load the auction data (from the local cache, GitHub or a local file) and return as a DataFrame.
     Optionally save to a local file.
     
     Args:
-        url (str): URL to download the auction data from
+        url (str): URL, file:// URL or local path to load the auction data from
         local_file (str, optional): Path to save the downloaded file
+        cache_dir (str): Directory of the on-disk auction cache
+        ttl (float): Seconds a cached copy is used without revalidating it
+        timeout (float): HTTP timeout in seconds
         
     Returns:
         pandas.DataFrame: The downloaded auction data
     """
+    import pandas as pd
+
     try:
-        print(f"Downloading auction data from {url}...")
-        response = requests.get(url)
-        response.raise_for_status()  # Raise exception for HTTP errors
+        content = load_auction_bytes(url, cache_dir=cache_dir, ttl=ttl, timeout=timeout)
         
         # Save to local file if requested
         if local_file:
             with open(local_file, 'wb') as f:
-                f.write(response.content)
+                f.write(content)
             print(f"Saved auction data to {local_file}")
         
         # Return as DataFrame
-        return pd.read_csv(io.StringIO(response.content.decode('utf-8')))
+        return pd.read_csv(io.StringIO(content.decode('utf-8')))
     
     except Exception as e:
         print(f"Error downloading auction data: {e}")
         return None
 
-def process_files(ipo_file, output_file, local_auction_file=None):
+def load_decisions(path):
+    """
+    Loads the per stock code decisions of a previous incremental run.
+
+    Returns:
+        dict: Decisions keyed by output name, then by stock code (empty if there is no state file)
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (ValueError, OSError) as e:
+        print(f"Ignoring unreadable dedupe state '{path}': {e}")
+        return {}
+
+def save_decisions(decisions, path):
+    """Writes the per stock code decisions for the next incremental run."""
+    tmp_path = f"{path}.part"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(decisions, f, indent=1, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def format_date(value):
+    """Formats a parsed date for the dedupe state, None for missing dates."""
+    import pandas as pd
+
+    return value.strftime('%Y-%m-%d') if pd.notna(value) else None
+
+def decide_group(df_ipo, group, auction_entries):
+    """
+    Decides which rows of one duplicate stock code group to keep and prints the reasoning.
+    Row-by-row reference implementation of the rule; remove_duplicates uses the
+    batched decide_groups, which gives the same verdicts and output.
+
+    Args:
+        df_ipo (pandas.DataFrame): The whole IPO data (used for row numbers)
+        group (pandas.DataFrame): The IPO rows sharing one stock code
+        auction_entries (pandas.DataFrame): The auction rows of that stock code
+
+    Returns:
+        list: (keep, matched auction date or None) for each row of group, in group order
+    """
+    from dateutil.relativedelta import relativedelta
+
+    if len(auction_entries) > 0:
+        print(f"  Found {len(auction_entries)} matching entries in the auction file")
+        
+        # Find the row to keep based on the complex rule
+        rows_to_process = []
+        
+        for ipo_idx, ipo_row in group.iterrows():
+            ipo_date = ipo_row['申請日期']
+            
+            # Check each auction entry
+            for auction_idx, auction_row in auction_entries.iterrows():
+                auction_date = auction_row['開標日期']
+                
+                # Check if auction date is after IPO application date
+                if auction_date > ipo_date:
+                    # Check if difference is within 12 months
+                    diff = relativedelta(auction_date, ipo_date)
+                    months_diff = diff.years * 12 + diff.months
+                    
+                    if months_diff <= 12:
+                        status = "KEEP (auction date within 12 months after application)"
+                        rows_to_process.append((ipo_idx, True, ipo_date, auction_date, months_diff, status))
+                    else:
+                        status = "REMOVE (auction date more than 12 months after application)"
+                        rows_to_process.append((ipo_idx, False, ipo_date, auction_date, months_diff, status))
+                else:
+                    status = "REMOVE (auction date before application date)"
+                    rows_to_process.append((ipo_idx, False, ipo_date, auction_date, None, status))
+        
+        # If we have valid entries to keep
+        if any(keep for _, keep, _, _, _, _ in rows_to_process):
+            # Mark all rows in this group for removal first
+            verdicts = {idx: (False, None) for idx in group.index}
+            
+            # Then mark the ones we want to keep
+            for idx, keep, ipo_date, auction_date, months_diff, status in rows_to_process:
+                if keep:
+                    if not verdicts[idx][0]:
+                        verdicts[idx] = (True, format_date(auction_date))
+                    print(f"  Row {df_ipo.index.get_loc(idx) + 1}: Application Date: {ipo_date.strftime('%Y-%m-%d')}, "
+                          f"Auction Date: {auction_date.strftime('%Y-%m-%d')}, "
+                          f"Difference: {months_diff} months - {status}")
+                else:
+                    print(f"  Row {df_ipo.index.get_loc(idx) + 1}: Application Date: {ipo_date.strftime('%Y-%m-%d')}, "
+                          f"Auction Date: {auction_date.strftime('%Y-%m-%d')}, "
+                          f"{status}")
+            return [verdicts[idx] for idx in group.index]
+        
+        print("  No entries match the criteria. Using default duplicate removal (keeping newest).")
+    else:
+        print("  No matching entries in the auction file. Using default duplicate removal (keeping newest).")
+    
+    # Use default behavior: keep newest application
+    newest_idx = group['申請日期'].idxmax()
+    
+    for idx in group.index:
+        if idx != newest_idx:
+            print(f"  Row {df_ipo.index.get_loc(idx) + 1}: REMOVE (older application)")
+        else:
+            print(f"  Row {df_ipo.index.get_loc(idx) + 1}: KEEP (newest application)")
+    return [(idx == newest_idx, None) for idx in group.index]
+
+def months_between(later, earlier):
+    """
+    Whole months from earlier to later, element-wise; the same as
+    relativedelta(later, earlier).years * 12 + .months when later > earlier.
+    """
+    import numpy as np
+
+    months = (later.dt.year - earlier.dt.year) * 12 + (later.dt.month - earlier.dt.month)
+    # earlier + months lands in later's month, with the day clipped to that month's length
+    landing_day = np.minimum(earlier.dt.day, later.dt.days_in_month)
+    later_time = later - later.dt.normalize()
+    earlier_time = earlier - earlier.dt.normalize()
+    overshoot = (later.dt.day < landing_day) | ((later.dt.day == landing_day) & (later_time < earlier_time))
+    return months - overshoot.astype(int)
+
+def decide_groups(df_ipo, duplicates, df_auction):
+    """
+    Batched version of decide_group for many duplicate groups at once: the IPO
+    rows are merged with the auction rows on 股票代號, month differences are
+    computed column-wise and the keep/remove decision is made per group.
+
+    Args:
+        df_ipo (pandas.DataFrame): The whole IPO data (used for row numbers)
+        duplicates (pandas.DataFrame): IPO rows of the stock codes to decide
+        df_auction (pandas.DataFrame): Auction data
+
+    Returns:
+        dict: stock code -> (verdicts, lines), where verdicts lists (keep, matched
+        auction date or None) in group order and lines is the printed reasoning
+    """
+    import numpy as np
+    import pandas as pd
+
+    ipo = pd.DataFrame({
+        '股票代號': duplicates['股票代號'].to_numpy(),
+        'ipo_idx': duplicates.index.to_numpy(),
+        'row': df_ipo.index.get_indexer(duplicates.index) + 1,
+        'ipo_date': duplicates['申請日期'].to_numpy(),
+    })
+    ipo['ipo_order'] = np.arange(len(ipo))
+    auction = pd.DataFrame({
+        '股票代號': df_auction['股票代號'].to_numpy(),
+        'auction_date': df_auction['開標日期'].to_numpy(),
+        'auction_order': np.arange(len(df_auction)),
+    })
+    auction = auction[auction['股票代號'].isin(ipo['股票代號'].unique())]
+    auction_counts = auction.groupby('股票代號').size().to_dict()
+
+    # Every IPO row against every auction row of its stock code, in the order the loop visited them
+    pairs = ipo.merge(auction, on='股票代號', how='inner')
+    pairs = pairs.sort_values(['ipo_order', 'auction_order'], kind='stable')
+    after = (pairs['auction_date'] > pairs['ipo_date']).to_numpy()
+    months = months_between(pairs['auction_date'], pairs['ipo_date']).where(after)
+    pairs['months'] = months
+    pairs['keep'] = after & (months <= 12).to_numpy()
+
+    # First matching auction date of every kept IPO row
+    kept = pairs[pairs['keep']].drop_duplicates('ipo_idx')
+    matched = dict(zip(kept['ipo_idx'].tolist(), date_normalizer.iso_strings(kept['auction_date'])))
+    codes_with_keep = set(kept['股票代號'].tolist())
+
+    # Per pair reasoning, only printed for groups where some row is kept
+    pairs = pairs[pairs['股票代號'].isin(codes_with_keep)]
+    after = pairs['auction_date'] > pairs['ipo_date']
+    lines_by_pair = [
+        f"  Row {row}: Application Date: {ipo_date}, Auction Date: {auction_date}, "
+        + (f"Difference: {int(m)} months - KEEP (auction date within 12 months after application)" if keep
+           else "REMOVE (auction date more than 12 months after application)" if is_after
+           else "REMOVE (auction date before application date)")
+        for row, ipo_date, auction_date, m, keep, is_after in zip(
+            pairs['row'].tolist(), date_normalizer.iso_strings(pairs['ipo_date']), date_normalizer.iso_strings(pairs['auction_date']),
+            pairs['months'].tolist(), pairs['keep'].tolist(), after.tolist())
+    ]
+    pair_positions = pairs.groupby('股票代號', sort=False).indices
+
+    # Default rule: keep the newest application of the group
+    newest = duplicates.groupby('股票代號')['申請日期'].idxmax().to_dict()
+
+    ipo_indexes = ipo['ipo_idx'].tolist()
+    ipo_rows = ipo['row'].tolist()
+    results = {}
+    for code, positions in ipo.groupby('股票代號', sort=False).indices.items():
+        group_idx = [ipo_indexes[i] for i in positions]
+        n_auction = auction_counts.get(code, 0)
+        if code in codes_with_keep:
+            lines = [f"  Found {n_auction} matching entries in the auction file"] + [lines_by_pair[i] for i in pair_positions[code]]
+            verdicts = [(idx in matched, matched.get(idx)) for idx in group_idx]
+        else:
+            if n_auction > 0:
+                lines = [f"  Found {n_auction} matching entries in the auction file",
+                         "  No entries match the criteria. Using default duplicate removal (keeping newest)."]
+            else:
+                lines = ["  No matching entries in the auction file. Using default duplicate removal (keeping newest)."]
+            newest_idx = newest[code]
+            lines += [f"  Row {ipo_rows[i]}: KEEP (newest application)" if idx == newest_idx
+                      else f"  Row {ipo_rows[i]}: REMOVE (older application)"
+                      for i, idx in zip(positions, group_idx)]
+            verdicts = [(idx == newest_idx, None) for idx in group_idx]
+        results[code] = (verdicts, lines)
+    return results
+
+def remove_duplicates(df_ipo, df_auction, decisions=None):
+    """
+    Removes duplicate stock codes from the IPO data based on complex rules.
+    Both dataframes get their date columns converted in place.
+
+    With decisions (a dict kept between runs) only the stock codes whose IPO
+    rows or auction rows changed since the previous run are re-evaluated; the
+    others reuse their stored keep/remove verdicts.
+
+    Args:
+        df_ipo (pandas.DataFrame): IPO data (TWSE_TPEX-IPO-utf8-filter-sort.csv)
+        df_auction (pandas.DataFrame): Auction data
+        decisions (dict, optional): Per stock code decisions, updated in place
+
+    Returns:
+        pandas.DataFrame: The cleaned IPO data, or df_ipo itself if there were no duplicates
+    """
+    print(f"Auction dataset: {len(df_auction)} rows")
+    
+    # Convert date columns to datetime for proper comparison
+    convert_dates(df_ipo, '申請日期')
+    convert_dates(df_auction, '開標日期')
+    convert_codes(df_ipo)
+    convert_codes(df_auction)
+    
+    # Find duplicates in the IPO file
+    # Stable, so each group keeps the file order (newest filing first) whatever the code dtype
+    duplicates = df_ipo[df_ipo.duplicated('股票代號', keep=False)].sort_values('股票代號', kind='stable')
+    
+    if not duplicates.empty:
+        print(f"\nFound {len(duplicates)} rows with duplicate stock codes ({len(duplicates['股票代號'].unique())} unique codes)")
+        
+        # Create a copy of the original IPO dataframe to mark which rows to keep
+        df_ipo['keep_row'] = True
+        
+        groups = duplicates.groupby('股票代號')
+        
+        # With stored decisions only stock codes whose inputs changed are re-evaluated
+        keys = {}
+        pending = []
+        if decisions is not None:
+            auction_dates = df_auction.groupby('股票代號')['開標日期']
+            auction_keys = {code: date_normalizer.iso_strings(dates) for code, dates in auction_dates}
+            for code, group in groups:
+                keys[code] = {"ipo": date_normalizer.iso_strings(group['申請日期']), "auction": auction_keys.get(code, [])}
+                cached = decisions.get(str(code))
+                if cached is None or cached["key"] != keys[code]:
+                    pending.append(code)
+        else:
+            pending = list(groups.groups)
+        
+        # Decide all pending groups in one batch
+        decided = decide_groups(df_ipo, duplicates[duplicates['股票代號'].isin(pending)], df_auction)
+        
+        # Process each duplicate group
+        reused = 0
+        remove_idx = []
+        for code, group in groups:
+            if code in decided:
+                verdicts, lines = decided[code]
+                print(f"\nProcessing duplicate stock code: {code} - {group['公司名稱'].iloc[0]}")
+                print("\n".join(lines))
+                if decisions is not None:
+                    decisions[str(code)] = {
+                        "key": keys[code],
+                        "rows": [{"keep": bool(keep), "auction_date": auction_date} for keep, auction_date in verdicts],
+                    }
+            else:
+                verdicts = [(row["keep"], row["auction_date"]) for row in decisions[str(code)]["rows"]]
+                reused += 1
+            remove_idx.extend(idx for idx, (keep, _) in zip(group.index, verdicts) if not keep)
+        df_ipo.loc[remove_idx, 'keep_row'] = False
+        
+        if decisions is not None:
+            # Forget stock codes that are no longer duplicated
+            current = {str(code) for code in duplicates['股票代號'].unique()}
+            for code in set(decisions) - current:
+                del decisions[code]
+            print(f"\nReused stored decisions for {reused} of {len(current)} duplicate stock codes")
+        
+        # Filter the dataframe to keep only the rows we want
+        df_ipo_cleaned = df_ipo[df_ipo['keep_row']].drop(columns=['keep_row'])
+        
+        # Count how many were removed
+        removed_count = len(df_ipo) - len(df_ipo_cleaned)
+        print(f"\nRemoved {removed_count} duplicate entries")
+        print(f"Final dataset: {len(df_ipo_cleaned)} rows")
+        
+        return df_ipo_cleaned
+    else:
+        print("No duplicates found based on stock code (股票代號).")
+        # Just keep the original data
+        return df_ipo
+
+
+# Columns remove_duplicates needs, loaded from a typed snapshot
+SNAPSHOT_COLUMNS = ['申請日期', '股票代號', '公司名稱']
+
+def load_snapshot_frame(snap):
+    """
+    Builds the dedupe input from a memory-mapped snapshot: 申請日期 is already
+    datetime64, 股票代號 the stock codes, so nothing is parsed.
+    
+    Args:
+        snap (snapshot.Snapshot): The sorted IPO table
+        
+    Returns:
+        pandas.DataFrame: The columns in SNAPSHOT_COLUMNS, indexed by row position
+    """
+    import numpy as np
+    import pandas as pd
+
+    df_ipo = pd.DataFrame({name: snap.series(name) for name in SNAPSHOT_COLUMNS})
+    # Plain values instead of a categorical, so the merge with the auction data stays a normal join
+    df_ipo['股票代號'] = np.asarray(df_ipo['股票代號'])
+    return df_ipo
+
+def write_snapshot_rows(snap, df_ipo_cleaned, output_file):
+    """Writes the snapshot rows kept in df_ipo_cleaned, as exported, to a CSV file."""
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(snap.header)
+        writer.writerows(snap.text_rows(df_ipo_cleaned.index.to_numpy()))
+
+def process_files(ipo_file, output_file, local_auction_file=None, df_auction=None, state_file=None,
+                  auction_source=GITHUB_AUCTION_URL, auction_ttl=DEFAULT_TTL):
     """
     Process IPO and auction files to remove duplicate stock codes based on complex rules.
     
     Args:
-        ipo_file (str): Path to the IPO CSV file (TWSE_TPEX-IPO-utf8-filter-sort.csv)
+        ipo_file (str): Path to the IPO CSV file (TWSE_TPEX-IPO-utf8-filter-sort.csv) or its .snapshot directory
         output_file (str): Path to save the cleaned CSV file
         local_auction_file (str, optional): Path to save downloaded auction file
+        df_auction (pandas.DataFrame, optional): Already loaded auction data; downloaded if omitted
+        state_file (str, optional): JSON file with the previous run's decisions (incremental mode)
+        auction_source (str): URL, file:// URL or local path of the auction data
+        auction_ttl (float): Seconds a cached auction download is used without revalidating it
     """
+    import pandas as pd
+
     try:
-        # Load the IPO CSV file
+        # Load the IPO CSV file, or its typed snapshot
         print(f"Loading IPO file: {ipo_file}")
-        df_ipo = pd.read_csv(ipo_file, encoding='utf-8')
+        with instrument.stage("load") as stage:
+            snap = snapshot.Snapshot(ipo_file) if snapshot.is_snapshot(ipo_file) else None
+            df_ipo = load_snapshot_frame(snap) if snap else pd.read_csv(ipo_file, encoding='utf-8')
+            stage.add_rows(rows_out=len(df_ipo))
         print(f"Original IPO dataset: {len(df_ipo)} rows")
         
         # Download and load the auction data
-        df_auction = download_auction_data(local_file=local_auction_file)
+        if df_auction is None:
+            with instrument.stage("auction"):
+                df_auction = download_auction_data(auction_source, local_file=local_auction_file, ttl=auction_ttl)
         if df_auction is None:
             print("Failed to download auction data. Exiting.")
             return False
         
-        print(f"Auction dataset: {len(df_auction)} rows")
+        # Decisions are stored per output file, so both workflow runs can share one state file
+        state = load_decisions(state_file) if state_file else None
+        decisions = state.setdefault(os.path.basename(output_file), {}) if state is not None else None
         
-        # Convert date columns to datetime for proper comparison
-        convert_dates(df_ipo, '申請日期')
-        convert_dates(df_auction, '開標日期')
+        with instrument.stage("dedupe") as stage:
+            df_ipo_cleaned = remove_duplicates(df_ipo, df_auction, decisions)
+            stage.add_rows(rows_in=len(df_ipo), rows_out=len(df_ipo_cleaned))
         
-        # Find duplicates in the IPO file
-        duplicates = df_ipo[df_ipo.duplicated('股票代號', keep=False)].sort_values('股票代號')
+        if state_file:
+            save_decisions(state, state_file)
         
-        if not duplicates.empty:
-            print(f"\nFound {len(duplicates)} rows with duplicate stock codes ({len(duplicates['股票代號'].unique())} unique codes)")
-            
-            # Create a copy of the original IPO dataframe to mark which rows to keep
-            df_ipo['keep_row'] = True
-            
-            # Process each duplicate group
-            for code, group in duplicates.groupby('股票代號'):
-                print(f"\nProcessing duplicate stock code: {code} - {group['公司名稱'].iloc[0]}")
-                
-                # Check if this stock code exists in the auction file
-                auction_entries = df_auction[df_auction['股票代號'] == code]
-                
-                if len(auction_entries) > 0:
-                    print(f"  Found {len(auction_entries)} matching entries in the auction file")
-                    
-                    # Find the row to keep based on the complex rule
-                    rows_to_process = []
-                    
-                    for ipo_idx, ipo_row in group.iterrows():
-                        ipo_date = ipo_row['申請日期']
-                        
-                        # Check each auction entry
-                        for auction_idx, auction_row in auction_entries.iterrows():
-                            auction_date = auction_row['開標日期']
-                            
-                            # Check if auction date is after IPO application date
-                            if auction_date > ipo_date:
-                                # Check if difference is within 12 months
-                                diff = relativedelta(auction_date, ipo_date)
-                                months_diff = diff.years * 12 + diff.months
-                                
-                                if months_diff <= 12:
-                                    status = "KEEP (auction date within 12 months after application)"
-                                    rows_to_process.append((ipo_idx, True, ipo_date, auction_date, months_diff, status))
-                                else:
-                                    status = "REMOVE (auction date more than 12 months after application)"
-                                    rows_to_process.append((ipo_idx, False, ipo_date, auction_date, months_diff, status))
-                            else:
-                                status = "REMOVE (auction date before application date)"
-                                rows_to_process.append((ipo_idx, False, ipo_date, auction_date, None, status))
-                    
-                    # If we have valid entries to keep
-                    if any(keep for _, keep, _, _, _, _ in rows_to_process):
-                        # Mark all rows in this group for removal first
-                        for idx in group.index:
-                            df_ipo.loc[idx, 'keep_row'] = False
-                        
-                        # Then mark the ones we want to keep
-                        for idx, keep, ipo_date, auction_date, months_diff, status in rows_to_process:
-                            if keep:
-                                df_ipo.loc[idx, 'keep_row'] = True
-                                print(f"  Row {df_ipo.index.get_loc(idx) + 1}: Application Date: {ipo_date.strftime('%Y-%m-%d')}, "
-                                      f"Auction Date: {auction_date.strftime('%Y-%m-%d')}, "
-                                      f"Difference: {months_diff} months - {status}")
-                            else:
-                                print(f"  Row {df_ipo.index.get_loc(idx) + 1}: Application Date: {ipo_date.strftime('%Y-%m-%d')}, "
-                                      f"Auction Date: {auction_date.strftime('%Y-%m-%d')}, "
-                                      f"{status}")
-                    else:
-                        print("  No entries match the criteria. Using default duplicate removal (keeping newest).")
-                        # Use default behavior: keep newest application
-                        newest_idx = group['申請日期'].idxmax()
-                        
-                        for idx in group.index:
-                            if idx != newest_idx:
-                                df_ipo.loc[idx, 'keep_row'] = False
-                                print(f"  Row {df_ipo.index.get_loc(idx) + 1}: REMOVE (older application)")
-                            else:
-                                print(f"  Row {df_ipo.index.get_loc(idx) + 1}: KEEP (newest application)")
-                else:
-                    print("  No matching entries in the auction file. Using default duplicate removal (keeping newest).")
-                    # Use default behavior: keep newest application
-                    newest_idx = group['申請日期'].idxmax()
-                    
-                    for idx in group.index:
-                        if idx != newest_idx:
-                            df_ipo.loc[idx, 'keep_row'] = False
-                            print(f"  Row {df_ipo.index.get_loc(idx) + 1}: REMOVE (older application)")
-                        else:
-                            print(f"  Row {df_ipo.index.get_loc(idx) + 1}: KEEP (newest application)")
-            
-            # Filter the dataframe to keep only the rows we want
-            df_ipo_cleaned = df_ipo[df_ipo['keep_row']].drop(columns=['keep_row'])
-            
-            # Count how many were removed
-            removed_count = len(df_ipo) - len(df_ipo_cleaned)
-            print(f"\nRemoved {removed_count} duplicate entries")
-            print(f"Final dataset: {len(df_ipo_cleaned)} rows")
-            
-            # Save the clean dataset to a new file
-            df_ipo_cleaned.to_csv(output_file, index=False, encoding='utf-8')
-            print(f"Saved clean data to {output_file}")
-        else:
-            print("No duplicates found based on stock code (股票代號).")
-            # Just save the original file
-            df_ipo.to_csv(output_file, index=False, encoding='utf-8')
+        # Save the clean dataset to a new file
+        with instrument.stage("write") as stage:
+            if snap:
+                write_snapshot_rows(snap, df_ipo_cleaned, output_file)
+            else:
+                df_ipo_cleaned.to_csv(output_file, index=False, encoding='utf-8')
+            stage.add_rows(rows_out=len(df_ipo_cleaned))
+        if df_ipo_cleaned is df_ipo:
             print(f"Saved data to {output_file}")
+        else:
+            print(f"Saved clean data to {output_file}")
         
         return True
     
@@ -175,6 +439,24 @@ def process_files(ipo_file, output_file, local_auction_file=None):
         print(f"Error: {e}")
         return False
 
+def convert_codes(df, code_column='股票代號'):
+    """
+    Converts the stock code column to text, so the IPO and auction codes
+    compare equal however they were read: pandas.read_csv and the snapshot
+    give int64 when every code is numeric and text otherwise (e.g. with a KY
+    code among them).
+    
+    Args:
+        df (pandas.DataFrame): The dataframe containing the code column
+        code_column (str): The name of the code column to convert
+    """
+    import pandas as pd
+
+    if pd.api.types.is_string_dtype(df[code_column]):
+        # Already text (e.g. auction data shared between several runs)
+        return
+    df[code_column] = df[code_column].astype(str)
+
 def convert_dates(df, date_column):
     """
     Converts a date column in a dataframe to datetime format.
@@ -183,46 +465,39 @@ def convert_dates(df, date_column):
         df (pandas.DataFrame): The dataframe containing the date column
         date_column (str): The name of the date column to convert
     """
-    try:
-        # Get sample date for format detection
-        date_samples = df[date_column].head(5).tolist()
-        print(f"{date_column} format samples: {date_samples}")
-        
-        # Try to determine date format (assuming it's consistent)
-        sample_date = df[date_column].iloc[0]
-        if '/' in sample_date:
-            # Format like YY/MM/DD or YYYY/MM/DD
-            if len(sample_date.split('/')[0]) == 2:
-                df[date_column] = pd.to_datetime(df[date_column], format='%y/%m/%d', errors='coerce')
-            else:
-                df[date_column] = pd.to_datetime(df[date_column], format='%Y/%m/%d', errors='coerce')
-        elif '-' in sample_date:
-            # Format like YYYY-MM-DD
-            df[date_column] = pd.to_datetime(df[date_column], format='%Y-%m-%d', errors='coerce')
-        else:
-            # Try automatic parsing
-            df[date_column] = pd.to_datetime(df[date_column], errors='coerce')
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(df[date_column]):
+        # Already converted (e.g. auction data shared between several runs)
+        return
     
-    except Exception as e:
-        print(f"Error determining date format for {date_column}, trying automatic parsing: {e}")
-        df[date_column] = pd.to_datetime(df[date_column], errors='coerce')
+    # Get sample date for format detection
+    date_samples = df[date_column].head(5).tolist()
+    print(f"{date_column} format samples: {date_samples}")
+    
+    # The format is guessed from the first value and every distinct date is parsed once
+    df[date_column] = date_normalizer.parse_column(df[date_column])
     
     # Check for any parsing failures
     if df[date_column].isna().any():
         print(f"Warning: {df[date_column].isna().sum()} dates in {date_column} could not be parsed.")
 
-def main():
+def main(argv=None):
     # Set up command line argument parsing
     parser = argparse.ArgumentParser(description='Remove duplicate stock codes based on IPO and auction data.')
-    parser.add_argument('ipo_file', help='Path to the IPO CSV file (TWSE_TPEX-IPO-utf8-filter-sort.csv)')
+    parser.add_argument('ipo_file', help='Path to the IPO CSV file (TWSE_TPEX-IPO-utf8-filter-sort.csv) or its .snapshot directory')
     parser.add_argument('output_file', help='Path to save the cleaned CSV file')
     parser.add_argument('--save-auction', help='Optional path to save the downloaded auction file', default=None)
+    parser.add_argument('--auction-source', help='URL, file:// URL or local path of the auction data', default=GITHUB_AUCTION_URL)
+    parser.add_argument('--auction-ttl', type=float, help='Seconds a cached auction download is used without revalidating it', default=DEFAULT_TTL)
+    parser.add_argument('--state', help='Incremental mode: reuse and update the decisions stored in this JSON file', default=None)
     
     # Parse arguments
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Run the processing function
-    success = process_files(args.ipo_file, args.output_file, args.save_auction)
+    success = process_files(args.ipo_file, args.output_file, args.save_auction, state_file=args.state,
+                            auction_source=args.auction_source, auction_ttl=args.auction_ttl)
     
     # Exit with appropriate code
     sys.exit(0 if success else 1)
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+# Stored next to the badge JSONs so the workflow commits it along with them
+CACHE_FILE = "fetch-cache.json"
+
+
+def content_hash(content):
+    """Returns the SHA-256 hex digest of the raw source bytes."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def load_cache(path=CACHE_FILE):
+    """Loads the fetch cache, returning an empty cache if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (ValueError, OSError) as e:
+        print(f"Ignoring unreadable fetch cache '{path}': {e}")
+        return {}
+
+
+def write_atomic(path, content):
+    """Writes bytes to path through a temporary file and an atomic rename."""
+    tmp_path = f"{path}.part"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def save_cache(cache, path=CACHE_FILE):
+    """Writes the fetch cache atomically."""
+    tmp_path = f"{path}.part"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=4, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def validators(entry):
+    """Returns the conditional request headers for a cache entry."""
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def update(cache, name, content, headers=None):
+    """
+    Records the validators and content hash of a freshly fetched source.
+
+    Returns:
+        bool: True if the content differs from the previously cached bytes
+    """
+    headers = headers or {}
+    digest = content_hash(content)
+    previous = cache.get(name, {})
+    changed = previous.get("sha256") != digest
+    cache[name] = {
+        "sha256": digest,
+        "size": len(content),
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        # Only bumped when the bytes change, so an unchanged day leaves the file untouched
+        "changed": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') if changed else previous.get("changed"),
+    }
+    return changed
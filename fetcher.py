@@ -0,0 +1,257 @@
+import argparse
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fetch_cache
+import instrument
+
+# Exit status when every source was fetched and none of them changed
+EXIT_UNCHANGED = 3
+
+# Exchange sources. "url" is the CSV endpoint the page's download button calls,
+# "page"/"button" are only used by the Selenium fallback backend.
+SOURCES = {
+    "TPEX": {
+        "page": "https://www.tpex.org.tw/zh-tw/mainboard/applying/status/company.html",
+        "button": "button[data-format='csv-u8']",
+        "url": os.environ.get("TPEX_CSV_URL", "https://www.tpex.org.tw/www/zh-tw/company/applyingStatus?response=csv-u8"),
+        "file": "TPEX-IPO-utf8.csv",
+    },
+    "TWSE": {
+        "page": "https://www.twse.com.tw/zh/listed/listed/apply-listing.html",
+        "button": "button[class='csv']",
+        "url": os.environ.get("TWSE_CSV_URL", "https://www.twse.com.tw/rwd/zh/company/applylisting?response=csv"),
+        "file": "applylisting.csv",
+    },
+}
+
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "text/csv,application/octet-stream,*/*",
+}
+
+
+def source_url(source, base_url=None):
+    """
+    Returns the CSV URL of a source. With base_url (e.g. a local stub server)
+    the file name of the source is resolved against it instead.
+    """
+    if base_url:
+        return base_url.rstrip('/') + '/' + source["file"]
+    return source["url"]
+
+
+class HttpFetcher:
+    """Downloads the CSV endpoints directly over HTTP without a browser."""
+
+    name = "http"
+
+    def __init__(self, base_url=None, timeout=30):
+        import requests
+        self.requests = requests
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def fetch(self, source, validators=None):
+        """
+        Returns (content, response headers); content is None when the server
+        answered 304 Not Modified to the conditional request.
+        """
+        url = source_url(source, self.base_url)
+        headers = dict(HTTP_HEADERS, **(validators or {}))
+        # One request per call so sources can be fetched from several threads
+        response = self.requests.get(url, headers=headers, timeout=source.get("timeout", self.timeout))
+        if response.status_code == 304:
+            print(f"Not modified: {url}")
+            return None, response.headers
+        response.raise_for_status()
+        if not response.content.strip():
+            raise ValueError(f"Empty response from {url}")
+        if b"<html" in response.content[:512].lower():
+            raise ValueError(f"Got an HTML page instead of CSV from {url}")
+
+        print(f"Downloaded {url} ({len(response.content)} bytes)")
+        return response.content, response.headers
+
+    def close(self):
+        pass
+
+
+class SeleniumFetcher:
+    """
+    Fallback backend: clicks the download buttons in a real Chrome (selenium_download.py).
+    All sources share one browser session; calls from several threads are serialized.
+    Downloads land in a private directory so an unchanged file never overwrites
+    the processed copy in the output directory.
+    """
+
+    name = "selenium"
+
+    def __init__(self):
+        self.manager = None
+        self.download_dir = None
+        self.lock = threading.Lock()
+
+    def fetch(self, source, validators=None):
+        with self.lock:
+            import selenium_download
+            from driver_manager import DriverManager
+
+            if self.manager is None:
+                self.download_dir = tempfile.mkdtemp(prefix="ipo-download-")
+                self.manager = DriverManager(f"{self.download_dir}//")
+            path = self.manager.run(lambda driver: selenium_download.download_csv(
+                driver, source["page"], source["button"], source["file"], f"{self.download_dir}//"))
+            with open(path, 'rb') as f:
+                content = f.read()
+            os.remove(path)
+            return content, {}
+
+    def close(self):
+        if self.manager is not None:
+            self.manager.close()
+            self.manager = None
+        if self.download_dir is not None:
+            shutil.rmtree(self.download_dir, ignore_errors=True)
+            self.download_dir = None
+
+
+BACKENDS = {
+    "http": HttpFetcher,
+    "selenium": SeleniumFetcher,
+}
+
+
+def make_backends(backend="auto", base_url=None, timeout=30):
+    """Returns the backends to try in order; "auto" is HTTP with Selenium as fallback."""
+    if backend == "auto":
+        names = ["http", "selenium"]
+    else:
+        names = [backend]
+    backends = []
+    for name in names:
+        if name == "http":
+            backends.append(HttpFetcher(base_url=base_url, timeout=timeout))
+        else:
+            backends.append(BACKENDS[name]())
+    return backends
+
+
+def fetch_source(name, backends, output_dir=".", retries=2, cache=None, backoff=1.0):
+    """
+    Fetches one source, retrying each backend before falling back to the next one.
+    With a cache, conditional request headers are sent and the file is only
+    rewritten when its content hash changed.
+
+    Returns:
+        dict: name, path (None on failure), changed, backend, attempts and latency in seconds
+    """
+    with instrument.stage(f"fetch {name}", quiet=True):
+        return _fetch_source(name, backends, output_dir, retries, cache, backoff)
+
+
+def _fetch_source(name, backends, output_dir, retries, cache, backoff):
+    source = SOURCES[name]
+    path = os.path.join(output_dir, source["file"])
+    entry = cache.get(name) if cache is not None and os.path.exists(path) else None
+    result = {"name": name, "path": None, "changed": False, "backend": None, "attempts": 0, "latency": 0.0}
+    start = time.perf_counter()
+    for backend in backends:
+        for attempt in range(retries + 1):
+            result["attempts"] += 1
+            try:
+                content, headers = backend.fetch(source, fetch_cache.validators(entry))
+            except Exception as e:
+                print(f"Error fetching {name} with {backend.name} backend (attempt {attempt + 1}): {e}")
+                if attempt < retries:
+                    time.sleep(backoff * (2 ** attempt))
+                continue
+
+            if content is None:
+                result["changed"] = False
+            elif cache is None:
+                result["changed"] = True
+            else:
+                result["changed"] = fetch_cache.update(cache, name, content, headers) or entry is None
+            if result["changed"]:
+                fetch_cache.write_atomic(path, content)
+                print(f"Saved {path}")
+            else:
+                print(f"{name} unchanged, keeping {path}")
+            result["path"] = path
+            result["backend"] = backend.name
+            result["latency"] = time.perf_counter() - start
+            return result
+    result["latency"] = time.perf_counter() - start
+    return result
+
+
+def fetch_all(names, backends, output_dir=".", retries=2, max_workers=None, cache=None):
+    """Fetches all sources concurrently and returns their results in the order of names."""
+    with ThreadPoolExecutor(max_workers=max_workers or len(names) or 1) as executor:
+        futures = [executor.submit(fetch_source, name, backends, output_dir, retries, cache) for name in names]
+        return [future.result() for future in futures]
+
+
+def set_github_output(key, value):
+    """Exposes a step output when running inside GitHub Actions."""
+    output = os.environ.get("GITHUB_OUTPUT")
+    if output:
+        with open(output, 'a', encoding='utf-8') as f:
+            f.write(f"{key}={value}\n")
+
+
+def print_report(results):
+    """Prints per-source latency so a slow exchange shows up in the job log."""
+    print("Source   Backend    Attempts  Latency(s)  Status")
+    for r in sorted(results, key=lambda r: r["latency"], reverse=True):
+        status = ("CHANGED" if r["changed"] else "UNCHANGED") if r["path"] else "FAILED"
+        print(f"{r['name']:<8} {r['backend'] or '-':<10} {r['attempts']:>8}  {r['latency']:>10.2f}  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Download the TPEX and TWSE IPO application CSV files.')
+    parser.add_argument('sources', nargs='*', default=list(SOURCES), help='Sources to fetch (default: all)')
+    parser.add_argument('--backend', choices=['auto'] + list(BACKENDS), default='auto',
+                        help='Fetch backend; auto tries http first and falls back to selenium')
+    parser.add_argument('--base-url', default=None,
+                        help='Resolve source file names against this URL instead of the exchange endpoints')
+    parser.add_argument('--output-dir', default='.', help='Directory to write the CSV files to')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-source HTTP timeout in seconds')
+    parser.add_argument('--retries', type=int, default=2, help='Retries per source and backend')
+    parser.add_argument('--workers', type=int, default=None, help='Number of sources fetched at the same time')
+    parser.add_argument('--cache', default=None,
+                        help=f'Fetch cache file (default: {fetch_cache.CACHE_FILE} in the output directory)')
+    parser.add_argument('--force', action='store_true', help='Ignore the cached validators and rewrite every source')
+    args = parser.parse_args(argv)
+
+    cache_path = args.cache or os.path.join(args.output_dir, fetch_cache.CACHE_FILE)
+    cache = {} if args.force else fetch_cache.load_cache(cache_path)
+    backends = make_backends(args.backend, args.base_url, args.timeout)
+    try:
+        results = fetch_all(args.sources, backends, args.output_dir, args.retries, args.workers, cache)
+    finally:
+        for backend in backends:
+            backend.close()
+    fetch_cache.save_cache(cache, cache_path)
+
+    print_report(results)
+    failed = [r["name"] for r in results if r["path"] is None]
+    changed = any(r["changed"] for r in results)
+    set_github_output("changed", "true" if changed or failed else "false")
+    if failed:
+        print(f"Failed to fetch: {', '.join(failed)}")
+        sys.exit(1)
+    if not changed:
+        print("Nothing changed since the last run.")
+        sys.exit(EXIT_UNCHANGED)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
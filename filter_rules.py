@@ -0,0 +1,93 @@
+import json
+import os
+import re
+import sys
+from collections import Counter
+
+# Rules used by csv-filter.py and the pipeline, next to the scripts
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "filter-rules.json")
+
+# Fallback when the rules file is missing
+DEFAULT_RULES = {
+    # row[11]("備註") must not contain any of these keywords
+    "keyword_column": 11,
+    "forbidden_keywords": [
+        "自撤", "自行撤件", "撤件", "退件", "已下櫃",
+        "管理股票", "撤銷上市", "撤銷上櫃", "重新審議", "退回"
+    ],
+    # row[0]("申請日期") must be a YYYY/MM/DD date within [min_year, max_year] (null: no bound)
+    "date_column": 0,
+    "min_year": 2000,
+    "max_year": None,
+}
+
+# Leading four-digit year of a YYYY/MM/DD (or YYYY-MM-DD, YYYYMMDD) date
+YEAR_PATTERN = re.compile(r'\s*(\d{4})(?:[/-]|\d{4})')
+
+
+def load_rules(path=RULES_FILE):
+    """
+    Loads the filter rules from a JSON file; missing keys fall back to DEFAULT_RULES.
+
+    Returns:
+        dict: The rules
+    """
+    rules = dict(DEFAULT_RULES)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            rules.update(json.load(f))
+    except FileNotFoundError:
+        print(f"Rules file '{path}' not found, using the default rules", file=sys.stderr)
+    return rules
+
+
+class RowFilter:
+    """
+    Keyword and year-range predicate compiled once from the rules.
+
+    The forbidden keywords become a single alternation regex (longest first, so
+    the reported keyword is the most specific one), and the year check parses the
+    year of the date column instead of searching it for each allowed year.
+    Every rejected row is counted under the first rule that rejected it.
+    """
+
+    def __init__(self, rules=None):
+        rules = rules if rules is not None else load_rules()
+        self.keyword_column = rules["keyword_column"]
+        self.date_column = rules["date_column"]
+        self.min_year = rules["min_year"]
+        self.max_year = rules["max_year"]
+        keywords = sorted(rules["forbidden_keywords"], key=len, reverse=True)
+        self.keywords = re.compile('|'.join(map(re.escape, keywords))) if keywords else None
+        self.width = max(self.keyword_column, self.date_column) + 1
+        self.hits = Counter()
+
+    def reject(self, row):
+        """Returns the name of the first rule rejecting row, or None if the row is kept."""
+        if len(row) < self.width:
+            return "short row"
+        if self.keywords is not None:
+            match = self.keywords.search(row[self.keyword_column])
+            if match:
+                return f"keyword {match.group()}"
+        match = YEAR_PATTERN.match(row[self.date_column])
+        if not match:
+            return "no date"
+        year = int(match.group(1))
+        if self.min_year is not None and year < self.min_year:
+            return f"before {self.min_year}"
+        if self.max_year is not None and year > self.max_year:
+            return f"after {self.max_year}"
+        return None
+
+    def __call__(self, row):
+        """Returns True if row passes every rule, counting the hit either way."""
+        rule = self.reject(row)
+        self.hits[rule or "kept"] += 1
+        return rule is None
+
+    def report(self, file=None):
+        """Prints the per-rule hit counts, most frequent first."""
+        file = file or sys.stdout
+        for rule, count in self.hits.most_common():
+            print(f"  {count:>6}  {rule}", file=file)
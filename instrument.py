@@ -0,0 +1,198 @@
+"""
+Stage timing shared by the scripts: wall time, CPU time, peak RSS and rows
+in/out per stage, written to a JSON run report and optionally profiled.
+
+    with instrument.stage("convert") as s:
+        ...
+        s.add_rows(rows_in=len(raw), rows_out=len(converted))
+
+Every process appends its stages to the report named by IPO_RUN_REPORT (or
+instrument.configure(report=...)), so the scripts of one workflow run end up
+in one file. With IPO_PROFILE_DIR set each stage is also run under cProfile
+and dumped to <dir>/<script>-<stage>.prof.
+"""
+import atexit
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_ENV = "IPO_RUN_REPORT"
+PROFILE_ENV = "IPO_PROFILE_DIR"
+
+_settings = {"report": os.environ.get(REPORT_ENV), "profile": os.environ.get(PROFILE_ENV), "script": None}
+_records = []
+_lock = threading.Lock()
+_active = threading.local()
+_started = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def configure(report=None, profile=None, script=None):
+    """
+    Sets the run report path and/or the cProfile directory (overriding the
+    environment), and the script name the stages are recorded under.
+    """
+    if report:
+        _settings["report"] = report
+    if profile:
+        _settings["profile"] = profile
+    if script:
+        _settings["script"] = script
+
+
+def script_name():
+    if _settings["script"]:
+        return _settings["script"]
+    return os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Stage:
+    """One timed stage; use through instrument.stage()."""
+
+    def __init__(self, name, quiet=False):
+        self.name = name
+        self.quiet = quiet
+        self.rows_in = None
+        self.rows_out = None
+        self.profiler = None
+
+    def add_rows(self, rows_in=None, rows_out=None):
+        """Adds to the rows this stage read and/or wrote."""
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + rows_in
+        if rows_out is not None:
+            self.rows_out = (self.rows_out or 0) + rows_out
+
+    def __enter__(self):
+        # Only outermost stages are profiled, a thread can run one profiler at a time
+        if _settings["profile"] and not self.stack():
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.stack().append(self)
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        self.stack().pop()
+        if self.profiler:
+            self.profiler.disable()
+            os.makedirs(_settings["profile"], exist_ok=True)
+            self.profiler.dump_stats(os.path.join(_settings["profile"], f"{script_name()}-{self.name}.prof"))
+        record = {
+            "script": script_name(),
+            "stage": self.name,
+            "status": "error" if exc_type else "ok",
+            "wall_s": round(wall, 4),
+            # Process CPU time, so threads running at the same time are all included
+            "cpu_s": round(cpu, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+        }
+        add_records([record])
+        if not self.quiet:
+            rss = f", peak RSS {record['peak_rss_mb']:.0f} MB" if record["peak_rss_mb"] is not None else ""
+            print(f"== {self.name} {'failed' if exc_type else 'done'} in {wall:.2f}s (cpu {cpu:.2f}s{rss})")
+        return False
+
+    @staticmethod
+    def stack():
+        if not hasattr(_active, "stack"):
+            _active.stack = []
+        return _active.stack
+
+
+def stage(name, quiet=False):
+    """Returns a context manager that times the enclosed code as one stage."""
+    return Stage(name, quiet)
+
+
+def current():
+    """The innermost active stage of this thread, or None."""
+    stack = Stage.stack()
+    return stack[-1] if stack else None
+
+
+def add_rows(rows_in=None, rows_out=None):
+    """Adds row counts to the innermost active stage, if any."""
+    active = current()
+    if active:
+        active.add_rows(rows_in, rows_out)
+
+
+def counted(rows, field="rows_in"):
+    """
+    Passes rows through, adding each one to the rows_in (or rows_out) of the
+    stage that is active while they are consumed.
+    """
+    active = current()
+    for row in rows:
+        if active:
+            setattr(active, field, (getattr(active, field) or 0) + 1)
+        yield row
+
+
+def records():
+    with _lock:
+        return list(_records)
+
+
+def add_records(new_records):
+    """Adds stage records to this process's report (also those a worker process handed back)."""
+    with _lock:
+        if new_records and not _settings.get("atexit"):
+            # The report is written once, when the process exits
+            atexit.register(write_report)
+            _settings["atexit"] = True
+        _records.extend(new_records)
+
+
+def take_records():
+    """Returns this process's stage records and forgets them, so a worker process can hand them to its parent."""
+    with _lock:
+        taken = list(_records)
+        del _records[:]
+        return taken
+
+
+def write_report(path=None):
+    """
+    Appends this process's stages to the JSON run report.
+
+    Returns:
+        str: The report path, or None if no report was requested
+    """
+    path = path or _settings["report"]
+    if not path or not _records:
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (FileNotFoundError, ValueError):
+        report = {"runs": []}
+    report["runs"].append({"script": script_name(), "started": _started, "stages": records()})
+    tmp_path = f"{path}.part"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
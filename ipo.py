@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+One command for every step of the IPO workflow:
+
+    python ipo.py fetch                  download the TWSE and TPEX lists (fetcher.py)
+    python ipo.py convert-twse           applylisting.csv -> TWSE-IPO-utf8.csv
+    python ipo.py convert-tpex IN OUT    YYYYMMDD -> YYYY/MM/DD
+    python ipo.py filter < IN > OUT      drop withdrawn/rejected filings
+    python ipo.py merge A B STACKED SORTED
+    python ipo.py dedupe IN OUT          remove duplicate stock codes
+    python ipo.py count OUT.json IN LABEL
+    python ipo.py render IN [ENCODING]   CSV -> Markdown table
+    python ipo.py transcode IN -o OUT    Big5/CP950 -> UTF-8, streamed
+    python ipo.py run                    the whole pipeline in one process
+    python ipo.py graph [--jobs N]       the same stages in parallel, skipping unchanged ones
+
+`python ipo.py <command> --help` shows the options of a command. Only the
+module of the command is imported, and pandas, numpy, Selenium and chardet
+are imported inside the functions that use them, so a command starts as fast
+as its own code allows. The former scripts (TWSE-IPO.py, csv-filter.py, ...)
+are thin wrappers around the same main() functions.
+"""
+import importlib
+import sys
+
+# command -> (module with a main(argv) function, description)
+COMMANDS = {
+    "fetch": ("fetcher", "Download the TWSE and TPEX IPO lists"),
+    "download": ("selenium_download", "Download both lists by clicking through Chrome"),
+    "convert-twse": ("twse_ipo", "Convert applylisting.csv (Big5, ROC dates) to TWSE-IPO-utf8.csv"),
+    "convert-tpex": ("convert_date_format", "Convert the TPEX dates to YYYY/MM/DD and quote every cell"),
+    "filter": ("csv_filter", "Filter a CSV on stdin by filter-rules.json"),
+    "merge": ("ipo_merge", "Stack the TWSE and TPEX tables and sort them"),
+    "dedupe": ("duplicate_remover", "Remove duplicate stock codes using the auction data"),
+    "count": ("CountCSVLine", "Write the row count of a CSV as a badge JSON"),
+    "badges": ("metrics", "Write every badge JSON from the pipeline manifest"),
+    "render": ("csv_to_md", "Print a CSV file as a Markdown table"),
+    "transcode": ("transcode", "Transcode a Big5/CP950 file to UTF-8 with fallbacks, in constant memory"),
+    "delta": ("delta_log", "Show the newest changes of the merged table"),
+    "analytics": ("analytics", "Update the aggregate tables (durations, underwriters, months, prices)"),
+    "query": ("ipo_query", "Query the deduplicated table, or serve the queries over HTTP"),
+    "run": ("pipeline", "Run the whole pipeline in one process"),
+    "graph": ("stage_graph", "Run the pipeline as a stage graph on a process pool, skipping unchanged stages"),
+}
+
+
+def usage():
+    lines = ["Usage: python ipo.py <command> [options]", "", "Commands:"]
+    lines += [f"  {name:<14}{description}" for name, (_, description) in COMMANDS.items()]
+    lines += ["", "Run 'python ipo.py <command> --help' for the options of a command."]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"Unknown command '{command}'\n\n{usage()}")
+        sys.exit(2)
+
+    module = importlib.import_module(COMMANDS[command][0])
+    # Usage messages and the run report name the command, not ipo.py
+    sys.argv = [f"ipo.py {command}"] + args
+    import instrument
+    instrument.configure(script=command)
+    # Most commands exit through sys.exit(); a returned status is passed on the same way
+    return module.main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
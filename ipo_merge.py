@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Stacks and sorts the TWSE and TPEX tables without csvkit:
+
+    python ipo_merge.py TWSE-IPO-utf8.csv TPEX-IPO-utf8.csv TWSE_TPEX-IPO-utf8.csv TWSE_TPEX-IPO-utf8-sort.csv
+
+replaces
+
+    csvstack TWSE-IPO-utf8.csv TPEX-IPO-utf8.csv > TWSE_TPEX-IPO-utf8.csv
+    csvsort -r TWSE_TPEX-IPO-utf8.csv > TWSE_TPEX-IPO-utf8-sort.csv
+
+The column types are fixed instead of inferred from the data: the date columns
+are dates, 股票代號 is a number and everything else is text, which is what
+csvsort infers for these tables. Rows are ordered by all columns descending
+(申請日期 first, 股票代號 as the tiebreak) with empty values first, like
+`csvsort -r`; each source is sorted on its own (usually it already is) and the
+two are k-way merged in one pass. Both tables are read into memory first, so
+memory grows with the table size like csvsort's did; the merge saves the
+re-sort of the stacked table, not memory.
+"""
+import csv
+import heapq
+import os
+import re
+import sys
+
+from snapshot import DATE_COLUMNS, write_snapshot
+
+NUMBER_COLUMNS = ["股票代號"]
+
+# Cells csvkit reads as empty (compared case-insensitively after stripping)
+NULL_VALUES = frozenset(['', 'na', 'n/a', 'none', 'null', '.'])
+
+DATE_PATTERN = re.compile(r'\s*(\d{4})[/-](\d{1,2})[/-](\d{1,2})\s*$')
+NUMBER_PATTERN = re.compile(r'\s*-?\d+(\.\d+)?\s*$')
+
+# Sort key part of an empty cell
+EMPTY = (1,)
+
+
+def normalize_date(value):
+    """YYYY/MM/DD -> YYYY-MM-DD; csvkit's null values -> ''; anything else unchanged."""
+    if value.strip().lower() in NULL_VALUES:
+        return ''
+    match = DATE_PATTERN.match(value)
+    if not match:
+        return value
+    year, month, day = match.groups()
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+
+def normalize_text(value):
+    return '' if value.strip().lower() in NULL_VALUES else value
+
+
+def number_key(value):
+    """Numbers sort by value; a non-numeric value sorts after every number."""
+    if NUMBER_PATTERN.match(value):
+        return (0, float(value), '')
+    return (1, 0.0, value)
+
+
+class Schema:
+    """Per column normalization and sort key of a stacked table header."""
+
+    def __init__(self, header):
+        self.header = header
+        self.normalizers = [normalize_date if name in DATE_COLUMNS else normalize_text for name in header]
+        self.numbers = [name in NUMBER_COLUMNS for name in header]
+
+    def normalize(self, row):
+        return [normalize(value) for normalize, value in zip(self.normalizers, row)]
+
+    def key(self, row):
+        """
+        Sort key of a normalized row. Each column is (1,) when empty and (0, value)
+        otherwise, so with a descending sort empty values come first and are never
+        compared to values.
+        """
+        return tuple(EMPTY if value == '' else (0, number_key(value) if number else value)
+                     for value, number in zip(row, self.numbers))
+
+
+def stack_tables(first, second):
+    """Stacks two tables like csvstack: union of the header names, missing cells left empty."""
+    header = list(first[0])
+    for field in second[0]:
+        if field not in header:
+            header.append(field)
+    stacked = [header]
+    for table in (first, second):
+        positions = [header.index(field) for field in table[0]]
+        for row in table[1:]:
+            if not row:
+                continue
+            out = [""] * len(header)
+            for position, value in zip(positions, row):
+                out[position] = value
+            stacked.append(out)
+    return stacked
+
+
+def sorted_run(rows, key):
+    """Returns rows in descending key order, only sorting if they are not already."""
+    keys = [key(row) for row in rows]
+    if all(a >= b for a, b in zip(keys, keys[1:])):
+        return rows
+    order = sorted(range(len(rows)), key=keys.__getitem__, reverse=True)
+    return [rows[i] for i in order]
+
+
+def merge_tables(first, second):
+    """
+    Stacks two tables and sorts the result descending by all columns.
+
+    Args:
+        first (list): First table, header row first (TWSE)
+        second (list): Second table, header row first (TPEX)
+
+    Returns:
+        tuple: (stacked, sorted) tables, header row first
+    """
+    stacked = stack_tables(first, second)
+    schema = Schema(stacked[0])
+    split = 1 + sum(1 for row in first[1:] if row)
+    runs = [sorted_run([schema.normalize(row) for row in part], schema.key)
+            for part in (stacked[1:split], stacked[split:])]
+    # heapq.merge prefers the earlier run on ties, so equal rows keep TWSE before TPEX
+    merged = list(heapq.merge(*runs, key=schema.key, reverse=True))
+    return stacked, [stacked[0]] + merged
+
+
+def read_table(path):
+    """Reads a CSV file (header first) the way csvstack does, in universal-newline mode."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def write_table(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows(rows)
+    print(f"Wrote {path}")
+
+
+def merge_files(first, second, stacked_file, sorted_file, snapshot_file=None):
+    """
+    Stacks and sorts two CSV files.
+
+    Args:
+        first (str): The TWSE table
+        second (str): The TPEX table
+        stacked_file (str): Path of the stacked table
+        sorted_file (str): Path of the sorted table
+        snapshot_file (str, optional): Also write the sorted table as a typed snapshot here
+    """
+    stacked, merged = merge_tables(read_table(first), read_table(second))
+    write_table(stacked_file, stacked)
+    write_table(sorted_file, merged)
+    if snapshot_file:
+        write_snapshot(snapshot_file, merged)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 4:
+        print(f"Usage: python {os.path.basename(sys.argv[0])} <first.csv> <second.csv> <stacked.csv> <sorted.csv>")
+        sys.exit(1)
+    merge_files(*args)
+
+
+if __name__ == "__main__":
+    main()
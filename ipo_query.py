@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Indexed queries over the deduplicated IPO table (the output of
+duplicate_remover.py), from the command line or a local HTTP JSON endpoint:
+
+    python ipo_query.py --code 7825
+    python ipo_query.py --underwriter 群益金鼎 --year 2025
+    python ipo_query.py --from 2025-01-01 --to 2025-03-31
+    python ipo_query.py --serve [--port 8765] [--sqlite ipo.sqlite]
+
+    GET /ipo?code=7825
+    GET /ipo?underwriter=群益金鼎&year=2025
+    GET /ipo?from=2025-01-01&to=2025-03-31&limit=20
+
+The table is kept in memory with hash indexes on 股票代號 and 主辦承銷商 and a
+sorted index on 申請日期 for range scans. When the CSV changes (a new pipeline
+run) only the records whose (股票代號, 申請日期) hash changed are re-indexed.
+With --sqlite the records are also stored in a SQLite database, which is
+updated the same way along with the CSV's modification time and size; a
+start-up with an unchanged CSV builds the indexes from it without reading the
+CSV. The HTTP server answers requests on several threads, which refresh and
+query the one index under its lock.
+"""
+import argparse
+import bisect
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from delta_log import index_records
+
+DEFAULT_FILE = "TWSE_TPEX-IPO-utf8-sort-no-duplicate.csv"
+DEFAULT_PORT = 8765
+
+CODE_COLUMN = "股票代號"
+UNDERWRITER_COLUMN = "主辦承銷商"
+DATE_COLUMN = "申請日期"
+
+# Sorts after every date and key, so (end, HIGHEST) bounds all records of the end date
+HIGHEST = "\uffff"
+
+
+def normalize(value):
+    return value.strip()
+
+
+class IPOIndex:
+    """In-memory IPO records with hash indexes on stock code and underwriter and a sorted date index."""
+
+    def __init__(self, path=DEFAULT_FILE, sqlite_path=None):
+        self.path = path
+        self.sqlite_path = sqlite_path
+        self.header = []
+        self.records = {}  # key -> (hash, row)
+        self.by_code = {}
+        self.by_underwriter = {}
+        self.by_date = []  # sorted (申請日期, key)
+        self.signature = None
+        # Held by refresh() and query(): a refresh rebuilds the indexes in place
+        self.lock = threading.Lock()
+        if sqlite_path and os.path.exists(sqlite_path):
+            self.load_sqlite()
+        self.refresh()
+
+    # Index maintenance
+
+    def _add(self, key, digest, row):
+        self.records[key] = (digest, row)
+        self.by_code.setdefault(normalize(row[self.code]), set()).add(key)
+        self.by_underwriter.setdefault(normalize(row[self.underwriter]), set()).add(key)
+        bisect.insort(self.by_date, (normalize(row[self.date]), key))
+
+    def _remove(self, key):
+        _, row = self.records.pop(key)
+        for index, value in ((self.by_code, row[self.code]), (self.by_underwriter, row[self.underwriter])):
+            keys = index[normalize(value)]
+            keys.discard(key)
+            if not keys:
+                del index[normalize(value)]
+        position = bisect.bisect_left(self.by_date, (normalize(row[self.date]), key))
+        del self.by_date[position]
+
+    def _set_header(self, header):
+        self.header = header
+        self.code = header.index(CODE_COLUMN)
+        self.underwriter = header.index(UNDERWRITER_COLUMN)
+        self.date = header.index(DATE_COLUMN)
+
+    def refresh(self):
+        """
+        Re-reads the CSV if it changed since the last refresh and updates the
+        indexes for the records that were added, changed or removed.
+
+        Returns:
+            dict: Counts of the added, changed and removed records, or None if the file did not change
+        """
+        with self.lock:
+            return self._refresh()
+
+    def _refresh(self):
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature:
+            return None
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            rows = [row for row in csv.reader(f) if row]
+        if rows[0] != self.header:
+            # Another layout: nothing of the old indexes can be kept
+            self.records, self.by_code, self.by_underwriter, self.by_date = {}, {}, {}, []
+            self._set_header(rows[0])
+        current = index_records(rows)
+        added = [key for key in current if key not in self.records]
+        removed = [key for key in self.records if key not in current]
+        changed = [key for key in current if key in self.records and self.records[key][0] != current[key][0]]
+        for key in removed + changed:
+            self._remove(key)
+        for key in added + changed:
+            self._add(key, *current[key])
+        self.signature = signature
+        counts = {"added": len(added), "changed": len(changed), "removed": len(removed)}
+        if self.sqlite_path:
+            # Also when no record changed, so the next start-up knows the CSV's new signature
+            self.save_sqlite(added + changed, removed)
+        return counts
+
+    # Queries
+
+    def query(self, code=None, underwriter=None, start=None, end=None, limit=None):
+        """
+        Returns the records matching every given condition, newest filing first.
+
+        Args:
+            code (str, optional): 股票代號
+            underwriter (str, optional): 主辦承銷商 (exact name)
+            start (str, optional): First 申請日期 (YYYY-MM-DD), inclusive
+            end (str, optional): Last 申請日期 (YYYY-MM-DD), inclusive
+            limit (int, optional): Maximum number of records
+
+        Returns:
+            list: The records as column -> value dicts
+        """
+        with self.lock:
+            return self._query(code, underwriter, start, end, limit)
+
+    def _query(self, code, underwriter, start, end, limit):
+        candidates = None
+        if code is not None:
+            candidates = self.by_code.get(normalize(code), set())
+        if underwriter is not None:
+            keys = self.by_underwriter.get(normalize(underwriter), set())
+            candidates = keys if candidates is None else candidates & keys
+        if start or end:
+            low = bisect.bisect_left(self.by_date, (start or "",))
+            high = bisect.bisect_right(self.by_date, (end or HIGHEST, HIGHEST))
+            in_range = [key for _, key in reversed(self.by_date[low:high])]
+            keys = in_range if candidates is None else [key for key in in_range if key in candidates]
+        elif candidates is None:
+            keys = [key for _, key in reversed(self.by_date)]
+        else:
+            keys = sorted(candidates, key=lambda key: normalize(self.records[key][1][self.date]), reverse=True)
+        if limit:
+            keys = keys[:limit]
+        return [dict(zip(self.header, self.records[key][1])) for key in keys]
+
+    # SQLite persistence
+
+    def _connect(self):
+        import sqlite3
+
+        connection = sqlite3.connect(self.sqlite_path)
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        return connection
+
+    def _create_table(self, connection):
+        columns = ", ".join(f'"{name}" TEXT' for name in self.header)
+        connection.execute("DROP TABLE IF EXISTS ipo")
+        connection.execute(f"CREATE TABLE ipo (key TEXT PRIMARY KEY, hash TEXT, {columns})")
+        for column in (CODE_COLUMN, UNDERWRITER_COLUMN, DATE_COLUMN):
+            connection.execute(f'CREATE INDEX "ipo_{column}" ON ipo ("{column}")')
+        connection.execute("INSERT OR REPLACE INTO meta VALUES ('header', ?)", (json.dumps(self.header, ensure_ascii=False),))
+
+    def save_sqlite(self, upserted, deleted):
+        """Writes the records with the upserted keys to the SQLite database and deletes the deleted keys."""
+        with self._connect() as connection:
+            stored = connection.execute("SELECT value FROM meta WHERE name = 'header'").fetchone()
+            if stored is None or json.loads(stored[0]) != self.header:
+                self._create_table(connection)
+                upserted, deleted = list(self.records), []
+            connection.executemany("DELETE FROM ipo WHERE key = ?", [(key,) for key in deleted])
+            placeholders = ", ".join("?" * (len(self.header) + 2))
+            connection.executemany(f"INSERT OR REPLACE INTO ipo VALUES ({placeholders})",
+                                   [(key, self.records[key][0], *self.records[key][1]) for key in upserted])
+            connection.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (json.dumps(self.signature),))
+        connection.close()
+        if not upserted and not deleted:
+            return
+        # stderr, so the CSV printed by the CLI stays clean
+        print(f"Updated {self.sqlite_path}: {len(upserted)} written, {len(deleted)} deleted", file=sys.stderr)
+
+    def load_sqlite(self):
+        """
+        Builds the indexes from the SQLite database. The CSV is only read by the
+        next refresh() if its modification time or size differ from the ones
+        stored with the records.
+        """
+        connection = self._connect()
+        try:
+            stored = connection.execute("SELECT value FROM meta WHERE name = 'header'").fetchone()
+            if stored is None:
+                return
+            self._set_header(json.loads(stored[0]))
+            for key, digest, *row in connection.execute("SELECT * FROM ipo"):
+                self._add(key, digest, row)
+            signature = connection.execute("SELECT value FROM meta WHERE name = 'signature'").fetchone()
+            if signature is not None:
+                self.signature = tuple(json.loads(signature[0]))
+        finally:
+            connection.close()
+
+
+def year_range(year):
+    return (f"{year}-01-01", f"{year}-12-31") if year else (None, None)
+
+
+def timed_query(index, **conditions):
+    start = time.perf_counter()
+    rows = index.query(**conditions)
+    return rows, (time.perf_counter() - start) * 1000
+
+
+def query_handler(shared_index):
+    """Returns the HTTP request handler class serving queries on shared_index."""
+    # http.server is only imported for --serve
+    from http.server import BaseHTTPRequestHandler
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        """GET /ipo?code=&underwriter=&year=&from=&to=&limit= and GET /health."""
+
+        index = shared_index
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            if url.path == "/health":
+                self.send_json(200, {"records": len(self.index.records), "file": self.index.path})
+                return
+            if url.path != "/ipo":
+                self.send_json(404, {"error": "unknown path, use /ipo or /health"})
+                return
+            try:
+                # A new pipeline run is picked up on the next request
+                self.index.refresh()
+                start, end = year_range(params.get("year"))
+                rows, took_ms = timed_query(self.index, code=params.get("code"), underwriter=params.get("underwriter"),
+                                            start=params.get("from", start), end=params.get("to", end),
+                                            limit=int(params["limit"]) if "limit" in params else None)
+            except Exception as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            self.send_json(200, {"count": len(rows), "took_ms": round(took_ms, 3), "rows": rows})
+
+        def send_json(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+
+def serve(index, host="127.0.0.1", port=DEFAULT_PORT):
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), query_handler(index))
+    print(f"Serving {len(index.records)} IPO records on http://{host}:{port}/ipo")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the deduplicated IPO table through its indexes.')
+    parser.add_argument('--file', default=DEFAULT_FILE, help='Deduplicated CSV written by duplicate_remover.py')
+    parser.add_argument('--code', help='股票代號')
+    parser.add_argument('--underwriter', help='主辦承銷商')
+    parser.add_argument('--year', help='Filings (申請日期) of this year')
+    parser.add_argument('--from', dest='start', help='First 申請日期 (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end', help='Last 申請日期 (YYYY-MM-DD)')
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--sqlite', default=None, help='Keep the records in this SQLite database as well')
+    parser.add_argument('--serve', action='store_true', help='Serve the queries as JSON over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    try:
+        index = IPOIndex(args.file, args.sqlite)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.serve:
+        serve(index, args.host, args.port)
+        return
+
+    start, end = year_range(args.year)
+    rows, took_ms = timed_query(index, code=args.code, underwriter=args.underwriter,
+                                start=args.start or start, end=args.end or end, limit=args.limit)
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow(index.header)
+    writer.writerows([row[name] for name in index.header] for row in rows)
+    print(f"{len(rows)} records in {took_ms:.3f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
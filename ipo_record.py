@@ -0,0 +1,162 @@
+"""
+Compact in-memory form of one IPO row (the 12 columns TWSE-IPO-utf8.csv and
+TPEX-IPO-utf8.csv share), used where the pure-Python stages keep or stream
+rows instead of lists of strings:
+
+    record = IPORecord.from_row(row)
+    writer.writerow(record)            # a record is a sequence of its cells
+    record.date("listing_date")        # datetime.date or None
+    record.capital_value               # int or None
+
+- __slots__ instead of a list plus a __dict__, one pointer per column.
+- The low-cardinality columns (the five dates, 主辦承銷商, 承銷價, 備註) are
+  interned, so the thousands of rows with the same date, underwriter or note
+  tag share one string.
+- 申請時股本 is kept as an int when the text is a plain decimal number (the
+  int converts back to exactly the same text), otherwise as it was.
+- Columns beyond the 12 are kept in a tuple, so any row converts back to the
+  same cells.
+
+Indexing and iteration give the cells as text, like the list the record was
+built from, so csv.writer and filter_rules.RowFilter take records unchanged.
+"""
+import re
+import sys
+from datetime import date
+from functools import lru_cache
+
+# Attribute names in column order (申請日期, 股票代號, 公司名稱, 董事長, 申請時股本,
+# 審議日期, 董事會通過日期, 契約日期, 上市/上櫃日期, 主辦承銷商, 承銷價, 備註)
+FIELDS = (
+    "apply_date", "code", "name", "chairman", "capital",
+    "review_date", "board_date", "contract_date", "listing_date",
+    "underwriter", "price", "note",
+)
+DATE_FIELDS = ("apply_date", "review_date", "board_date", "contract_date", "listing_date")
+INTERNED_FIELDS = DATE_FIELDS + ("underwriter", "price", "note")
+INT_FIELDS = ("capital",)
+
+DATE_PATTERN = re.compile(r'(\d{4})/(\d{2})/(\d{2})$')
+
+
+def to_int(value):
+    """Returns value as an int if str() gives the same text back, else value unchanged."""
+    if value.isascii() and value.isdigit() and (value[0] != "0" or value == "0"):
+        return int(value)
+    return value
+
+
+@lru_cache(maxsize=None)
+def parse_date(value):
+    """YYYY/MM/DD -> datetime.date; None for an empty or malformed date."""
+    match = DATE_PATTERN.match(value)
+    if not match:
+        return None
+    try:
+        return date(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+
+class IPORecord:
+    """One IPO row; build it with IPORecord.from_row()."""
+
+    __slots__ = FIELDS + ("extra",)
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Builds a record from the cells of a CSV row.
+
+        Args:
+            row (list): At least len(FIELDS) cells
+
+        Returns:
+            IPORecord: The record (row itself if it already is one)
+        """
+        if isinstance(row, cls):
+            return row
+        if len(row) < len(FIELDS):
+            raise ValueError(f"An IPO row has at least {len(FIELDS)} columns, got {len(row)}")
+        record = cls.__new__(cls)
+        # Spelled out instead of a setattr() loop, this runs once per row
+        intern = sys.intern
+        record.apply_date = intern(row[0])
+        record.code = row[1]
+        record.name = row[2]
+        record.chairman = row[3]
+        record.capital = to_int(row[4])
+        record.review_date = intern(row[5])
+        record.board_date = intern(row[6])
+        record.contract_date = intern(row[7])
+        record.listing_date = intern(row[8])
+        record.underwriter = intern(row[9])
+        record.price = intern(row[10])
+        record.note = intern(row[11])
+        record.extra = tuple(row[len(FIELDS):]) if len(row) > len(FIELDS) else ()
+        return record
+
+    def to_row(self):
+        """The cells as a list of strings, as they were read."""
+        capital = self.capital
+        row = [
+            self.apply_date, self.code, self.name, self.chairman,
+            capital if capital.__class__ is str else str(capital),
+            self.review_date, self.board_date, self.contract_date, self.listing_date,
+            self.underwriter, self.price, self.note,
+        ]
+        if self.extra:
+            row.extend(self.extra)
+        return row
+
+    def __iter__(self):
+        return iter(self.to_row())
+
+    def __len__(self):
+        return len(FIELDS) + len(self.extra)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.to_row()[index]
+        if index < 0:
+            index += len(self)
+        if 0 <= index < len(FIELDS):
+            value = getattr(self, FIELDS[index])
+            return value if value.__class__ is str else str(value)
+        if len(FIELDS) <= index < len(self):
+            return self.extra[index - len(FIELDS)]
+        raise IndexError("IPORecord index out of range")
+
+    def __eq__(self, other):
+        if isinstance(other, (IPORecord, list, tuple)):
+            return self.to_row() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"IPORecord({self.to_row()!r})"
+
+    def date(self, field):
+        """A date column as a datetime.date (None if empty or malformed)."""
+        if field not in DATE_FIELDS:
+            raise ValueError(f"'{field}' is not a date column")
+        return parse_date(getattr(self, field))
+
+    @property
+    def capital_value(self):
+        """申請時股本 as an int, None if empty or not a number."""
+        value = self.capital
+        if value.__class__ is int:
+            return value
+        try:
+            return int(value.strip().replace(',', ''))
+        except ValueError:
+            return None
+
+
+def records(rows):
+    """Yields the rows as IPORecords; rows shorter than an IPO row are skipped."""
+    for row in rows:
+        if len(row) >= len(FIELDS):
+            yield IPORecord.from_row(row)
@@ -0,0 +1,137 @@
+import os
+import re
+
+# Leading year of the first column (申請日期), in YYYY/MM/DD or YYYY-MM-DD form
+YEAR_PATTERN = re.compile(r'\s*(\d{4})\D')
+
+
+def format_cell(cell):
+    """Escapes a cell for a Markdown table (same escaping as csv2md)."""
+    if '\n' in cell:
+        cell = cell.replace("\r\n", "<br>").replace("\n", "<br>")
+    return cell.replace("|", r"\|")
+
+
+def column_widths(rows):
+    """Widths of the formatted cells per column (the cheap first pass of the padded layout)."""
+    rows = [row for row in rows if row]
+    # Like csv2md, only the columns every row has are rendered
+    widths = [0] * min(map(len, rows), default=0)
+    for row in rows:
+        for i, width in enumerate(widths):
+            length = len(format_cell(row[i]))
+            if length > width:
+                widths[i] = length
+    return widths
+
+
+def render_lines(rows, pad=False):
+    """
+    Yields the lines of a Markdown table for rows (header row first), one row at a time.
+
+    Args:
+        rows (list): The table, header row first
+        pad (bool): Pad every column to its widest cell like csv2md does; the
+            unpadded table renders the same and is a fraction of the size
+
+    Yields:
+        str: One line of the table, without the newline
+    """
+    if not rows:
+        return
+    if pad:
+        widths = column_widths(rows)
+        for n, row in enumerate(rows):
+            yield "| " + " | ".join(format_cell(cell).ljust(width) for cell, width in zip(row, widths)) + " |"
+            if n == 0:
+                yield "| " + " | ".join("-" * width for width in widths) + " |"
+    else:
+        for n, row in enumerate(rows):
+            yield "| " + " | ".join(format_cell(cell) for cell in row) + " |"
+            if n == 0:
+                yield "|" + "|".join("---" for _ in row) + "|"
+
+
+def render(rows, pad=False):
+    """Returns the Markdown table for rows (header row first) as one string."""
+    return "\n".join(render_lines(rows, pad))
+
+
+def year_of(row):
+    match = YEAR_PATTERN.match(row[0]) if row else None
+    return match.group(1) if match else "unknown"
+
+
+def split_pages(rows, page_size=None, per_year=False):
+    """
+    Splits a table into pages, each with the header row.
+
+    Args:
+        rows (list): The table, header row first
+        page_size (int, optional): Maximum number of data rows per page
+        per_year (bool): One page per year of the first column (申請日期)
+
+    Returns:
+        list: (page name, rows) tuples in table order
+
+    Raises:
+        ValueError: If page_size is less than 1
+    """
+    if page_size is not None and page_size < 1:
+        raise ValueError(f"page size must be at least 1 row, not {page_size}")
+    header, body = rows[0], rows[1:]
+    if per_year:
+        by_year = {}
+        for row in body:
+            by_year.setdefault(year_of(row), [header]).append(row)
+        return list(by_year.items())
+    pages = []
+    size = page_size or len(body) or 1
+    for start in range(0, len(body), size):
+        pages.append((f"page-{start // size + 1:03d}", [header] + body[start:start + size]))
+    return pages
+
+
+def page_footer(names, n):
+    """Links from the n-th page to the previous and next pages and to the index."""
+    links = []
+    if n > 0:
+        links.append(f"[< {names[n - 1]}]({names[n - 1]}.md)")
+    links.append("[index](index.md)")
+    if n + 1 < len(names):
+        links.append(f"[{names[n + 1]} >]({names[n + 1]}.md)")
+    return " | ".join(links)
+
+
+def write_pages(markdown_path, rows, page_size=None, per_year=False, pad=False):
+    """
+    Writes the pages of a table into a directory named after the Markdown file
+    (TWSE-IPO-utf8.md -> TWSE-IPO-utf8/), plus an index.md linking them. Every
+    page ends with links to the previous and next pages and the index.
+
+    Returns:
+        list: The paths written
+    """
+    directory = os.path.splitext(markdown_path)[0]
+    pages = split_pages(rows, page_size, per_year)
+    names = [name for name, _ in pages]
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    index = [f"# {os.path.basename(directory)}", ""]
+    for n, (name, page) in enumerate(pages):
+        path = os.path.join(directory, f"{name}.md")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for line in render_lines(page, pad):
+                f.write(line + "\n")
+            f.write("\n" + page_footer(names, n) + "\n")
+        index.append(f"- [{name}]({name}.md) ({len(page) - 1} rows)")
+        written.append(path)
+    # Pages of a previous run that no longer exist (e.g. a smaller table) are removed
+    for stale in set(os.listdir(directory)) - {os.path.basename(path) for path in written} - {"index.md"}:
+        if stale.endswith(".md"):
+            os.remove(os.path.join(directory, stale))
+    path = os.path.join(directory, "index.md")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("\n".join(index) + "\n")
+    written.append(path)
+    return written
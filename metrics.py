@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Row counts and other metrics of the pipeline's CSV files, and the Shields.io
+badge JSONs made from them.
+
+The pipeline records the metrics of every CSV it writes in a sidecar manifest
+(pipeline-manifest.json), so the badges never need the CSVs to be parsed again:
+
+    python metrics.py [--workdir .]
+
+writes every badge from the manifest, counting a CSV only if the manifest has
+no (or a stale) entry for it. The workflow runs it on days no source changed
+too, since the new-filings badge depends on today's date.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+from CountCSVLine import count_rows, write_badge
+
+MANIFEST_FILE = "pipeline-manifest.json"
+
+# (badge JSON, counted CSV, label)
+BADGES = [
+    ("TWSE.json", "TWSE-IPO-utf8.csv", "TWSE IPO IPO"),
+    ("TPEX.json", "TPEX-IPO-utf8.csv", "TPEX IPO IPO"),
+    ("TWSE_TPEX.json", "TWSE_TPEX-IPO-utf8-sort-no-duplicate.csv", "TWSE+TPEX IPO IPO"),
+    ("TPEX-filter.json", "TPEX-IPO-utf8-filter.csv", "TPEX IPO Valid IPO"),
+    ("TWSE-filter.json", "TWSE-IPO-utf8-filter.csv", "TWSE IPO Valid IPO"),
+    ("TWSE_TPEX-filter.json", "TWSE_TPEX-IPO-utf8-filter-sort-no-duplicate.csv", "TWSE+TPEX IPO Valid IPO"),
+]
+
+# (badge JSON, CSV, metric, label) of the valid (filtered, deduplicated) filings
+EXTRA_BADGES = [
+    ("TWSE_TPEX-new.json", "TWSE_TPEX-IPO-utf8-filter-sort-no-duplicate.csv", "new_today", "New IPO filings today"),
+    ("TWSE_TPEX-pending.json", "TWSE_TPEX-IPO-utf8-filter-sort-no-duplicate.csv", "pending", "Pending IPO listings"),
+    ("TWSE_TPEX-latest.json", "TWSE_TPEX-IPO-utf8-filter-sort-no-duplicate.csv", "latest_filing", "Latest IPO filing"),
+    ("TWSE_TPEX-updated.json", "TWSE_TPEX-IPO-utf8-filter-sort-no-duplicate.csv", "last_updated", "IPO list updated"),
+]
+
+# The exchanges publish in Taiwan time
+TAIWAN = timezone(timedelta(hours=8))
+
+DATE_PATTERN = re.compile(r'\s*(\d{4})[/-](\d{1,2})[/-](\d{1,2})')
+
+# Listing date column: TWSE/TPEX headers both use this name after the merge
+LISTING_COLUMN = "股票上櫃買賣日期"
+
+
+def iso_date(value):
+    """YYYY/MM/DD or YYYY-MM-DD -> YYYY-MM-DD, None if value is not a date."""
+    match = DATE_PATTERN.match(value)
+    if not match:
+        return None
+    year, month, day = match.groups()
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+
+def table_metrics(rows):
+    """
+    Computes the metrics of a table (header row first) that is already in memory.
+
+    Returns:
+        dict: rows, pending (filed but without a listing date), latest_filing
+              (newest 申請日期) and latest_filings (filings on that date)
+    """
+    header, body = rows[0], [row for row in rows[1:] if row]
+    listing = header.index(LISTING_COLUMN) if LISTING_COLUMN in header else None
+    filed = [iso_date(row[0]) for row in body]
+    latest = max((date for date in filed if date), default=None)
+    return {
+        "rows": len(body),
+        "pending": sum(1 for row in body if listing is not None and not row[listing].strip()),
+        "latest_filing": latest,
+        "latest_filings": sum(1 for date in filed if date == latest) if latest else 0,
+    }
+
+
+def new_today(entry, today=None):
+    """
+    Filings dated today, from a manifest entry: the filings of the latest
+    filing date if that is today, else 0. Worked out when the badge is
+    written, so it is right on days the manifest is not rebuilt.
+    """
+    today = today or datetime.now(TAIWAN).strftime('%Y-%m-%d')
+    return entry["latest_filings"] if entry.get("latest_filing") == today else 0
+
+
+def file_fingerprint(text):
+    """Size and SHA-256 of a file's text, used to tell whether a manifest entry is still current."""
+    data = text.encode('utf-8')
+    return {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def manifest_entry(text, rows, previous=None, today=None):
+    """
+    Builds the manifest entry of a CSV written by the pipeline.
+
+    Args:
+        text (str): The CSV text as written
+        rows (list): The same table, header row first
+        previous (dict, optional): The entry of the previous run; its
+            last_updated date is kept if the file did not change
+
+    Returns:
+        dict: Fingerprint, table_metrics and last_updated (Taiwan date of the last change)
+    """
+    today = today or datetime.now(TAIWAN).strftime('%Y-%m-%d')
+    entry = dict(file_fingerprint(text), **table_metrics(rows))
+    unchanged = previous and previous.get("sha256") == entry["sha256"] and previous.get("last_updated")
+    entry["last_updated"] = previous["last_updated"] if unchanged else today
+    return entry
+
+
+def load_manifest(workdir="."):
+    try:
+        with open(os.path.join(workdir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest, workdir="."):
+    path = os.path.join(workdir, MANIFEST_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False, sort_keys=True)
+    print(f"Wrote {path}")
+
+
+def is_current(entry, path):
+    """True if the manifest entry still describes the file at path."""
+    try:
+        if os.path.getsize(path) != entry.get("size"):
+            return False
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest() == entry.get("sha256")
+    except OSError:
+        return False
+
+
+def write_badges(workdir=".", manifest=None, verify=True):
+    """
+    Writes every badge JSON from the manifest; CSVs without a current entry are counted instead.
+
+    Args:
+        workdir (str): Directory with the CSVs, the manifest and the badges
+        manifest (dict, optional): Already loaded manifest
+        verify (bool): Check each entry against its file (not needed right after writing them)
+    """
+    manifest = load_manifest(workdir) if manifest is None else manifest
+    current = {}
+    for source in {source for _, source, _ in BADGES} | {source for _, source, _, _ in EXTRA_BADGES}:
+        entry = manifest.get(source)
+        if entry and (not verify or is_current(entry, os.path.join(workdir, source))):
+            current[source] = entry
+
+    for badge, source, label in BADGES:
+        if source in current:
+            count = current[source]["rows"]
+        else:
+            print(f"No current manifest entry for {source}, counting it")
+            count = count_rows(os.path.join(workdir, source))
+        write_badge(os.path.join(workdir, badge), count, label)
+    write_extra_badges(workdir, current)
+
+
+def write_extra_badges(workdir=".", manifest=None, today=None):
+    """Writes the badges of the metrics that only exist in the manifest (new, pending, latest, updated)."""
+    manifest = load_manifest(workdir) if manifest is None else manifest
+    for badge, source, metric, label in EXTRA_BADGES:
+        values = dict(manifest.get(source, {}))
+        if "latest_filings" in values:
+            values["new_today"] = new_today(values, today)
+        if metric in values:
+            value = values[metric]
+            write_badge(os.path.join(workdir, badge), value if value is not None else "n/a", label)
+
+
+def update_manifest(names, workdir="."):
+    """
+    Updates the manifest entries of the given CSV files and writes every badge
+    from them (for runs that do not have the tables in memory). Only a file
+    whose content differs from its previous entry is parsed; the others keep
+    their entry after a hash of the file.
+
+    Returns:
+        dict: The saved manifest
+    """
+    previous = load_manifest(workdir)
+    manifest = {}
+    parsed = 0
+    for name in names:
+        with open(os.path.join(workdir, name), 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+        entry = previous.get(name)
+        if entry and entry.get("sha256") == file_fingerprint(text)["sha256"] and "latest_filings" in entry:
+            manifest[name] = entry
+        else:
+            manifest[name] = manifest_entry(text, list(csv.reader(io.StringIO(text, newline=''))), entry)
+            parsed += 1
+    print(f"Manifest: {parsed} of {len(names)} CSVs changed and were counted")
+    save_manifest(manifest, workdir)
+    write_badges(workdir, manifest, verify=False)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write all badge JSONs from the pipeline manifest.')
+    parser.add_argument('--workdir', default='.', help='Directory with the CSVs and pipeline-manifest.json')
+    args = parser.parse_args(argv)
+    try:
+        write_badges(args.workdir)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
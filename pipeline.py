@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Runs the whole IPO pipeline in one process:
+
+    convert -> normalize -> filter -> merge -> dedupe -> delta -> analytics -> count -> render
+
+Each source is read once and kept in memory as a list of rows (header first).
+Every artifact the workflow used to produce with separate scripts and csvkit
+calls is still written in the same format (the Markdown tables are unpadded
+unless --md-pad is given).
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+
+import analytics
+import convert_date_format
+import csv_filter
+import csv_to_md
+import delta_log
+import instrument
+import ipo_merge
+import markdown_table
+import metrics
+import snapshot
+import transcode
+import twse_ipo
+
+TWSE_RAW = "applylisting.csv"
+TPEX_RAW = "TPEX-IPO-utf8.csv"
+
+# (first, second, stacked, sorted, deduplicated)
+MERGES = [
+    ("TWSE-IPO-utf8.csv", "TPEX-IPO-utf8.csv",
+     "TWSE_TPEX-IPO-utf8.csv", "TWSE_TPEX-IPO-utf8-sort.csv", "TWSE_TPEX-IPO-utf8-sort-no-duplicate.csv"),
+    ("TWSE-IPO-utf8-filter.csv", "TPEX-IPO-utf8-filter.csv",
+     "TWSE_TPEX-IPO-utf8-filter.csv", "TWSE_TPEX-IPO-utf8-filter-sort.csv", "TWSE_TPEX-IPO-utf8-filter-sort-no-duplicate.csv"),
+]
+
+# (Markdown file, rendered CSV)
+MARKDOWN = [
+    ("TPEX-IPO-utf8.md", "TPEX-IPO-utf8.csv"),
+    ("TPEX-IPO-utf8-filter.md", "TPEX-IPO-utf8-filter.csv"),
+    ("TWSE-IPO-utf8.md", "TWSE-IPO-utf8.csv"),
+    ("TWSE-IPO-utf8-filter.md", "TWSE-IPO-utf8-filter.csv"),
+    ("TWSE_TPEX-IPO-utf8.md", "TWSE_TPEX-IPO-utf8.csv"),
+    ("TWSE_TPEX-IPO-utf8-filter.md", "TWSE_TPEX-IPO-utf8-filter.csv"),
+]
+
+def universal_newlines(rows):
+    """
+    Translates embedded \\r\\n and \\r to \\n, which is what csvstack and
+    csv_to_md.py saw when they re-read a CSV file with open() in text mode.
+    (csv_filter.py reads sys.stdin, which keeps them as they are.)
+    """
+    return [[cell.replace('\r\n', '\n').replace('\r', '\n') if '\r' in cell else cell for cell in row]
+            for row in rows]
+
+
+def write_csv(state, name, rows, **writer_kwargs):
+    """Writes rows (header first) to name in the work directory and keeps them in memory."""
+    buffer = io.StringIO(newline='')
+    csv.writer(buffer, **writer_kwargs).writerows(rows)
+    write_text(state, name, buffer.getvalue())
+    state["tables"][name] = rows
+    instrument.add_rows(rows_out=len(rows) - 1)
+
+
+def write_text(state, name, text):
+    path = os.path.join(state["workdir"], name)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    state["texts"][name] = text
+    print(f"Wrote {path}")
+
+
+def stage_convert(state):
+    """TWSE: applylisting.csv (Big5, ROC dates) -> TWSE-IPO-utf8.csv."""
+    path = os.path.join(state["workdir"], TWSE_RAW)
+    encoding = twse_ipo.detect_encoding(path) or 'big5'
+    print(f"Detected file encoding: {encoding}")
+    transcoder = transcode.Transcoder(transcode.encoding_chain(encoding))
+    with open(path, 'rb') as f:
+        lines = transcode.iter_lines(f, transcoder)
+        rows = [twse_ipo.HEADER] + list(twse_ipo.convert_rows(instrument.counted(csv.reader(lines))))
+    transcoder.report(TWSE_RAW)
+    write_csv(state, "TWSE-IPO-utf8.csv", rows)
+
+
+def stage_normalize(state):
+    """TPEX: YYYYMMDD dates -> YYYY/MM/DD with every cell quoted."""
+    with open(os.path.join(state["workdir"], TPEX_RAW), 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f, quotechar='"')
+        header = next(reader)
+        rows = convert_date_format.convert_rows(header, instrument.counted(reader))
+    write_csv(state, "TPEX-IPO-utf8.csv", [header] + rows, quoting=csv.QUOTE_ALL, lineterminator='\n')
+
+
+def stage_filter(state):
+    """Drops withdrawn/rejected filings and rows outside the year range (filter-rules.json)."""
+    from filter_rules import RowFilter
+
+    for source in ("TPEX-IPO-utf8.csv", "TWSE-IPO-utf8.csv"):
+        rules = RowFilter()
+        instrument.add_rows(rows_in=len(state["tables"][source]) - 1)
+        rows = [csv_filter.HEADER] + csv_filter.filter_table(state["tables"][source], rules)
+        write_csv(state, source.replace(".csv", "-filter.csv"), rows, quotechar='"', quoting=csv.QUOTE_ALL)
+        print(f"Filter rule hits for {source}:")
+        rules.report()
+
+
+def stage_merge(state):
+    """Stacks TWSE and TPEX and sorts the result (ipo_merge.py, formerly csvstack + csvsort -r)."""
+    for first, second, stacked, sorted_name, _ in MERGES:
+        instrument.add_rows(rows_in=len(state["tables"][first]) + len(state["tables"][second]) - 2)
+        stacked_rows, sorted_rows = ipo_merge.merge_tables(
+            universal_newlines(state["tables"][first]), universal_newlines(state["tables"][second]))
+        write_csv(state, stacked, stacked_rows, lineterminator='\n')
+        write_csv(state, sorted_name, sorted_rows, lineterminator='\n')
+        # Typed columnar copy for the dedupe stage (and anything else downstream)
+        snapshot.write_snapshot(snapshot.snapshot_path(os.path.join(state["workdir"], sorted_name)), sorted_rows)
+
+
+def stage_dedupe(state):
+    """Removes duplicate stock codes (duplicate_remover.py), loading the auction data once."""
+    import pandas as pd
+    import duplicate_remover
+
+    df_auction = duplicate_remover.download_auction_data(state["auction_source"], ttl=state["auction_ttl"])
+    if df_auction is None:
+        raise RuntimeError("Failed to download auction data")
+
+    # Incremental mode: decisions of the previous run, stored per output file
+    decisions = duplicate_remover.load_decisions(state["dedupe_state"]) if state["dedupe_state"] else None
+
+    for _, _, _, sorted_name, deduped in MERGES:
+        print(f"\nRemoving duplicates from {sorted_name}")
+        snap = snapshot.Snapshot(snapshot.snapshot_path(os.path.join(state["workdir"], sorted_name)))
+        df_ipo = duplicate_remover.load_snapshot_frame(snap)
+        print(f"Original IPO dataset: {len(df_ipo)} rows")
+        instrument.add_rows(rows_in=len(df_ipo))
+        df_ipo_cleaned = duplicate_remover.remove_duplicates(
+            df_ipo, df_auction.copy(), decisions.setdefault(deduped, {}) if decisions is not None else None)
+        rows = [snap.header] + snap.text_rows(df_ipo_cleaned.index.to_numpy())
+        write_csv(state, deduped, rows, lineterminator='\n')
+
+    if decisions is not None:
+        duplicate_remover.save_decisions(decisions, state["dedupe_state"])
+
+
+def stage_delta(state):
+    """Appends the new, changed and removed filings since the previous run to the delta log."""
+    previous, current = state["previous"], state["tables"][delta_log.DELTA_SOURCE]
+    if previous is None:
+        print(f"No previous {delta_log.DELTA_SOURCE}, the delta log starts with the next run")
+        return
+    instrument.add_rows(rows_in=len(previous) + len(current) - 2)
+    delta = delta_log.diff_tables(previous, current)
+    entry = delta_log.append_delta(os.path.join(state["workdir"], delta_log.DELTA_LOG), delta)
+    print(f"Changes since the previous run: {delta_log.summary(delta)}")
+    if entry:
+        instrument.add_rows(rows_out=len(delta["added"]) + len(delta["changed"]) + len(delta["removed"]))
+
+
+def stage_analytics(state):
+    """Updates the aggregate tables of the valid filings from the rows that changed since the previous run."""
+    current = state["tables"][analytics.SOURCE]
+    instrument.add_rows(rows_in=len(current) - 1)
+    analytics.update_tables(state["previous_valid"], current, state["workdir"])
+
+
+def stage_count(state):
+    """Writes the metrics of every CSV to the manifest and all badges from it, without re-reading a file."""
+    previous = metrics.load_manifest(state["workdir"])
+    manifest = {name: metrics.manifest_entry(state["texts"][name], rows, previous.get(name))
+                for name, rows in state["tables"].items() if name.endswith(".csv")}
+    instrument.add_rows(rows_in=sum(entry["rows"] for entry in manifest.values()))
+    metrics.save_manifest(manifest, state["workdir"])
+    metrics.write_badges(state["workdir"], manifest, verify=False)
+
+
+def stage_render(state):
+    for markdown, source in MARKDOWN:
+        rows = universal_newlines(state["tables"][source])
+        instrument.add_rows(rows_in=len(rows) - 1, rows_out=len(rows) - 1)
+        write_text(state, markdown, csv_to_md.render_rows(rows, state["md_pad"]) + "\n")
+        if state["md_pages"]:
+            # Per-year (or fixed size) pages that GitHub can display
+            page_size = None if state["md_pages"] == "year" else int(state["md_pages"])
+            paths = markdown_table.write_pages(os.path.join(state["workdir"], markdown), csv_to_md.select_columns(rows),
+                                               page_size, per_year=page_size is None, pad=state["md_pad"])
+            print(f"Wrote {len(paths) - 1} pages and an index for {markdown}")
+
+
+STAGES = [
+    ("convert", stage_convert),
+    ("normalize", stage_normalize),
+    ("filter", stage_filter),
+    ("merge", stage_merge),
+    ("dedupe", stage_dedupe),
+    ("delta", stage_delta),
+    ("analytics", stage_analytics),
+    ("count", stage_count),
+    ("render", stage_render),
+]
+
+
+def run_pipeline(workdir=".", auction_source=None, dedupe_state=None, auction_ttl=None, md_pad=False, md_pages=None):
+    """
+    Runs every stage in order.
+
+    Returns:
+        dict: The pipeline state (tables and texts per artifact)
+    """
+    from auction_cache import GITHUB_AUCTION_URL, DEFAULT_TTL
+
+    state = {"workdir": workdir, "auction_source": auction_source or GITHUB_AUCTION_URL,
+             "auction_ttl": DEFAULT_TTL if auction_ttl is None else auction_ttl, "dedupe_state": dedupe_state,
+             "md_pad": md_pad, "md_pages": md_pages,
+             "tables": {}, "texts": {},
+             # The merged table as the previous run left it, before the merge stage replaces it
+             "previous": delta_log.read_table(os.path.join(workdir, delta_log.DELTA_SOURCE)),
+             "previous_valid": delta_log.read_table(os.path.join(workdir, analytics.SOURCE))}
+    for name, stage in STAGES:
+        print(f"== {name}")
+        with instrument.stage(name):
+            stage(state)
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the IPO pipeline in a single process.')
+    parser.add_argument('--workdir', default='.', help='Directory with applylisting.csv and TPEX-IPO-utf8.csv')
+    parser.add_argument('--auction-source', '--auction-file', default=None,
+                        help='URL, file:// URL or local path of the auction data (default: GitHub, cached in .auction-cache)')
+    parser.add_argument('--auction-ttl', type=float, default=None,
+                        help='Seconds a cached auction download is used without revalidating it')
+    parser.add_argument('--dedupe-state', default=None,
+                        help='Only re-evaluate duplicate stock codes that changed since the decisions stored in this JSON file')
+    parser.add_argument('--md-pad', action='store_true',
+                        help='Pad the Markdown tables to equal column widths (the former csv2md layout)')
+    parser.add_argument('--md-pages', default=None, metavar='year|ROWS',
+                        help='Also split every Markdown table into per-year pages, or pages of ROWS rows')
+    parser.add_argument('--report', default=None,
+                        help=f'Append the per-stage timings to this JSON run report (default: ${instrument.REPORT_ENV})')
+    parser.add_argument('--profile', default=None, metavar='DIR',
+                        help=f'Run every stage under cProfile and dump the stats to DIR (default: ${instrument.PROFILE_ENV})')
+    args = parser.parse_args(argv)
+    instrument.configure(args.report, args.profile)
+    if args.md_pages not in (None, "year") and not (args.md_pages.isdigit() and int(args.md_pages) > 0):
+        parser.error("--md-pages must be 'year' or a number of rows greater than 0")
+
+    try:
+        run_pipeline(args.workdir, args.auction_source, args.dedupe_state, args.auction_ttl, args.md_pad, args.md_pages)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
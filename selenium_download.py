@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Downloads the TPEX and TWSE CSVs by clicking their download buttons in Chrome:
+
+    python ipo.py download
+
+Chrome runs headless with a cached chromedriver and a persistent profile
+(driver_manager.py). Selenium is only imported once a browser is started,
+so importing this module (e.g. from fetcher.py) costs nothing.
+Selenium.py is a thin wrapper around main().
+"""
+import argparse
+import os
+
+import instrument
+from download_watcher import snapshot, wait_for_download
+from driver_manager import PROFILE_DIR, DriverManager
+
+TPEX_PAGE = "https://www.tpex.org.tw/zh-tw/mainboard/applying/status/company.html"
+TPEX_BUTTON = "button[data-format='csv-u8']"
+TWSE_PAGE = "https://www.twse.com.tw/zh/listed/listed/apply-listing.html"
+TWSE_BUTTON = "button[class='csv']"
+
+
+def download_csv(driver, page_url, button_selector, target_name, downloadDir=None):
+    """
+    Opens page_url, clicks the CSV download button and renames the download to
+    target_name in downloadDir (default: the current directory at call time).
+    """
+    if downloadDir is None:
+        downloadDir = f"{os.getcwd()}//"
+    from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    # 打開目標網頁
+    driver.get(page_url)
+
+    # 等待按鈕加載並按 data-format 屬性為 csv-u8 定位按鈕
+    wait = WebDriverWait(driver, 10)  # 等待按鈕的時間
+    download_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, button_selector)))
+
+    # 記錄點擊前的下載目錄內容
+    before = snapshot(downloadDir)
+
+    # 滾動到按鈕並點擊
+    driver.execute_script("arguments[0].scrollIntoView(true);", download_button)
+    ActionChains(driver).move_to_element(download_button).click(download_button).perform()
+
+    # 等待下載完成 (檔案出現且大小不再變動)
+    DownloadedFile = wait_for_download(downloadDir, before)
+    print("CSV completed！")
+
+    target = os.path.join(downloadDir, target_name)
+    if os.path.basename(DownloadedFile) != target_name:
+        # 以原子操作改名為 target_name
+        os.replace(DownloadedFile, target)
+        print(f"File '{os.path.basename(DownloadedFile)}' renamed to '{target_name}'.")
+    print("Download completed...",downloadDir+target_name)
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Download the TPEX and TWSE IPO lists with Chrome.')
+    parser.add_argument('--headed', action='store_true', help='Run Chrome in an Xvfb display instead of --headless=new')
+    parser.add_argument('--profile-dir', default=PROFILE_DIR, help='Persistent Chrome profile (HTTP cache) directory')
+    args = parser.parse_args(argv)
+    downloadDir = f"{os.getcwd()}//"
+    with DriverManager(downloadDir, profile_dir=args.profile_dir, headless=not args.headed) as manager:
+        with instrument.stage("download TPEX"):
+            manager.run(lambda driver: download_csv(driver, TPEX_PAGE, TPEX_BUTTON, "TPEX-IPO-utf8.csv", downloadDir))
+        with instrument.stage("download TWSE"):
+            manager.run(lambda driver: download_csv(driver, TWSE_PAGE, TWSE_BUTTON, "applylisting.csv", downloadDir))
+
+
+if __name__ == "__main__":
+    main()
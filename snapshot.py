@@ -0,0 +1,184 @@
+"""
+Typed columnar snapshot of a merged IPO table, stored as a directory of .npy
+files that are loaded memory-mapped:
+
+    TWSE_TPEX-IPO-utf8-sort.snapshot/
+        meta.json            row count and column schema
+        00-date.npy          datetime64[D] (NaT for empty or invalid dates)
+        01-codes.npy         int32 category codes, 01-categories.npy the categories
+        04-number.npy        float64 (NaN for empty or non-numeric values)
+        NN-text.npy          the exported text of every column (fixed-width unicode)
+
+The typed arrays are for analysis (dedupe, counts); the text arrays keep each
+cell exactly as exported, so the CSV/MD files can be derived from the snapshot.
+"""
+import json
+import os
+import shutil
+
+SNAPSHOT_SUFFIX = ".snapshot"
+META_FILE = "meta.json"
+
+DATE_COLUMNS = [
+    "申請日期", "上櫃審議委員會審議日期", "櫃買董事會通過上櫃日期",
+    "櫃買同意上櫃契約日期或證期局核准上櫃契約日期", "股票上櫃買賣日期",
+]
+CATEGORICAL_COLUMNS = ["股票代號"]
+NUMERIC_COLUMNS = ["申請時股本", "申請時股本(仟元)", "承銷價"]
+
+
+def snapshot_path(csv_path):
+    """Returns the snapshot directory that belongs to a CSV file."""
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_SUFFIX
+
+
+def is_snapshot(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def column_type(name):
+    if name in DATE_COLUMNS:
+        return "date"
+    if name in CATEGORICAL_COLUMNS:
+        return "category"
+    if name in NUMERIC_COLUMNS:
+        return "number"
+    return "text"
+
+
+def parse_dates(values):
+    """ISO 'YYYY-MM-DD' strings -> datetime64[D]; empty or unparseable values become NaT."""
+    import numpy as np
+
+    try:
+        return np.array(values, dtype='datetime64[D]')
+    except ValueError:
+        dates = np.empty(len(values), dtype='datetime64[D]')
+        for i, value in enumerate(values):
+            try:
+                dates[i] = np.datetime64(value, 'D')
+            except ValueError:
+                dates[i] = np.datetime64('NaT')
+        return dates
+
+
+def parse_numbers(values):
+    """Numeric strings (thousands separators allowed) -> float64; anything else becomes NaN."""
+    import numpy as np
+
+    numbers = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            numbers[i] = float(value.replace(',', ''))
+        except ValueError:
+            pass
+    return numbers
+
+
+def write_snapshot(path, rows):
+    """
+    Writes rows (header first, all cells strings) as a typed columnar snapshot.
+
+    Args:
+        path (str): Snapshot directory, replaced if it exists
+        rows (list): The table, header row first
+    """
+    import numpy as np
+
+    header, body = rows[0], rows[1:]
+    tmp_path = f"{path}.part"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for i, name in enumerate(header):
+        values = [row[i] if i < len(row) else "" for row in body]
+        kind = column_type(name)
+        files = {"text": f"{i:02d}-text.npy"}
+        np.save(os.path.join(tmp_path, files["text"]), np.array(values, dtype=str))
+        if kind == "date":
+            files["values"] = f"{i:02d}-date.npy"
+            np.save(os.path.join(tmp_path, files["values"]), parse_dates(values))
+        elif kind == "category":
+            categories, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+            files["values"] = f"{i:02d}-codes.npy"
+            files["categories"] = f"{i:02d}-categories.npy"
+            np.save(os.path.join(tmp_path, files["values"]), codes.astype(np.int32))
+            np.save(os.path.join(tmp_path, files["categories"]), categories)
+        elif kind == "number":
+            files["values"] = f"{i:02d}-number.npy"
+            np.save(os.path.join(tmp_path, files["values"]), parse_numbers(values))
+        columns.append({"name": name, "type": kind, "files": files})
+
+    with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"rows": len(body), "columns": columns}, f, indent=4, ensure_ascii=False)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    print(f"Wrote snapshot {path}")
+
+
+def read_row_count(path):
+    """Returns the number of data rows of a snapshot without loading any column."""
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)["rows"]
+
+
+class Snapshot:
+    """Read-only view of a snapshot; every array is memory-mapped, nothing is parsed."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.columns = {column["name"]: column for column in meta["columns"]}
+        self.header = [column["name"] for column in meta["columns"]]
+
+    def __len__(self):
+        return self.rows
+
+    def _load(self, name, part):
+        import numpy as np
+
+        return np.load(os.path.join(self.path, self.columns[name]["files"][part]), mmap_mode='r')
+
+    def text(self, name):
+        """Returns the exported text of a column."""
+        return self._load(name, "text")
+
+    def values(self, name):
+        """Returns the typed values of a column (category codes for categorical columns)."""
+        column = self.columns[name]
+        return self._load(name, "values" if "values" in column["files"] else "text")
+
+    def categories(self, name):
+        return self._load(name, "categories")
+
+    def series(self, name):
+        """Returns a column as a pandas Series of its type (datetime64, category, float64 or str)."""
+        import numpy as np
+        import pandas as pd
+
+        kind = self.columns[name]["type"]
+        if kind == "category":
+            categories, codes = self.categories(name), self.values(name)
+            numeric = categories.astype(np.int64) if all(c.isdigit() for c in categories.tolist()) else None
+            if numeric is not None and len(np.unique(numeric)) == len(numeric):
+                # Numeric stock codes compare and sort like pandas.read_csv read them
+                order = np.argsort(numeric)
+                rank = np.empty_like(order)
+                rank[order] = np.arange(len(order))
+                categories, codes = numeric[order], rank[codes]
+            return pd.Series(pd.Categorical.from_codes(codes, categories), name=name)
+        if kind == "date":
+            # pandas has no day resolution, seconds are the closest
+            return pd.Series(self.values(name).astype('datetime64[s]'), name=name)
+        return pd.Series(self.values(name), name=name)
+
+    def text_rows(self, positions=None):
+        """Returns the exported rows (header excluded), optionally only those at positions."""
+        columns = [self.text(name) for name in self.header]
+        if positions is not None:
+            columns = [column[positions] for column in columns]
+        return [list(row) for row in zip(*(column.tolist() for column in columns))]
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+The IPO workflow as a graph of stages, run on a process pool:
+
+    convert-twse -> filter-twse --.
+                                   >-> merge(-filter) -> dedupe(-filter) -> manifest
+    convert-tpex -> filter-tpex --'                 \\-> delta, analytics, render-*
+    auction ---------------------------------------> dedupe(-filter)
+
+Every node calls one function of the existing scripts (twse_ipo.process_file,
+convert_date_format.convert_and_fix_csv, csv_filter.filter_file,
+ipo_merge.merge_files, duplicate_remover.process_files,
+metrics.update_manifest, csv_to_md.read_file, ...) on files, so the TWSE
+and TPEX branches, the two dedupe runs and the renders run at the same time:
+
+    python ipo.py graph [--workdir .] [--jobs N] [--force] [--dry-run]
+
+A node is skipped when its code (its module and every repository module and
+data file that module uses) and arguments, the SHA-256 of every input and of
+every output are the same as when it last ran (stage-graph.json), so a
+day on which only one exchange changed only re-runs that branch, and a node
+whose output came out unchanged stops the re-run there. The critical path
+(the chain of nodes that decided the wall time) is printed at the end.
+"""
+import argparse
+import ast
+import contextlib
+import functools
+import hashlib
+import importlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import sys
+import time
+
+import analytics
+import instrument
+from delta_log import DELTA_LOG, DELTA_SOURCE
+from metrics import BADGES, EXTRA_BADGES
+from pipeline import MARKDOWN, MERGES, TPEX_RAW, TWSE_RAW
+from snapshot import snapshot_path
+
+# Content hashes of the last successful run of every node, committed with the results
+STATE_FILE = "stage-graph.json"
+
+# The scripts (and the modules a node's code hash follows) live next to this file
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Data files read by a module, hashed with its code
+MODULE_DATA = {"filter_rules": ["filter-rules.json"]}
+
+# Files only the graph needs between runs
+WORK_DIR = ".stage-graph"
+AUCTION_FILE = os.path.join(WORK_DIR, "auction-company.csv")
+# The merged table the last delta was computed on
+DELTA_BASELINE = os.path.join(WORK_DIR, DELTA_SOURCE)
+# The valid filings the stored analytics aggregates were made from
+ANALYTICS_BASELINE = os.path.join(WORK_DIR, analytics.SOURCE)
+# The TPEX list as downloaded; convert-tpex writes the converted list under the download's name
+TPEX_DOWNLOAD = os.path.join(WORK_DIR, "TPEX-download.csv")
+
+# (baseline copy, table) of the nodes that work on the changes since their previous run
+BASELINES = [(DELTA_BASELINE, DELTA_SOURCE), (ANALYTICS_BASELINE, analytics.SOURCE)]
+
+
+class Node:
+    """
+    One stage: module.function(*args, **kwargs), run in a worker process with
+    the work directory as current directory.
+
+    Args:
+        inputs (list): Files (or snapshot directories) the node reads; a node
+            that produces one of them runs first
+        outputs (list): Files the node writes
+        stdout (str, optional): File the function's standard output goes to
+            (for scripts that print their result)
+        appends (list, optional): Files the node appends to only when it has
+            something to add; outputs that may be missing or left as they are
+        after (list, optional): Nodes to wait for without sharing a file
+        always (bool): Never skipped (its result depends on more than its inputs)
+    """
+
+    def __init__(self, name, module, function, args=(), kwargs=None, inputs=(), outputs=(), stdout=None,
+                 appends=(), after=(), always=False):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.args = list(args)
+        self.kwargs = kwargs or {}
+        self.inputs = list(inputs)
+        self.outputs = list(outputs) + ([stdout] if stdout else []) + list(appends)
+        self.stdout = stdout
+        self.appends = list(appends)
+        self.after = list(after)
+        self.always = always
+        self.deps = []
+
+    def required_outputs(self):
+        """The outputs every run has to write."""
+        return [path for path in self.outputs if path not in self.appends]
+
+    def signature(self):
+        """Hash of the call and of the code it runs; a change re-runs the node."""
+        call = json.dumps([self.module, self.function, self.args, self.kwargs, self.stdout, code_hash(self.module)],
+                          ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(call.encode('utf-8')).hexdigest()
+
+
+def local_imports(path):
+    """Top-level names of every module imported by a source file, including imports inside functions."""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def module_file(name):
+    """The source file of a module of this repository, None for the standard library and packages."""
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if not spec or not spec.origin or not spec.origin.endswith(".py"):
+        return None
+    return spec.origin if os.path.dirname(os.path.abspath(spec.origin)) == ROOT else None
+
+
+def local_modules(module):
+    """The module and every repository module it imports, directly or through others, by name."""
+    found, pending = {}, [module]
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        path = module_file(name)
+        if path is None:
+            continue
+        found[name] = path
+        pending.extend(local_imports(path))
+    return found
+
+
+@functools.lru_cache(maxsize=None)
+def code_hash(module):
+    """
+    SHA-256 of the source of a module, of every repository module it imports
+    (transitively) and of the data files those read (MODULE_DATA), so editing
+    a helper such as filter_rules.py or filter-rules.json re-runs the nodes using it.
+    """
+    digest = hashlib.sha256()
+    for name, path in sorted(local_modules(module).items()):
+        files = [path] + [os.path.join(ROOT, data) for data in MODULE_DATA.get(name, [])]
+        for file_path in files:
+            digest.update(os.path.basename(file_path).encode('utf-8') + b"\0")
+            digest.update((content_hash(file_path) or "missing").encode('ascii'))
+    return digest.hexdigest()
+
+
+def build_graph(auction_source=None, auction_ttl=None, dedupe_state=None, md_pad=False):
+    """
+    Returns the nodes of the workflow, in the order the pipeline runs its stages.
+
+    Args:
+        auction_source (str, optional): URL, file:// URL or local path of the auction data
+        auction_ttl (float, optional): Seconds a cached auction download is used without revalidating it
+        dedupe_state (str, optional): Decisions file of the incremental dedupe mode
+        md_pad (bool): Pad the Markdown tables to equal column widths
+    """
+    from auction_cache import DEFAULT_TTL, GITHUB_AUCTION_URL, local_path
+    from filter_rules import RULES_FILE
+
+    auction_source = auction_source or GITHUB_AUCTION_URL
+    auction_input = local_path(auction_source)
+    nodes = [
+        Node("convert-twse", "twse_ipo", "process_file", [TWSE_RAW, "TWSE-IPO-utf8.csv"],
+             inputs=[TWSE_RAW], outputs=["TWSE-IPO-utf8.csv"]),
+        # Reads the copy of the download run_graph() keeps, so its input is not its own output
+        Node("convert-tpex", "convert_date_format", "convert_and_fix_csv", [TPEX_DOWNLOAD, "TPEX-IPO-utf8.csv"],
+             inputs=[TPEX_DOWNLOAD], outputs=["TPEX-IPO-utf8.csv"]),
+    ]
+    for exchange, source in (("twse", "TWSE-IPO-utf8.csv"), ("tpex", "TPEX-IPO-utf8.csv")):
+        filtered = source.replace(".csv", "-filter.csv")
+        nodes.append(Node(f"filter-{exchange}", "csv_filter", "filter_file", [source, filtered, RULES_FILE],
+                          inputs=[source, RULES_FILE], outputs=[filtered]))
+    # A remote source can change at any time, so it is fetched (through the auction cache) on every run
+    nodes.append(Node("auction", "duplicate_remover", "download_auction_data", [auction_source],
+                      {"local_file": AUCTION_FILE, "ttl": DEFAULT_TTL if auction_ttl is None else auction_ttl},
+                      inputs=[auction_input] if auction_input else [], outputs=[AUCTION_FILE],
+                      always=auction_input is None))
+
+    for first, second, stacked, sorted_name, deduped in MERGES:
+        suffix = "-filter" if "filter" in first else ""
+        snapshot_dir = snapshot_path(sorted_name)
+        nodes.append(Node(f"merge{suffix}", "ipo_merge", "merge_files", [first, second, stacked, sorted_name, snapshot_dir],
+                          inputs=[first, second], outputs=[stacked, sorted_name, snapshot_dir]))
+        nodes.append(Node(f"dedupe{suffix}", "duplicate_remover", "process_files", [snapshot_dir, deduped],
+                          {"state_file": dedupe_state, "auction_source": AUCTION_FILE},
+                          inputs=[snapshot_dir, AUCTION_FILE], outputs=[deduped],
+                          # Both runs read and rewrite the one decisions file
+                          after=["dedupe"] if dedupe_state and suffix else []))
+
+    nodes.append(Node("delta", "delta_log", "record_delta", [DELTA_SOURCE, DELTA_BASELINE, DELTA_LOG],
+                      inputs=[DELTA_SOURCE], outputs=[DELTA_BASELINE], appends=[DELTA_LOG]))
+    tables = [name for node in nodes for name in node.outputs if name.endswith(".csv") and not name.startswith(WORK_DIR)]
+    # Writes every badge from the row counts in the manifest, parsing only the CSVs that changed. The
+    # new-filings badge depends on the date as well, so it runs every time
+    badges = [badge for badge, _, _ in BADGES] + [badge for badge, _, _, _ in EXTRA_BADGES]
+    nodes.append(Node("manifest", "metrics", "update_manifest", [tables], inputs=tables,
+                      outputs=["pipeline-manifest.json"] + badges, always=True))
+    for markdown, source in MARKDOWN:
+        nodes.append(Node(f"render-{os.path.splitext(markdown)[0]}", "csv_to_md", "read_file", [source, 'utf-8', md_pad],
+                          inputs=[source], stdout=markdown))
+    nodes.append(Node("analytics", "analytics", "update_files", [analytics.SOURCE, ANALYTICS_BASELINE],
+                      inputs=[analytics.SOURCE], outputs=analytics.EXPORTS + [analytics.STATE_FILE, ANALYTICS_BASELINE]))
+    return nodes
+
+
+def resolve(nodes):
+    """
+    Links every node to the nodes producing its inputs.
+
+    Returns:
+        list: The nodes in a topological order
+
+    Raises:
+        ValueError: If two nodes write the same file, a dependency is unknown or the graph has a cycle
+    """
+    by_name = {node.name: node for node in nodes}
+    producers = {}
+    for node in nodes:
+        for output in node.outputs:
+            if output in producers:
+                raise ValueError(f"{output} is written by both {producers[output].name} and {node.name}")
+            producers[output] = node
+    for node in nodes:
+        unknown = [name for name in node.after if name not in by_name]
+        if unknown:
+            raise ValueError(f"{node.name} waits for unknown nodes: {', '.join(unknown)}")
+        deps = [producers[path].name for path in node.inputs if path in producers]
+        node.deps = list(dict.fromkeys(deps + node.after))
+
+    ordered, done = [], set()
+    pending = list(nodes)
+    while pending:
+        ready = [node for node in pending if all(dep in done for dep in node.deps)]
+        if not ready:
+            raise ValueError(f"The stage graph has a cycle through {', '.join(node.name for node in pending)}")
+        for node in ready:
+            ordered.append(node)
+            done.add(node.name)
+            pending.remove(node)
+    return ordered
+
+
+def content_hash(path):
+    """SHA-256 of a file, or of the names and contents of every file in a directory; None if missing."""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode('utf-8') + b"\0")
+                with open(file_path, 'rb') as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def fingerprint(node, workdir):
+    """The signature of a node and the content hashes of its inputs and outputs, as stored in STATE_FILE."""
+    return {
+        "signature": node.signature(),
+        "inputs": {path: content_hash(os.path.join(workdir, path)) for path in node.inputs},
+        "outputs": {path: content_hash(os.path.join(workdir, path)) for path in node.outputs},
+    }
+
+
+def is_unchanged(node, record, workdir):
+    """True if the node last ran with the same code, the same inputs and left the outputs as they are now."""
+    if node.always or not record:
+        return False
+    current = fingerprint(node, workdir)
+    return current == record and all(current["outputs"][path] is not None for path in node.required_outputs())
+
+
+def load_state(workdir="."):
+    try:
+        with open(os.path.join(workdir, STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        print(f"Ignoring unreadable {STATE_FILE}: {e}")
+        return {}
+
+
+def save_state(state, workdir="."):
+    path = os.path.join(workdir, STATE_FILE)
+    with open(f"{path}.part", 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=4, ensure_ascii=False, sort_keys=True)
+    os.replace(f"{path}.part", path)
+
+
+def keep_download(workdir, record):
+    """
+    Copies a newly downloaded TPEX list to TPEX_DOWNLOAD. The file is new
+    unless it is the converted list the last convert-tpex run left behind.
+    """
+    converted = os.path.join(workdir, TPEX_RAW)
+    download = os.path.join(workdir, TPEX_DOWNLOAD)
+    last_output = (record or {}).get("outputs", {}).get(TPEX_RAW)
+    if os.path.exists(converted) and (content_hash(converted) != last_output or not os.path.exists(download)):
+        shutil.copyfile(converted, f"{download}.part")
+        os.replace(f"{download}.part", download)
+
+
+def modified_since(path, since):
+    """True if the file (or any file in the directory) was written after since (time.time())."""
+    if os.path.isdir(path):
+        return any(os.path.getmtime(os.path.join(root, name)) >= since
+                   for root, _, files in os.walk(path) for name in files)
+    return os.path.exists(path) and os.path.getmtime(path) >= since
+
+
+def run_node(name, module, function, args, kwargs, stdout, outputs):
+    """
+    Runs one node in a worker process. The scripts report errors by printing
+    them, so a node also fails if the function returns False or an output
+    was not written.
+
+    Returns:
+        dict: wall_s, error (None on success), log (the captured output) and
+              the instrument records of the stages it ran
+    """
+    instrument.configure(script="graph")
+    log = io.StringIO()
+    started, start = time.time(), time.perf_counter()
+    error = None
+    try:
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(contextlib.redirect_stderr(log))
+            out = stack.enter_context(open(stdout, 'w', encoding='utf-8', newline='')) if stdout else log
+            stack.enter_context(contextlib.redirect_stdout(out))
+            with instrument.stage(name, quiet=True):
+                result = getattr(importlib.import_module(module), function)(*args, **kwargs)
+        if result is False:
+            error = f"{function} failed"
+        else:
+            missing = [path for path in outputs if not modified_since(path, started - 1)]
+            if missing:
+                error = f"{function} did not write {', '.join(missing)}"
+    except (Exception, SystemExit) as e:
+        error = f"{e.__class__.__name__}: {e}"
+    return {"wall_s": time.perf_counter() - start, "error": error, "log": log.getvalue(),
+            "records": instrument.take_records()}
+
+
+def init_worker(workdir):
+    os.chdir(workdir)
+
+
+def critical_path(nodes, durations):
+    """
+    The chain of dependent nodes with the largest total duration.
+
+    Returns:
+        tuple: (list of node names, total seconds)
+    """
+    finish, previous = {}, {}
+    for node in nodes:
+        start = max(((finish[dep], dep) for dep in node.deps if dep in finish), default=(0.0, None))
+        finish[node.name] = start[0] + durations.get(node.name, 0.0)
+        previous[node.name] = start[1]
+    if not finish:
+        return [], 0.0
+    name = max(finish, key=finish.get)
+    total, path = finish[name], []
+    while name:
+        path.append(name)
+        name = previous[name]
+    return path[::-1], total
+
+
+def run_graph(nodes, workdir=".", jobs=None, force=False, dry_run=False):
+    """
+    Runs the nodes on a process pool, each as soon as the nodes it depends on
+    are done, skipping those whose inputs and outputs are unchanged.
+
+    Args:
+        nodes (list): The nodes (see build_graph)
+        workdir (str): Directory with the inputs; every path is relative to it
+        jobs (int, optional): Worker processes (default: one per CPU)
+        force (bool): Run every node
+        dry_run (bool): Only print which nodes would run
+
+    Returns:
+        dict: node name -> "ran", "skipped", "failed" or "blocked"
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    nodes = resolve(nodes)
+    by_name = {node.name: node for node in nodes}
+    state = load_state(workdir)
+    if not dry_run:
+        os.makedirs(os.path.join(workdir, WORK_DIR), exist_ok=True)
+        for baseline, table in BASELINES:
+            baseline, table = os.path.join(workdir, baseline), os.path.join(workdir, table)
+            if not os.path.exists(baseline) and os.path.exists(table):
+                # The first graph run compares with the table the previous run (of any runner) left behind
+                shutil.copyfile(table, baseline)
+        keep_download(workdir, state.get("convert-tpex"))
+
+    status, durations, running = {}, {}, {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(os.path.abspath(workdir),)) as pool:
+        while len(status) < len(nodes):
+            progressed = False
+            for node in nodes:
+                if node.name in status or node.name in running.values():
+                    continue
+                if any(status.get(dep) in ("failed", "blocked") for dep in node.deps):
+                    status[node.name] = "blocked"
+                    failed = [dep for dep in node.deps if status.get(dep) in ("failed", "blocked")]
+                    print(f"== {node.name} not run, it needs {', '.join(failed)}")
+                    progressed = True
+                    continue
+                if not all(status.get(dep) in ("ran", "skipped") for dep in node.deps):
+                    continue
+                # In a dry run the outputs of a node that would run are not rewritten yet
+                stale = dry_run and any(status[dep] == "ran" for dep in node.deps)
+                if not force and not stale and is_unchanged(node, state.get(node.name), workdir):
+                    status[node.name] = "skipped"
+                    print(f"== {node.name} skipped, inputs unchanged")
+                    progressed = True
+                elif dry_run:
+                    status[node.name] = "ran"
+                    print(f"== {node.name} would run")
+                    progressed = True
+                else:
+                    future = pool.submit(run_node, node.name, node.module, node.function, node.args, node.kwargs,
+                                         node.stdout, node.required_outputs())
+                    running[future] = node.name
+            if progressed:
+                # Skipped nodes may have made others ready
+                continue
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result = future.result()
+                instrument.add_records(result["records"])
+                durations[name] = result["wall_s"]
+                print(f"== {name} {'failed' if result['error'] else 'done'} in {result['wall_s']:.2f}s")
+                for line in result["log"].splitlines():
+                    print(f"    {line}")
+                if result["error"]:
+                    status[name] = "failed"
+                    print(f"Error: {result['error']}")
+                    state.pop(name, None)
+                else:
+                    status[name] = "ran"
+                    state[name] = fingerprint(by_name[name], workdir)
+            save_state(state, workdir)
+    wall = time.perf_counter() - start
+
+    counts = {value: sum(1 for s in status.values() if s == value) for value in ("ran", "skipped", "failed", "blocked")}
+    if dry_run:
+        print(f"\n{counts['ran']} would run, {counts['skipped']} skipped")
+        return status
+    print(f"\n{counts['ran']} ran, {counts['skipped']} skipped, {counts['failed']} failed, "
+          f"{counts['blocked']} not run in {wall:.2f}s ({sum(durations.values()):.2f}s of node time)")
+    if durations:
+        path, total = critical_path(nodes, durations)
+        steps = [f"{name} {durations[name]:.2f}s" if name in durations else f"{name} (skipped)" for name in path]
+        print(f"Critical path ({total:.2f}s): {' -> '.join(steps)}")
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the IPO workflow as a stage graph on a process pool.')
+    parser.add_argument('--workdir', default='.', help='Directory with applylisting.csv and TPEX-IPO-utf8.csv')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='Run every node, even if its inputs are unchanged')
+    parser.add_argument('--dry-run', action='store_true', help='Only show which nodes would run')
+    parser.add_argument('--auction-source', '--auction-file', default=None,
+                        help='URL, file:// URL or local path of the auction data (default: GitHub, cached in .auction-cache)')
+    parser.add_argument('--auction-ttl', type=float, default=None,
+                        help='Seconds a cached auction download is used without revalidating it')
+    parser.add_argument('--dedupe-state', default=None,
+                        help='Only re-evaluate duplicate stock codes that changed since the decisions stored in this JSON file')
+    parser.add_argument('--md-pad', action='store_true',
+                        help='Pad the Markdown tables to equal column widths (the former csv2md layout)')
+    parser.add_argument('--report', default=None,
+                        help=f'Append the per-node timings to this JSON run report (default: ${instrument.REPORT_ENV})')
+    args = parser.parse_args(argv)
+    instrument.configure(args.report)
+
+    # The nodes run with --workdir as current directory
+    from auction_cache import local_path
+    if args.auction_source and local_path(args.auction_source) is not None:
+        args.auction_source = os.path.abspath(local_path(args.auction_source))
+    if args.dedupe_state:
+        args.dedupe_state = os.path.abspath(args.dedupe_state)
+
+    try:
+        nodes = build_graph(args.auction_source, args.auction_ttl, args.dedupe_state, args.md_pad)
+        status = run_graph(nodes, args.workdir, args.jobs, args.force, args.dry_run)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if any(value in ("failed", "blocked") for value in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
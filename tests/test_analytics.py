@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import analytics
+from delta_log import read_table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def table():
+    return read_table(os.path.join(ROOT, analytics.SOURCE))
+
+
+def edited(table):
+    """The table with the first rows dropped, one row changed and one row added."""
+    header, rows = table[0], [list(row) for row in table[1:]]
+    rows = rows[3:]
+    rows[10][header.index(analytics.UNDERWRITER)] = "新承銷商證券"
+    added = list(rows[20])
+    added[header.index("股票代號")] = "9999"
+    added[header.index(analytics.PRICE)] = "123.5"
+    return [header, added] + rows
+
+
+def test_incremental_update_equals_a_rebuild(table, capsys):
+    state = analytics.update_views(None, table)
+    current = edited(table)
+    updated = analytics.update_views(table, current, state)
+    assert "old rows subtracted" in capsys.readouterr().out
+
+    assert updated["views"] == analytics.update_views(None, current)["views"]
+    assert updated["views"]["underwriters"]["新承銷商"][0] == 1
+
+
+def test_update_of_an_unchanged_table_keeps_the_views(table):
+    state = analytics.update_views(None, table)
+    again = analytics.update_views(table, [list(row) for row in table], state)
+    assert again["views"] == state["views"]
+    assert again["updated"] == state["updated"]
+
+
+def test_changed_definitions_rebuild_the_views(table, monkeypatch, capsys):
+    state = analytics.update_views(None, table)
+    monkeypatch.setattr(analytics, "PRICE_BUCKETS", [0, 50, 100])
+    capsys.readouterr()
+
+    updated = analytics.update_views(table, edited(table), state)
+
+    assert "rebuilt from" in capsys.readouterr().out
+    assert updated["schema"] != state["schema"]
+    assert set(updated["views"]["price"]) <= {"0-50", "50-100", "100+"}
+
+
+def test_state_without_a_schema_is_rebuilt(table, capsys):
+    state = analytics.update_views(None, table)
+    del state["schema"]
+    capsys.readouterr()
+    analytics.update_views(table, table, state)
+    assert "rebuilt from" in capsys.readouterr().out
+
+
+def test_main_writes_every_export(tmp_path):
+    with open(os.path.join(ROOT, analytics.SOURCE), 'rb') as f:
+        (tmp_path / analytics.SOURCE).write_bytes(f.read())
+    analytics.main(["--workdir", str(tmp_path)])
+    for name in analytics.EXPORTS + [analytics.STATE_FILE]:
+        assert (tmp_path / name).stat().st_size > 0
+    assert analytics.load_state(str(tmp_path))["schema"] == analytics.schema_hash()
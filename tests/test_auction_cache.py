@@ -0,0 +1,125 @@
+import http.server
+import json
+import pathlib
+import threading
+
+import pytest
+
+import auction_cache
+
+AUCTION_CSV = "開標日期,股票代號\n2024/01/15,1101\n".encode('utf-8')
+LAST_MODIFIED = "Mon, 15 Jan 2024 00:00:00 GMT"
+
+
+@pytest.fixture
+def server():
+    """Serves /auction-company.csv with an ETag and Last-Modified; yields (url, state)."""
+    state = {"body": AUCTION_CSV, "etag": '"v1"', "status": 200, "requests": []}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["requests"].append(dict(self.headers))
+            if state["status"] != 200:
+                self.send_error(state["status"])
+                return
+            # If-None-Match takes precedence over If-Modified-Since
+            etag = self.headers.get("If-None-Match")
+            if etag == state["etag"] or (etag is None and self.headers.get("If-Modified-Since") == LAST_MODIFIED):
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", state["etag"])
+            self.send_header("Last-Modified", LAST_MODIFIED)
+            self.send_header("Content-Length", str(len(state["body"])))
+            self.end_headers()
+            self.wfile.write(state["body"])
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/auction-company.csv", state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def load(url, cache_dir, ttl=0):
+    return auction_cache.load_auction_bytes(url, cache_dir=str(cache_dir), ttl=ttl, timeout=5)
+
+
+def test_download_is_cached_with_its_validators(server, tmp_path):
+    url, state = server
+    assert load(url, tmp_path) == AUCTION_CSV
+
+    csv_path, meta_path = auction_cache.cache_paths(str(tmp_path))
+    assert pathlib.Path(csv_path).read_bytes() == AUCTION_CSV
+    meta = json.loads(pathlib.Path(meta_path).read_text(encoding='utf-8'))
+    assert meta["url"] == url
+    assert meta[auction_cache.CACHE_NAME]["etag"] == '"v1"'
+    assert meta[auction_cache.CACHE_NAME]["last_modified"] == LAST_MODIFIED
+
+
+def test_copy_within_the_ttl_is_used_without_a_request(server, tmp_path):
+    url, state = server
+    load(url, tmp_path)
+    state["body"] = b"changed"
+
+    assert load(url, tmp_path, ttl=3600) == AUCTION_CSV
+    assert len(state["requests"]) == 1
+
+
+def test_stale_copy_is_revalidated_with_etag_and_last_modified(server, tmp_path, capsys):
+    url, state = server
+    load(url, tmp_path)
+
+    assert load(url, tmp_path) == AUCTION_CSV
+    assert state["requests"][-1]["If-None-Match"] == '"v1"'
+    assert state["requests"][-1]["If-Modified-Since"] == LAST_MODIFIED
+    assert "not modified" in capsys.readouterr().out
+
+    state["body"], state["etag"] = b"new,data\n", '"v2"'
+    assert load(url, tmp_path) == b"new,data\n"
+    assert pathlib.Path(auction_cache.cache_paths(str(tmp_path))[0]).read_bytes() == b"new,data\n"
+
+
+def test_failed_request_falls_back_to_the_stale_copy(server, tmp_path, capsys):
+    url, state = server
+    load(url, tmp_path)
+    state["status"] = 500
+
+    assert load(url, tmp_path) == AUCTION_CSV
+    assert "Falling back to the stale cached copy" in capsys.readouterr().out
+
+
+def test_failed_request_without_a_copy_raises(server, tmp_path):
+    url, state = server
+    state["status"] = 500
+    with pytest.raises(Exception):
+        load(url, tmp_path)
+
+
+def test_copy_of_another_url_is_not_used(server, tmp_path):
+    url, state = server
+    load(url, tmp_path, ttl=3600)
+    state["status"] = 404
+
+    # Neither served within the TTL nor as a stale copy
+    with pytest.raises(Exception):
+        load(url + "?other", tmp_path, ttl=3600)
+    state["status"] = 200
+    assert load(url + "?other", tmp_path, ttl=3600) == AUCTION_CSV
+    assert "If-None-Match" not in state["requests"][-1]
+
+
+@pytest.mark.parametrize("as_url", [False, True])
+def test_local_path_and_file_url_are_read_directly(tmp_path, as_url):
+    path = tmp_path / "auction.csv"
+    path.write_bytes(AUCTION_CSV)
+    source = path.as_uri() if as_url else str(path)
+
+    assert auction_cache.local_path(source) == str(path)
+    assert load(source, tmp_path / "cache") == AUCTION_CSV
+    assert not (tmp_path / "cache").exists()
+    assert auction_cache.local_path("https://example.com/a.csv") is None
@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+import sys
+
+import csv_filter
+from filter_rules import load_rules
+
+ROWS = [
+    csv_filter.HEADER,
+    ["2024/01/02", "1101", "甲", "", "1000", "", "", "", "", "元大", "", ""],
+    ["2024/01/05", "2202", "乙", "", "1000", "", "", "", "", "元大", "", "自行撤件"],
+    ["1999/01/05", "3303", "丙", "", "1000", "", "", "", "", "元大", "", ""],
+]
+
+
+def run_main(monkeypatch, argv, rows):
+    text = io.StringIO()
+    csv.writer(text).writerows(rows)
+    stdin, stdout = io.TextIOWrapper(io.BytesIO(text.getvalue().encode("utf-8"))), io.BytesIO()
+    monkeypatch.setattr(sys, "stdin", stdin)
+    monkeypatch.setattr(sys, "stdout", io.TextIOWrapper(stdout, encoding="utf-8"))
+    csv_filter.main(argv)
+    sys.stdout.flush()
+    return stdout.getvalue().decode("utf-8")
+
+
+def test_default_rules(monkeypatch):
+    output = run_main(monkeypatch, [], ROWS)
+    assert '"1101"' in output
+    assert '"2202"' not in output and '"3303"' not in output
+
+
+def test_rules_file_applies_to_main_only(monkeypatch, tmp_path):
+    rules = dict(load_rules(), forbidden_keywords=[], min_year=1990)
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules), encoding="utf-8")
+    before = dict(csv_filter.default_filter().hits)
+
+    output = run_main(monkeypatch, ["--rules", str(path)], ROWS)
+
+    assert all(f'"{code}"' in output for code in ["1101", "2202", "3303"])
+    # The default rules used by filter_table() were neither replaced nor counted
+    assert dict(csv_filter.default_filter().hits) == before
+    assert [row[1] for row in csv_filter.filter_table(ROWS[1:])] == ["1101"]
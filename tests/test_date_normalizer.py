@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+import date_normalizer
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    date_normalizer._roc_to_gregorian.cache_clear()
+    yield
+    date_normalizer._roc_to_gregorian.cache_clear()
+
+
+@pytest.mark.parametrize("roc, gregorian", [
+    ("113/01/05", "2024/01/05"),
+    ("115/04/16", "2026/04/16"),
+    ("99/12/31", "2010/12/31"),
+    ("1/1/1", "1912/01/01"),
+    (" 113/2/29 ", "2024/02/29"),
+    # Already Gregorian
+    ("2024/01/05", "2024/01/05"),
+    ("2011/4/29", "2011/04/29"),
+])
+def test_roc_to_gregorian(roc, gregorian):
+    assert date_normalizer.roc_to_gregorian(roc) == gregorian
+
+
+@pytest.mark.parametrize("value", ["", "   ", None])
+def test_empty_cells_stay_empty_silently(value, capsys):
+    assert date_normalizer.roc_to_gregorian(value) == ""
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("value", ["113/02/30", "113-01-05", "113/01", "abc/01/05", "撤件"])
+def test_malformed_cells_are_reported_once(value, capsys):
+    assert date_normalizer.roc_to_gregorian(value) == ""
+    assert date_normalizer.roc_to_gregorian(value) == ""
+    out = capsys.readouterr().out
+    assert out.count(f"Error converting date '{value}'") == 1
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("20240105", "2024/01/05"),
+    ("2024/01/05", "2024/01/05"),
+    ("", ""),
+    ("2024015", "2024015"),
+])
+def test_compact_to_slashed(value, expected):
+    assert date_normalizer.compact_to_slashed(value) == expected
+
+
+def test_parse_column_slashed_dates():
+    values = pd.Series(["2024/01/05", "2023/12/31", "2024/01/05", None, "撤件", ""], index=list("abcdef"), name="申請日期")
+    parsed = date_normalizer.parse_column(values)
+    assert parsed.name == "申請日期"
+    assert list(parsed.index) == list("abcdef")
+    assert parsed.iloc[:3].tolist() == [pd.Timestamp("2024-01-05"), pd.Timestamp("2023-12-31"), pd.Timestamp("2024-01-05")]
+    assert parsed.iloc[3:].isna().all()
+    assert date_normalizer.iso_strings(parsed) == ["2024-01-05", "2023-12-31", "2024-01-05", None, None, None]
+
+
+@pytest.mark.parametrize("values, date_format", [
+    (["2024-01-05", "2023-12-31"], None),
+    (["24/01/05", "23/12/31"], None),
+    (["20240105", "20231231"], "%Y%m%d"),
+])
+def test_parse_column_formats(values, date_format):
+    parsed = date_normalizer.parse_column(pd.Series(values), date_format)
+    assert date_normalizer.iso_strings(parsed) == ["2024-01-05", "2023-12-31"]
+
+
+def test_parse_column_keeps_parsed_dates():
+    dates = pd.Series(pd.to_datetime(["2024-01-05"]))
+    assert date_normalizer.parse_column(dates) is dates
+
+
+def test_parse_column_empty():
+    assert len(date_normalizer.parse_column(pd.Series([], dtype=object))) == 0
+
+
+@pytest.mark.parametrize("sample, date_format", [
+    ("2024/01/05", "%Y/%m/%d"),
+    ("24/01/05", "%y/%m/%d"),
+    ("2024-01-05", "%Y-%m-%d"),
+    ("20240105", None),
+])
+def test_detect_format(sample, date_format):
+    assert date_normalizer.detect_format(sample) == date_format
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+import delta_log
+
+HEADER = ["申請日期", "股票代號", "公司名稱", "股票上櫃買賣日期", "備註"]
+
+PREVIOUS = [
+    HEADER,
+    ["2024/01/02", "1101", "甲", "", ""],
+    ["2024/01/05", "2202", "乙", "", ""],
+    ["2023/12/01", "3303", "丙", "", ""],
+]
+CURRENT = [
+    HEADER,
+    ["2024/02/01", "4404", "丁", "", ""],
+    ["2024/01/02", "1101", "甲", "2024/03/01", ""],
+    ["2024/01/05", "2202", "乙二", "", ""],
+]
+
+
+def test_diff_tables_finds_added_changed_and_removed():
+    delta = delta_log.diff_tables(PREVIOUS, CURRENT)
+
+    assert [row["股票代號"] for row in delta["added"]] == ["4404"]
+    assert [row["股票代號"] for row in delta["removed"]] == ["3303"]
+    changed = {entry["股票代號"]: entry for entry in delta["changed"]}
+    assert changed["1101"]["changes"] == {"股票上櫃買賣日期": ["", "2024/03/01"]}
+    assert changed["1101"]["status_change"] is True
+    assert changed["2202"]["changes"] == {"公司名稱": ["乙", "乙二"]}
+    assert changed["2202"]["status_change"] is False
+
+
+def test_same_table_is_an_empty_delta():
+    assert delta_log.is_empty(delta_log.diff_tables(PREVIOUS, [list(row) for row in PREVIOUS]))
+
+
+def test_repeated_keys_are_told_apart():
+    previous = PREVIOUS + [["2024/01/02", "1101", "甲", "", "重複"]]
+    current = PREVIOUS + [["2024/01/02", "1101", "甲", "", "重複"], ["2024/01/02", "1101", "甲", "", "三"]]
+
+    delta = delta_log.diff_tables(previous, current)
+
+    assert delta["added"] == [dict(zip(HEADER, ["2024/01/02", "1101", "甲", "", "三"]))]
+    assert not delta["changed"] and not delta["removed"]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64 * 1024])
+def test_reversed_lines_across_block_boundaries(tmp_path, monkeypatch, block_size):
+    monkeypatch.setattr(delta_log, "BLOCK_SIZE", block_size)
+    lines = [json.dumps({"n": n, "text": "變更" * n}, ensure_ascii=False) for n in range(20)]
+    path = tmp_path / "log.jsonl"
+    path.write_text("\n".join(lines) + "\n\n", encoding='utf-8')
+
+    assert list(delta_log.reversed_lines(str(path))) == lines[::-1]
+
+
+def test_read_entries_last_and_since(tmp_path):
+    path = str(tmp_path / delta_log.DELTA_LOG)
+    delta = delta_log.diff_tables(PREVIOUS, CURRENT)
+    for day in (1, 2, 3):
+        delta_log.append_delta(path, delta, now=datetime(2026, 10, day, 2, tzinfo=timezone.utc))
+    assert delta_log.append_delta(path, delta_log.diff_tables(PREVIOUS, PREVIOUS)) is None
+
+    assert [entry["date"] for entry in delta_log.read_entries(path, last=2)] == ["2026-10-02", "2026-10-03"]
+    assert [entry["date"] for entry in delta_log.read_entries(path, since="2026-10-02")] == ["2026-10-02", "2026-10-03"]
+    assert len(delta_log.read_entries(path)) == 3
+
+
+def test_main_after_shows_only_the_runs_since_then(tmp_path, capsys):
+    path = str(tmp_path / delta_log.DELTA_LOG)
+    delta = delta_log.diff_tables(PREVIOUS, CURRENT)
+    delta_log.append_delta(path, delta, now=datetime(2026, 10, 17, 7, 3, tzinfo=timezone.utc))
+
+    # A run that appended nothing does not show the previous run's entry
+    delta_log.main(["--workdir", str(tmp_path), "--after", "2026-10-18T07:00:00Z"])
+    assert capsys.readouterr().out == "No changes recorded since 2026-10-18T07:00:00Z.\n"
+
+    delta_log.append_delta(path, delta, now=datetime(2026, 10, 18, 7, 2, tzinfo=timezone.utc))
+    delta_log.main(["--workdir", str(tmp_path), "--after", "2026-10-18T07:00:00Z"])
+    out = capsys.readouterr().out
+    assert out.startswith("2026-10-18T07:02:00Z (TWSE_TPEX-IPO-utf8-sort.csv): 1 new")
+    assert "2026-10-17" not in out
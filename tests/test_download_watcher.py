@@ -0,0 +1,91 @@
+import pytest
+
+import download_watcher
+
+
+class FakeClock:
+    """Stands in for the time module: every sleep advances the clock and runs the next scripted step."""
+
+    def __init__(self, steps=()):
+        self.now = 0.0
+        self.steps = list(steps)
+        self.sleeps = 0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.sleeps += 1
+        if self.steps:
+            self.steps.pop(0)()
+
+
+def watch(monkeypatch, tmp_path, steps, **kwargs):
+    clock = FakeClock(steps)
+    monkeypatch.setattr(download_watcher, "time", clock)
+    before = download_watcher.snapshot(tmp_path)
+    return download_watcher.wait_for_download(str(tmp_path), before, poll=1, **kwargs), clock
+
+
+def test_partial_files_are_ignored_until_renamed(monkeypatch, tmp_path):
+    partial = tmp_path / "applylisting.csv.crdownload"
+    temp = tmp_path / "other.tmp"
+
+    def start():
+        partial.write_bytes(b"a" * 10)
+        temp.write_bytes(b"b" * 10)
+
+    def finish():
+        partial.rename(tmp_path / "applylisting.csv")
+
+    path, _ = watch(monkeypatch, tmp_path, [start, lambda: None, lambda: None, finish])
+    assert path == str(tmp_path / "applylisting.csv")
+
+
+def test_waits_until_the_size_is_stable(monkeypatch, tmp_path):
+    target = tmp_path / "applylisting.csv"
+
+    def grow(size):
+        return lambda: target.write_bytes(b"x" * size)
+
+    path, clock = watch(monkeypatch, tmp_path, [grow(10), grow(20), grow(30)])
+    assert path == str(target)
+    assert target.stat().st_size == 30
+    # The size has to be seen unchanged on the poll after the last write
+    assert clock.sleeps == 4
+
+
+def test_empty_file_does_not_count_as_completed(monkeypatch, tmp_path):
+    target = tmp_path / "applylisting.csv"
+    steps = [lambda: target.write_bytes(b""), lambda: None, lambda: target.write_bytes(b"done")]
+    path, _ = watch(monkeypatch, tmp_path, steps)
+    assert path == str(target)
+
+
+def test_files_present_before_are_not_returned(monkeypatch, tmp_path):
+    (tmp_path / "old.csv").write_bytes(b"old")
+    with pytest.raises(TimeoutError, match="No completed download"):
+        watch(monkeypatch, tmp_path, [], timeout=3)
+
+
+def test_timeout_without_a_download(monkeypatch, tmp_path):
+    with pytest.raises(TimeoutError) as error:
+        watch(monkeypatch, tmp_path, [], timeout=3)
+    assert str(tmp_path) in str(error.value)
+
+
+def test_growing_partial_download_extends_the_deadline(monkeypatch, tmp_path):
+    partial = tmp_path / "applylisting.csv.crdownload"
+    steps = [(lambda size=size: partial.write_bytes(b"x" * size)) for size in range(1, 6)]
+    steps.append(lambda: partial.rename(tmp_path / "applylisting.csv"))
+    path, clock = watch(monkeypatch, tmp_path, steps, timeout=2, idle_timeout=2, max_timeout=30)
+    assert path == str(tmp_path / "applylisting.csv")
+    assert clock.now > 2
+
+
+def test_stalled_partial_download_stops_at_max_timeout(monkeypatch, tmp_path):
+    partial = tmp_path / "applylisting.csv.crdownload"
+    steps = [(lambda size=size: partial.write_bytes(b"x" * size)) for size in range(1, 50)]
+    with pytest.raises(TimeoutError):
+        watch(monkeypatch, tmp_path, steps, timeout=2, idle_timeout=5, max_timeout=10)
@@ -0,0 +1,149 @@
+import os
+
+import chromedriver_autoinstaller
+import pytest
+from chromedriver_autoinstaller import utils
+from selenium.common.exceptions import WebDriverException
+
+import driver_manager
+
+
+@pytest.fixture
+def installer(monkeypatch):
+    """Replaces the online chromedriver install with one writing a dummy binary; returns the install calls."""
+    calls = []
+
+    def install(path):
+        calls.append(path)
+        binary = os.path.join(path, utils.get_chromedriver_filename())
+        with open(binary, "wb") as f:
+            f.write(b"chromedriver")
+        return binary
+
+    monkeypatch.setattr(driver_manager, "chrome_version", lambda: "120.0.6099")
+    monkeypatch.setattr(chromedriver_autoinstaller, "install", install)
+    return calls
+
+
+def test_cached_chromedriver_installs_once_per_chrome_version(tmp_path, installer, capsys):
+    cache = tmp_path / "cache"
+    path, cached = driver_manager.cached_chromedriver(str(cache))
+    assert not cached
+    assert path == str(cache / "120.0.6099" / utils.get_chromedriver_filename())
+    assert open(path, "rb").read() == b"chromedriver"
+    assert len(installer) == 1
+    # The staging directory is gone and no partial copy is left behind
+    assert not os.path.exists(installer[0])
+    assert os.listdir(cache / "120.0.6099") == [utils.get_chromedriver_filename()]
+
+    assert driver_manager.cached_chromedriver(str(cache)) == (path, True)
+    assert len(installer) == 1
+
+
+def test_cached_chromedriver_without_chrome_or_driver(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(driver_manager, "chrome_version", lambda: None)
+    assert driver_manager.cached_chromedriver(str(tmp_path)) == (None, False)
+
+    monkeypatch.setattr(driver_manager, "chrome_version", lambda: "120.0.6099")
+    monkeypatch.setattr(chromedriver_autoinstaller, "install", lambda path: None)
+    assert driver_manager.cached_chromedriver(str(tmp_path)) == (None, False)
+    assert os.listdir(tmp_path) == []
+
+
+def test_prune_cache_keeps_the_newest_versions(tmp_path):
+    for age, version in enumerate(["121.0", "120.0", "119.0", "118.0"]):
+        directory = tmp_path / version
+        directory.mkdir()
+        (directory / "chromedriver").write_bytes(b"x")
+        os.utime(directory, (1_000_000 - age * 100, 1_000_000 - age * 100))
+    driver_manager.prune_cache(str(tmp_path), keep=2)
+    assert sorted(os.listdir(tmp_path)) == ["120.0", "121.0"]
+
+
+class FakeDriver:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.quits = 0
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise WebDriverException("gone")
+        return 1
+
+    def quit(self):
+        self.quits += 1
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    """A DriverManager whose start() hands out FakeDrivers instead of launching Chrome."""
+    manager = driver_manager.DriverManager(str(tmp_path), profile_dir=None, cache_dir=str(tmp_path))
+    manager.started = []
+
+    def start():
+        manager.driver = FakeDriver()
+        manager.started.append(manager.driver)
+        return manager.driver
+
+    monkeypatch.setattr(manager, "start", start)
+    return manager
+
+
+def failing(times):
+    calls = []
+
+    def action(driver):
+        calls.append(driver)
+        if len(calls) <= times:
+            raise WebDriverException("crashed")
+        return "done"
+
+    action.calls = calls
+    return action
+
+
+def test_run_restarts_the_browser_and_retries(manager, capsys):
+    action = failing(2)
+    assert manager.run(action) == "done"
+    assert manager.restarts == 2
+    assert len(manager.started) == 3
+    assert [driver.quits for driver in manager.started] == [1, 1, 0]
+    assert action.calls == manager.started
+    assert "restart 2/2" in capsys.readouterr().out
+
+
+def test_run_gives_up_after_max_restarts(manager, capsys):
+    action = failing(10)
+    with pytest.raises(WebDriverException):
+        manager.run(action)
+    assert manager.restarts == manager.max_restarts == 2
+    assert len(action.calls) == 3
+
+
+def test_restarts_are_counted_per_manager(manager, capsys):
+    manager.run(failing(1))
+    with pytest.raises(WebDriverException):
+        manager.run(failing(2))
+    assert manager.restarts == 2
+
+
+def test_other_errors_are_not_retried(manager):
+    def action(driver):
+        raise ValueError("bad page")
+
+    with pytest.raises(ValueError):
+        manager.run(action)
+    assert manager.restarts == 0
+    assert len(manager.started) == 1
+
+
+def test_healthy_driver_is_reused_and_dead_one_replaced(manager, capsys):
+    first = manager.get()
+    assert manager.get() is first
+    first.alive = False
+    second = manager.get()
+    assert second is not first
+    assert first.quits == 1
+    assert "not responding" in capsys.readouterr().out
+    manager.close()
+    assert second.quits == 1 and manager.driver is None
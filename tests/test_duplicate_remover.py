@@ -0,0 +1,135 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import duplicate_remover
+
+
+def ipo_table():
+    """Sorted newest first like TWSE_TPEX-IPO-utf8-filter-sort.csv, with three duplicated stock codes."""
+    return pd.DataFrame({
+        '申請日期': ['2024/06/01', '2024/03/15', '2023/11/20', '2023/05/02', '2022/12/30', '2022/01/10', '2021/07/07'],
+        '股票代號': [1101, 2202, 1101, 3303, 2202, 1101, 4404],
+        '公司名稱': ['甲', '乙', '甲', '丙', '乙', '甲', '丁'],
+    })
+
+
+def auction_table():
+    return pd.DataFrame({
+        '開標日期': ['2024/01/15', '2023/01/20', '2025/09/01'],
+        '股票代號': [1101, 2202, 3303],
+    })
+
+
+def dedupe(df_ipo, df_auction, decisions=None):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        cleaned = duplicate_remover.remove_duplicates(df_ipo, df_auction, decisions)
+    return cleaned, out.getvalue()
+
+
+def test_auction_within_12_months_keeps_that_application():
+    cleaned, _ = dedupe(ipo_table(), auction_table())
+
+    # 1101: the 2023/11/20 filing is followed by the 2024/01/15 auction; 2202: the 2022/12/30 one
+    assert cleaned.index.tolist() == [2, 3, 4, 6]
+
+
+def test_incremental_run_matches_a_full_run_and_reuses_decisions():
+    full, _ = dedupe(ipo_table(), auction_table())
+    decisions = {}
+    first, _ = dedupe(ipo_table(), auction_table(), decisions)
+    second, log = dedupe(ipo_table(), auction_table(), decisions)
+
+    assert first.index.tolist() == full.index.tolist() == second.index.tolist()
+    assert sorted(decisions) == ['1101', '2202']
+    assert "Reused stored decisions for 2 of 2 duplicate stock codes" in log
+    assert "Processing duplicate stock code" not in log
+
+
+def test_changed_auction_re_evaluates_only_that_code():
+    decisions = {}
+    dedupe(ipo_table(), auction_table(), decisions)
+    auction = auction_table()
+    # 2202's auction moves out of the 12 month window of its older filing
+    auction.loc[1, '開標日期'] = '2024/05/20'
+
+    incremental, log = dedupe(ipo_table(), auction, decisions)
+    full, _ = dedupe(ipo_table(), auction)
+
+    assert incremental.index.tolist() == full.index.tolist()
+    assert "Reused stored decisions for 1 of 2 duplicate stock codes" in log
+    assert "Processing duplicate stock code: 2202" in log
+
+
+def test_codes_no_longer_duplicated_are_forgotten():
+    decisions = {}
+    dedupe(ipo_table(), auction_table(), decisions)
+    dedupe(ipo_table().drop(index=[1]), auction_table(), decisions)
+
+    assert sorted(decisions) == ['1101']
+
+
+def synthetic_tables(rows=300, seed=1):
+    """About three filings per stock code, auctions before, within and beyond 12 months of them."""
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(1000, 1000 + rows // 3, size=rows)
+    ipo_dates = np.datetime64('2015-01-01') + rng.integers(0, 3000, size=rows).astype('timedelta64[D]')
+    df_ipo = pd.DataFrame({
+        '申請日期': pd.Series(ipo_dates).dt.strftime('%Y/%m/%d'),
+        '股票代號': codes,
+        '公司名稱': [f"公司{code}" for code in codes],
+    }).sort_values('申請日期', ascending=False, kind='stable').reset_index(drop=True)
+    picked = rng.choice(rows, size=rows // 2)
+    auction_dates = ipo_dates[picked] + rng.integers(-200, 800, size=len(picked)).astype('timedelta64[D]')
+    df_auction = pd.DataFrame({'開標日期': pd.Series(auction_dates).dt.strftime('%Y/%m/%d'), '股票代號': codes[picked]})
+    return df_ipo, df_auction
+
+
+def test_batched_decisions_match_the_row_by_row_reference():
+    df_ipo, df_auction = synthetic_tables()
+    with contextlib.redirect_stdout(io.StringIO()):
+        duplicate_remover.convert_dates(df_ipo, '申請日期')
+        duplicate_remover.convert_dates(df_auction, '開標日期')
+    duplicates = df_ipo[df_ipo.duplicated('股票代號', keep=False)].sort_values('股票代號')
+
+    batched = duplicate_remover.decide_groups(df_ipo, duplicates, df_auction)
+
+    no_auction = df_auction.iloc[0:0]
+    auction_groups = dict(list(df_auction.groupby('股票代號')))
+    assert len(batched) == duplicates['股票代號'].nunique() > 20
+    for code, group in duplicates.groupby('股票代號'):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            verdicts = duplicate_remover.decide_group(df_ipo, group, auction_groups.get(code, no_auction))
+        assert batched[code] == (verdicts, out.getvalue().splitlines()), code
+
+
+@pytest.mark.parametrize("earlier, later", [
+    ("2023-01-31", "2024-01-31"), ("2023-01-31", "2024-01-30"), ("2023-01-31", "2023-02-28"),
+    ("2024-02-29", "2025-02-28"), ("2023-03-15", "2024-03-16"), ("2023-12-01", "2023-12-31"),
+])
+def test_months_between_matches_relativedelta(earlier, later):
+    from dateutil.relativedelta import relativedelta
+
+    earlier, later = pd.Timestamp(earlier), pd.Timestamp(later)
+    diff = relativedelta(later, earlier)
+
+    result = duplicate_remover.months_between(pd.Series([later]), pd.Series([earlier]))
+
+    assert result.tolist() == [diff.years * 12 + diff.months]
+
+
+def test_text_codes_match_numeric_auction_codes():
+    # A KY code makes read_csv and the snapshot keep every IPO code as text, the auction codes stay int64
+    df_ipo = ipo_table()
+    df_ipo['股票代號'] = df_ipo['股票代號'].astype(str)
+    df_ipo.loc[len(df_ipo)] = ['2020/01/01', 'KY01', '戊']
+    decisions = {}
+
+    cleaned, _ = dedupe(df_ipo, auction_table(), decisions)
+
+    assert cleaned.index.tolist() == [2, 3, 4, 6, 7]
+    assert decisions['1101']['rows'][1]['auction_date'] is not None
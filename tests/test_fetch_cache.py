@@ -0,0 +1,86 @@
+import pytest
+
+import fetch_cache
+import fetcher
+
+
+class StaticFetcher:
+    """HTTP-like backend returning fixed content, optionally answering 304 to conditional requests."""
+
+    name = "http"
+
+    def __init__(self, content, etag=None):
+        self.content = content
+        self.etag = etag
+        self.seen_validators = []
+
+    def fetch(self, source, validators=None):
+        self.seen_validators.append(dict(validators or {}))
+        if self.etag and (validators or {}).get("If-None-Match") == self.etag:
+            return None, {"ETag": self.etag}
+        return self.content[source["file"]], ({"ETag": self.etag} if self.etag else {})
+
+    def close(self):
+        pass
+
+
+CONTENT = {"applylisting.csv": b"twse\r\n", "TPEX-IPO-utf8.csv": b"tpex\n"}
+
+
+def run_main(monkeypatch, tmp_path, backend):
+    output = tmp_path / "github-output"
+    monkeypatch.setenv("GITHUB_OUTPUT", str(output))
+    monkeypatch.setattr(fetcher, "make_backends", lambda *args, **kwargs: [backend])
+    with pytest.raises(SystemExit) as exit_info:
+        fetcher.main(["--output-dir", str(tmp_path), "--retries", "0"])
+    lines = output.read_text(encoding='utf-8').splitlines()
+    output.unlink()
+    return exit_info.value.code, lines
+
+
+def test_unchanged_fetch_exits_3_and_sets_changed_false(monkeypatch, tmp_path):
+    backend = StaticFetcher(CONTENT)
+
+    assert run_main(monkeypatch, tmp_path, backend) == (0, ["changed=true"])
+    assert run_main(monkeypatch, tmp_path, backend) == (fetcher.EXIT_UNCHANGED, ["changed=false"])
+
+
+def test_changed_source_exits_0(monkeypatch, tmp_path):
+    run_main(monkeypatch, tmp_path, StaticFetcher(CONTENT))
+
+    changed = dict(CONTENT, **{"TPEX-IPO-utf8.csv": b"tpex, new row\n"})
+    assert run_main(monkeypatch, tmp_path, StaticFetcher(changed)) == (0, ["changed=true"])
+    assert (tmp_path / "TPEX-IPO-utf8.csv").read_bytes() == b"tpex, new row\n"
+
+
+def test_not_modified_keeps_the_file_and_sends_validators(monkeypatch, tmp_path):
+    backend = StaticFetcher(CONTENT, etag='"v1"')
+    run_main(monkeypatch, tmp_path, backend)
+
+    assert run_main(monkeypatch, tmp_path, backend) == (fetcher.EXIT_UNCHANGED, ["changed=false"])
+    assert backend.seen_validators[-1] == {"If-None-Match": '"v1"'}
+    assert (tmp_path / "applylisting.csv").read_bytes() == CONTENT["applylisting.csv"]
+
+
+def test_missing_file_is_fetched_again_even_if_cached(monkeypatch, tmp_path):
+    backend = StaticFetcher(CONTENT, etag='"v1"')
+    run_main(monkeypatch, tmp_path, backend)
+    (tmp_path / "applylisting.csv").unlink()
+
+    assert run_main(monkeypatch, tmp_path, backend)[0] == 0
+    assert (tmp_path / "applylisting.csv").read_bytes() == CONTENT["applylisting.csv"]
+
+
+def test_failed_source_exits_1_and_writes_changed_true(monkeypatch, tmp_path):
+    class Failing(StaticFetcher):
+        def fetch(self, source, validators=None):
+            raise OSError("connection refused")
+
+    assert run_main(monkeypatch, tmp_path, Failing(CONTENT)) == (1, ["changed=true"])
+
+
+def test_update_reports_content_changes():
+    cache = {}
+    assert fetch_cache.update(cache, "TWSE", b"a", {"ETag": "x"}) is True
+    assert fetch_cache.update(cache, "TWSE", b"a", {"ETag": "x"}) is False
+    assert fetch_cache.validators(cache["TWSE"]) == {"If-None-Match": "x"}
@@ -0,0 +1,98 @@
+import functools
+import http.server
+import os
+import threading
+
+import pytest
+
+import fetcher
+
+TWSE_CSV = "公司代號,公司名稱\r\n1234,測試\r\n".encode('cp950')
+TPEX_CSV = '"申請日期","股票代號"\n"20240102","5678"\n'.encode('utf-8')
+
+
+@pytest.fixture
+def stub_server(tmp_path):
+    """Serves applylisting.csv and TPEX-IPO-utf8.csv from a temporary directory; yields the base URL."""
+    served = tmp_path / "served"
+    served.mkdir()
+    (served / "applylisting.csv").write_bytes(TWSE_CSV)
+    (served / "TPEX-IPO-utf8.csv").write_bytes(TPEX_CSV)
+
+    class QuietHandler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(served)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+class FakeSeleniumFetcher:
+    """Stands in for the Chrome backend: returns fixed bytes per source file."""
+
+    name = "selenium"
+    calls = []
+
+    def fetch(self, source, validators=None):
+        FakeSeleniumFetcher.calls.append(source["file"])
+        return {"applylisting.csv": TWSE_CSV, "TPEX-IPO-utf8.csv": TPEX_CSV}[source["file"]], {}
+
+    def close(self):
+        pass
+
+
+def run_main(argv):
+    with pytest.raises(SystemExit) as exit_info:
+        fetcher.main(argv)
+    return exit_info.value.code
+
+
+def test_http_backend_writes_both_sources(stub_server, tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+
+    code = run_main(["--base-url", stub_server, "--backend", "http", "--output-dir", str(out), "--retries", "0"])
+
+    assert code == 0
+    assert (out / "applylisting.csv").read_bytes() == TWSE_CSV
+    assert (out / "TPEX-IPO-utf8.csv").read_bytes() == TPEX_CSV
+
+
+def test_selenium_fallback_when_http_fails(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setitem(fetcher.BACKENDS, "selenium", FakeSeleniumFetcher)
+    FakeSeleniumFetcher.calls = []
+    out = tmp_path / "out"
+    out.mkdir()
+
+    # Nothing is served under this prefix, every HTTP request gets a 404
+    code = run_main(["--base-url", stub_server + "missing/", "--output-dir", str(out), "--retries", "0"])
+
+    assert code == 0
+    assert sorted(FakeSeleniumFetcher.calls) == ["TPEX-IPO-utf8.csv", "applylisting.csv"]
+    assert (out / "applylisting.csv").read_bytes() == TWSE_CSV
+    assert (out / "TPEX-IPO-utf8.csv").read_bytes() == TPEX_CSV
+
+
+def test_fetch_source_reports_the_backend_used(stub_server, tmp_path):
+    backends = [fetcher.HttpFetcher(base_url=stub_server + "missing/"), FakeSeleniumFetcher()]
+
+    result = fetcher.fetch_source("TWSE", backends, str(tmp_path), retries=1, backoff=0)
+
+    assert result["backend"] == "selenium"
+    assert result["attempts"] == 3
+    assert result["path"] == os.path.join(str(tmp_path), "applylisting.csv")
+
+
+def test_all_backends_failing_exits_1(stub_server, tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+
+    code = run_main(["--base-url", stub_server + "missing/", "--backend", "http",
+                     "--output-dir", str(out), "--retries", "0"])
+
+    assert code == 1
+    assert not (out / "applylisting.csv").exists()
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+import instrument
+
+RECORD_KEYS = {"script", "stage", "status", "wall_s", "cpu_s", "peak_rss_mb", "rows_in", "rows_out"}
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    """Gives every test its own records and settings (and no report written at exit)."""
+    monkeypatch.setattr(instrument, "_records", [])
+    monkeypatch.setattr(instrument, "_settings", {"report": None, "profile": None, "script": "test", "atexit": True})
+
+
+def test_stage_records_timing_and_rows(capsys):
+    with instrument.stage("convert") as stage:
+        stage.add_rows(rows_in=3)
+        stage.add_rows(rows_in=2, rows_out=4)
+    [record] = instrument.records()
+    assert set(record) == RECORD_KEYS
+    assert record["script"] == "test"
+    assert record["stage"] == "convert"
+    assert record["status"] == "ok"
+    assert record["wall_s"] >= 0 and record["cpu_s"] >= 0
+    assert (record["rows_in"], record["rows_out"]) == (5, 4)
+    assert capsys.readouterr().out.startswith("== convert done in ")
+
+
+def test_stage_without_rows_records_none(capsys):
+    with instrument.stage("quiet", quiet=True):
+        pass
+    [record] = instrument.records()
+    assert (record["rows_in"], record["rows_out"]) == (None, None)
+    assert capsys.readouterr().out == ""
+
+
+def test_failed_stage_is_recorded_and_reraised(capsys):
+    with pytest.raises(RuntimeError):
+        with instrument.stage("fetch"):
+            raise RuntimeError("boom")
+    assert instrument.records()[0]["status"] == "error"
+    assert "== fetch failed in " in capsys.readouterr().out
+    assert instrument.current() is None
+
+
+def test_rows_go_to_the_innermost_stage(capsys):
+    with instrument.stage("outer") as outer:
+        with instrument.stage("inner", quiet=True) as inner:
+            assert instrument.current() is inner
+            instrument.add_rows(rows_in=7)
+            assert list(instrument.counted(iter("abc"), "rows_out")) == ["a", "b", "c"]
+        instrument.add_rows(rows_out=1)
+    assert (inner.rows_in, inner.rows_out) == (7, 3)
+    assert (outer.rows_in, outer.rows_out) == (None, 1)
+    # Inner stages finish first
+    assert [record["stage"] for record in instrument.records()] == ["inner", "outer"]
+
+
+def test_add_rows_outside_a_stage_is_ignored():
+    instrument.add_rows(rows_in=1)
+    assert list(instrument.counted([1, 2])) == [1, 2]
+    assert instrument.records() == []
+
+
+def test_take_records_empties_the_process_records():
+    instrument.add_records([{"stage": "worker"}])
+    assert instrument.take_records() == [{"stage": "worker"}]
+    assert instrument.records() == []
+
+
+def test_write_report_schema_and_append(tmp_path, capsys):
+    path = tmp_path / "report.json"
+    assert instrument.write_report(str(path)) is None
+    assert not path.exists()
+
+    with instrument.stage("merge") as stage:
+        stage.add_rows(rows_in=1, rows_out=1)
+    assert instrument.write_report(str(path)) == str(path)
+    instrument.configure(script="pipeline")
+    assert instrument.write_report(str(path)) == str(path)
+
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert list(report) == ["runs"]
+    assert [run["script"] for run in report["runs"]] == ["test", "pipeline"]
+    for run in report["runs"]:
+        assert set(run) == {"script", "started", "stages"}
+        assert run["started"].endswith("Z")
+        [record] = run["stages"]
+        assert set(record) == RECORD_KEYS
+        assert record["stage"] == "merge"
+    assert [p.name for p in tmp_path.iterdir()] == ["report.json"]
+
+
+def test_write_report_replaces_an_unreadable_report(tmp_path, capsys):
+    path = tmp_path / "report.json"
+    path.write_text("not json", encoding="utf-8")
+    instrument.configure(report=str(path))
+    with instrument.stage("render"):
+        pass
+    assert instrument.write_report() == str(path)
+    assert len(json.loads(path.read_text(encoding="utf-8"))["runs"]) == 1
+
+
+def test_profile_dumps_outermost_stages(tmp_path, capsys):
+    instrument.configure(profile=str(tmp_path / "prof"))
+    with instrument.stage("outer"):
+        with instrument.stage("inner"):
+            pass
+    assert [p.name for p in (tmp_path / "prof").iterdir()] == ["test-outer.prof"]
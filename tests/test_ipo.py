@@ -0,0 +1,78 @@
+import importlib
+import sys
+
+import pytest
+
+import instrument
+import ipo
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["ipo.py"])
+    monkeypatch.setattr(instrument, "_settings", {"report": None, "profile": None, "script": None, "atexit": True})
+
+
+def stub_main(monkeypatch, module_name, exit_code=None, returns=None):
+    """Replaces module_name.main with one that records its call and exits with exit_code (or returns)."""
+    calls = []
+    module = importlib.import_module(module_name)
+
+    def main(argv=None):
+        calls.append({"argv": argv, "sys.argv": list(sys.argv), "script": instrument.script_name()})
+        if exit_code is not None:
+            sys.exit(exit_code)
+        return returns
+
+    monkeypatch.setattr(module, "main", main)
+    return calls
+
+
+@pytest.mark.parametrize("command, module_name", [(command, module) for command, (module, _) in ipo.COMMANDS.items()])
+def test_every_command_reaches_its_module(monkeypatch, command, module_name):
+    calls = stub_main(monkeypatch, module_name)
+    assert ipo.main([command, "--flag", "value"]) is None
+    assert calls == [{"argv": ["--flag", "value"], "sys.argv": [f"ipo.py {command}", "--flag", "value"],
+                      "script": command}]
+
+
+@pytest.mark.parametrize("command, module_name, exit_code", [
+    ("graph", "stage_graph", 1),
+    ("badges", "metrics", 0),
+    ("query", "ipo_query", 1),
+    ("fetch", "fetcher", 78),
+    ("dedupe", "duplicate_remover", 1),
+    ("run", "pipeline", 2),
+])
+def test_exit_code_passes_through(monkeypatch, command, module_name, exit_code):
+    stub_main(monkeypatch, module_name, exit_code=exit_code)
+    with pytest.raises(SystemExit) as exit_info:
+        ipo.main([command])
+    assert exit_info.value.code == exit_code
+
+
+def test_returned_status_passes_through(monkeypatch):
+    stub_main(monkeypatch, "stage_graph", returns=3)
+    assert ipo.main(["graph"]) == 3
+
+
+def test_only_the_command_module_is_called(monkeypatch):
+    graph = stub_main(monkeypatch, "stage_graph")
+    pipeline = stub_main(monkeypatch, "pipeline")
+    ipo.main(["graph", "--jobs", "2"])
+    assert len(graph) == 1 and pipeline == []
+
+
+@pytest.mark.parametrize("argv", [[], ["-h"], ["--help"]])
+def test_usage(argv, capsys):
+    assert ipo.main(argv) is None
+    out = capsys.readouterr().out
+    assert out.startswith("Usage: python ipo.py <command>")
+    assert all(f"  {command} " in out for command in ipo.COMMANDS)
+
+
+def test_unknown_command_exits_2(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        ipo.main(["nope"])
+    assert exit_info.value.code == 2
+    assert capsys.readouterr().out.startswith("Unknown command 'nope'")
@@ -0,0 +1,82 @@
+import csv
+import io
+import shutil
+import subprocess
+
+import pytest
+
+import ipo_merge
+
+HEADER = ["申請日期", "股票代號", "公司名稱", "備註"]
+
+TWSE = [
+    HEADER,
+    ["2024/03/01", "2330", "台積", ""],
+    ["2024/03/01", "1101", "台泥", "N/A"],
+    ["", "9999", "無日期", ""],
+    ["2023/12/31", "KY01", "文字代號", ""],
+    ["2023/12/31", "6666", "同日", "甲"],
+]
+TPEX = [
+    HEADER[:3] + ["主辦承銷商"],
+    ["2024/3/2", "5555", "櫃一", "元大"],
+    ["2023/12/31", "6666", "同日", "甲"],
+    ["2023/12/31", "700", "櫃二", ""],
+]
+
+
+def test_stack_takes_the_union_of_the_headers():
+    stacked, _ = ipo_merge.merge_tables(TWSE, TPEX)
+
+    assert stacked[0] == HEADER + ["主辦承銷商"]
+    assert stacked[1] == ["2024/03/01", "2330", "台積", "", ""]
+    assert stacked[-1] == ["2023/12/31", "700", "櫃二", "", ""]
+    assert len(stacked) == 1 + 5 + 3
+
+
+def test_sorted_descending_with_empty_first_and_numeric_codes():
+    _, merged = ipo_merge.merge_tables(TWSE, TPEX)
+
+    assert [(row[0], row[1]) for row in merged[1:]] == [
+        ("", "9999"),
+        ("2024-03-02", "5555"),
+        ("2024-03-01", "2330"),
+        ("2024-03-01", "1101"),
+        # Non-numeric codes sort after every number, so first in descending order
+        ("2023-12-31", "KY01"),
+        ("2023-12-31", "6666"),
+        ("2023-12-31", "6666"),
+        # 6666 > 700 as numbers, not as text
+        ("2023-12-31", "700"),
+    ]
+    # csvkit's null values become empty cells
+    assert merged[4][3] == ""
+
+
+def test_empty_cells_sort_first_in_every_column():
+    _, merged = ipo_merge.merge_tables(TWSE, TPEX)
+
+    # Same date, code and name: the row with the empty 備註 comes first
+    twins = [row for row in merged[1:] if row[1] == "6666"]
+    assert twins == [["2023-12-31", "6666", "同日", "", "甲"], ["2023-12-31", "6666", "同日", "甲", ""]]
+
+
+def write(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows(rows)
+
+
+@pytest.mark.skipif(not shutil.which("csvsort"), reason="csvkit is not installed")
+def test_same_output_as_csvstack_and_csvsort(tmp_path):
+    first, second = tmp_path / "twse.csv", tmp_path / "tpex.csv"
+    # csvsort infers 股票代號 as a number only if every code is numeric, as in the real lists
+    write(first, [row for row in TWSE if row[1] != "KY01"])
+    write(second, TPEX)
+    stacked_file, sorted_file = tmp_path / "stacked.csv", tmp_path / "sorted.csv"
+
+    ipo_merge.merge_files(str(first), str(second), str(stacked_file), str(sorted_file))
+
+    stacked = subprocess.run(["csvstack", str(first), str(second)], capture_output=True, check=True).stdout
+    expected = subprocess.run(["csvsort", "-r"], input=stacked, capture_output=True, check=True).stdout
+    assert sorted_file.read_bytes().replace(b"\r\n", b"\n") == expected.replace(b"\r\n", b"\n")
+    assert list(csv.reader(io.StringIO(stacked.decode('utf-8')))) == ipo_merge.read_table(str(stacked_file))
@@ -0,0 +1,126 @@
+import csv
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import ipo_query
+
+HEADER = ["申請日期", "股票代號", "公司名稱", "主辦承銷商", "備註"]
+ROWS = [
+    ["2025-03-10", "7825", "和亞智慧", "群益金鼎", ""],
+    ["2025-01-20", "6986", "和迅", "元大", ""],
+    ["2024-12-30", "5545", "富美鑫", "群益金鼎", ""],
+    ["2024-06-01", "1101", "台泥", "元大", "創新板"],
+]
+
+
+def write_table(path, rows, mtime):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows([HEADER] + rows)
+    # refresh() notices a change by mtime and size
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def table(tmp_path):
+    path = str(tmp_path / "no-duplicate.csv")
+    write_table(path, ROWS, 1_000_000_000)
+    return path
+
+
+def codes(rows):
+    return [row["股票代號"] for row in rows]
+
+
+def test_queries_by_code_underwriter_and_date_range(table):
+    index = ipo_query.IPOIndex(table)
+
+    assert codes(index.query(code=" 7825 ")) == ["7825"]
+    assert codes(index.query(underwriter="群益金鼎")) == ["7825", "5545"]
+    assert codes(index.query(start="2025-01-01", end="2025-12-31")) == ["7825", "6986"]
+    assert codes(index.query(underwriter="元大", start="2024-01-01", end="2024-12-31")) == ["1101"]
+    assert codes(index.query(limit=2)) == ["7825", "6986"]
+    assert index.query(code="0000") == []
+
+
+def test_refresh_only_reindexes_changed_records(table):
+    index = ipo_query.IPOIndex(table)
+    assert index.refresh() is None
+
+    rows = [ROWS[0], ["2025-01-20", "6986", "和迅", "凱基", ""], ROWS[3], ["2025-04-01", "7777", "新公司", "凱基", ""]]
+    write_table(table, rows, 2_000_000_000)
+
+    assert index.refresh() == {"added": 1, "changed": 1, "removed": 1}
+    assert codes(index.query(underwriter="凱基")) == ["7777", "6986"]
+    assert codes(index.query(underwriter="元大")) == ["1101"]
+    assert "群益金鼎" in index.by_underwriter and codes(index.query(code="5545")) == []
+    assert [date for date, _ in index.by_date] == sorted(row[0] for row in rows)
+
+
+def test_sqlite_copy_restores_the_indexes_without_reading_the_csv(table, tmp_path, monkeypatch):
+    database = str(tmp_path / "ipo.sqlite")
+    ipo_query.IPOIndex(table, database)
+
+    def unexpected_read(*args, **kwargs):
+        raise AssertionError("the unchanged CSV was read")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ipo_query.csv, "reader", unexpected_read)
+        restored = ipo_query.IPOIndex(table, database)
+        assert restored.refresh() is None
+    assert codes(restored.query(underwriter="群益金鼎")) == ["7825", "5545"]
+
+    # A changed CSV is read and compared with the stored records
+    write_table(table, ROWS[:2], 2_000_000_000)
+    assert ipo_query.IPOIndex(table, database).query(code="5545") == []
+
+
+def test_concurrent_refreshes_and_queries(table):
+    index = ipo_query.IPOIndex(table)
+    other = ROWS + [[f"2023-01-{day:02d}", str(9000 + day), "新", "凱基", ""] for day in range(1, 29)]
+    errors = []
+
+    def refresh():
+        for i in range(40):
+            write_table(table, other if i % 2 == 0 else ROWS, 3_000_000_000 + i)
+            index.refresh()
+
+    def query():
+        for _ in range(400):
+            try:
+                rows = index.query(start="2020-01-01")
+                # Every answer is one of the two versions of the table, never a mix
+                assert len(rows) in (len(ROWS), len(other))
+                index.query(underwriter="凱基")
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=refresh)] + [threading.Thread(target=query) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_http_endpoint(table):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ipo_query.query_handler(ipo_query.IPOIndex(table)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/ipo?underwriter=%E5%85%83%E5%A4%A7&year=2025") as response:
+            body = json.loads(response.read().decode('utf-8'))
+        assert body["count"] == 1 and body["rows"][0]["股票代號"] == "6986"
+        with urllib.request.urlopen(f"{base}/health") as response:
+            assert json.loads(response.read())["records"] == 4
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{base}/other")
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,82 @@
+import csv
+import io
+import os
+import pickle
+from datetime import date
+
+import pytest
+
+from ipo_record import IPORecord, records, to_int
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROW = ["2024/01/02", "1101", "台泥", "張三", "1200000", "2024/02/01", "", "2024/03/01", "2024/04/01",
+       "元大證券", "50.5", "KY"]
+
+
+def read_rows(name):
+    with open(os.path.join(ROOT, name), 'r', encoding='utf-8-sig', newline='') as f:
+        return [row for row in csv.reader(f)][1:]
+
+
+@pytest.mark.parametrize("name", ["TWSE-IPO-utf8.csv", "TPEX-IPO-utf8.csv"])
+def test_committed_tables_round_trip(name):
+    rows = [row for row in read_rows(name) if row]
+    assert [record.to_row() for record in records(rows)] == rows
+
+
+@pytest.mark.parametrize("capital, stored", [
+    ("1200000", 1200000), ("0", 0), ("", ""), ("007", "007"), ("1,200", "1,200"), (" 12", " 12"), ("１２", "１２"),
+])
+def test_capital_is_an_int_only_when_it_converts_back(capital, stored):
+    record = IPORecord.from_row(ROW[:4] + [capital] + ROW[5:])
+    assert record.capital == stored
+    assert record[4] == capital
+    assert to_int(capital) == stored
+
+
+def test_extra_columns_are_kept():
+    row = ROW + ["x", "y"]
+    record = IPORecord.from_row(row)
+    assert len(record) == 14
+    assert list(record) == row
+    assert record[-1] == "y" and record[12] == "x"
+
+
+def test_indexing_and_slicing_match_the_list():
+    record = IPORecord.from_row(ROW)
+    for index in range(-len(ROW), len(ROW)):
+        assert record[index] == ROW[index]
+    assert record[1:4] == ROW[1:4]
+    assert record[::-1] == ROW[::-1]
+    with pytest.raises(IndexError):
+        record[len(ROW)]
+
+
+def test_short_rows_are_rejected_or_skipped():
+    with pytest.raises(ValueError):
+        IPORecord.from_row(ROW[:11])
+    assert [record.code for record in records([ROW[:11], ROW])] == ["1101"]
+
+
+def test_equality_pickling_and_dates():
+    record = IPORecord.from_row(ROW)
+    assert record == ROW and record == tuple(ROW) and record == IPORecord.from_row(list(ROW))
+    assert record != ROW[:-1] + ["其他"]
+    assert pickle.loads(pickle.dumps(record)) == record
+    with pytest.raises(TypeError):
+        hash(record)
+    assert record.date("listing_date") == date(2024, 4, 1)
+    assert record.date("board_date") is None
+    assert record.capital_value == 1200000
+    assert IPORecord.from_row(ROW[:4] + ["1,200"] + ROW[5:]).capital_value == 1200
+    with pytest.raises(ValueError):
+        record.date("name")
+
+
+def test_written_records_match_written_rows():
+    rows = read_rows("TPEX-IPO-utf8.csv")[:50]
+    expected, actual = io.StringIO(), io.StringIO()
+    csv.writer(expected).writerows(rows)
+    csv.writer(actual).writerows(records(rows))
+    assert actual.getvalue() == expected.getvalue()
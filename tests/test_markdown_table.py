@@ -0,0 +1,146 @@
+import os
+
+import pytest
+
+import csv_to_md
+import markdown_table
+import pipeline
+
+HEADER = ["申請日期", "股票代號", "公司名稱"]
+ROWS = [
+    HEADER,
+    ["2026/04/16", "5236", "凌陽創新"],
+    ["2026/04/14", "7855", "和運租車"],
+    ["2025/12/30", "4582", "聚恆"],
+    ["2024/01/05", "6650", "A|B"],
+    ["", "9999", "沒有日期"],
+]
+
+
+def test_pipes_and_newlines_are_escaped():
+    assert markdown_table.format_cell("a|b") == r"a\|b"
+    assert markdown_table.format_cell("a\r\nb\nc") == "a<br>b<br>c"
+    assert markdown_table.format_cell("純文字") == "純文字"
+
+
+def test_unpadded_table():
+    assert list(markdown_table.render_lines([["a", "b"], ["x|y", "1\n2"]])) == [
+        "| a | b |",
+        "|---|---|",
+        r"| x\|y | 1<br>2 |",
+    ]
+
+
+def test_padded_table_uses_the_widest_formatted_cell():
+    assert list(markdown_table.render_lines([["a", "bb"], ["x|y", "1"], ["", "22"]], pad=True)) == [
+        "| a    | bb |",
+        "| ---- | -- |",
+        r"| x\|y | 1  |",
+        "|      | 22 |",
+    ]
+
+
+def test_padded_table_only_renders_the_columns_every_row_has():
+    assert markdown_table.column_widths([["a", "b", "c"], ["x", "y"], []]) == [1, 1]
+    assert list(markdown_table.render_lines([["a", "b", "c"], ["x", "y"]], pad=True))[0] == "| a | b |"
+
+
+def test_empty_table_renders_nothing():
+    assert markdown_table.render([]) == ""
+
+
+def test_split_pages_by_size():
+    pages = markdown_table.split_pages(ROWS, page_size=2)
+    assert [name for name, _ in pages] == ["page-001", "page-002", "page-003"]
+    assert all(page[0] == HEADER for _, page in pages)
+    assert [len(page) - 1 for _, page in pages] == [2, 2, 1]
+    assert [row for _, page in pages for row in page[1:]] == ROWS[1:]
+
+
+def test_split_pages_without_a_size_is_one_page():
+    assert markdown_table.split_pages(ROWS) == [("page-001", ROWS)]
+    assert markdown_table.split_pages([HEADER]) == []
+
+
+def test_split_pages_per_year_in_table_order():
+    pages = dict(markdown_table.split_pages(ROWS, per_year=True))
+    assert list(pages) == ["2026", "2025", "2024", "unknown"]
+    assert pages["2026"] == [HEADER, ROWS[1], ROWS[2]]
+    assert pages["unknown"] == [HEADER, ROWS[5]]
+
+
+@pytest.mark.parametrize("page_size", [0, -1])
+def test_split_pages_rejects_empty_pages(page_size):
+    with pytest.raises(ValueError, match="at least 1 row"):
+        markdown_table.split_pages(ROWS, page_size=page_size)
+
+
+def test_write_pages_index_and_footer(tmp_path):
+    written = markdown_table.write_pages(str(tmp_path / "TWSE-IPO-utf8.md"), ROWS, page_size=2)
+    directory = tmp_path / "TWSE-IPO-utf8"
+    assert written == [str(directory / name) for name in ["page-001.md", "page-002.md", "page-003.md", "index.md"]]
+    assert (directory / "index.md").read_text(encoding="utf-8") == (
+        "# TWSE-IPO-utf8\n\n"
+        "- [page-001](page-001.md) (2 rows)\n"
+        "- [page-002](page-002.md) (2 rows)\n"
+        "- [page-003](page-003.md) (1 rows)\n"
+    )
+    first = (directory / "page-001.md").read_text(encoding="utf-8")
+    assert first == markdown_table.render(ROWS[:3]) + "\n\n[index](index.md) | [page-002 >](page-002.md)\n"
+    middle = (directory / "page-002.md").read_text(encoding="utf-8").splitlines()
+    assert middle[-2:] == ["", "[< page-001](page-001.md) | [index](index.md) | [page-003 >](page-003.md)"]
+    last = (directory / "page-003.md").read_text(encoding="utf-8").splitlines()
+    assert last[-1] == "[< page-002](page-002.md) | [index](index.md)"
+
+
+def test_write_pages_removes_stale_pages(tmp_path):
+    markdown = str(tmp_path / "t.md")
+    markdown_table.write_pages(markdown, ROWS, page_size=1)
+    (tmp_path / "t" / "notes.txt").write_text("kept")
+    markdown_table.write_pages(markdown, ROWS, per_year=True)
+    assert sorted(os.listdir(tmp_path / "t")) == ["2024.md", "2025.md", "2026.md", "index.md", "notes.txt", "unknown.md"]
+
+
+def test_write_pages_rejects_page_size_0_before_writing(tmp_path):
+    with pytest.raises(ValueError):
+        markdown_table.write_pages(str(tmp_path / "t.md"), ROWS, page_size=0)
+    assert not (tmp_path / "t").exists()
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "TWSE-IPO-utf8.csv"
+    path.write_text("\n".join(",".join(f'"{cell}"' for cell in row) for row in ROWS) + "\n", encoding="utf-8")
+    return path
+
+
+def test_csv_to_md_prints_the_table(csv_file, capsys):
+    csv_to_md.main([str(csv_file), "utf-8"])
+    assert capsys.readouterr().out == markdown_table.render(ROWS) + "\n"
+
+
+def test_csv_to_md_writes_pages(csv_file, tmp_path, capsys):
+    csv_to_md.main([str(csv_file), "utf-8", "--pages", str(tmp_path / "out.md"), "--page-size", "3"])
+    assert sorted(os.listdir(tmp_path / "out")) == ["index.md", "page-001.md", "page-002.md"]
+    assert capsys.readouterr().out == ""
+
+
+def test_csv_to_md_writes_per_year_pages_by_default(csv_file, tmp_path, capsys):
+    csv_to_md.main([str(csv_file), "utf-8", "--pages", str(tmp_path / "out.md")])
+    assert "2026.md" in os.listdir(tmp_path / "out")
+
+
+def test_csv_to_md_rejects_page_size_0(csv_file, tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        csv_to_md.main([str(csv_file), "utf-8", "--pages", str(tmp_path / "out.md"), "--page-size", "0"])
+    assert exit_info.value.code == 2
+    assert "--page-size must be greater than 0" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
+
+
+@pytest.mark.parametrize("value", ["0", "-3", "ten"])
+def test_pipeline_rejects_md_pages_without_rows(value, tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        pipeline.main(["--workdir", str(tmp_path), "--md-pages", value])
+    assert exit_info.value.code == 2
+    assert "--md-pages must be 'year' or a number of rows greater than 0" in capsys.readouterr().err
@@ -0,0 +1,51 @@
+import json
+
+import metrics
+
+SOURCE = "TWSE_TPEX-IPO-utf8-filter-sort-no-duplicate.csv"
+TABLE = [
+    ["申請日期", "股票代號", "股票上櫃買賣日期"],
+    ["2026/10/16", "1101", ""],
+    ["2026/10/16", "2202", "2026/10/17"],
+    ["2026/10/01", "3303", ""],
+]
+
+
+def badge(workdir, name):
+    with open(workdir / name, encoding='utf-8') as f:
+        return json.load(f)["message"]
+
+
+def test_table_metrics():
+    assert metrics.table_metrics(TABLE) == {"rows": 3, "pending": 2, "latest_filing": "2026-10-16",
+                                            "latest_filings": 2}
+
+
+def test_new_today_follows_the_date_without_a_new_manifest(tmp_path):
+    entry = metrics.manifest_entry("text", TABLE, today="2026-10-16")
+    manifest = {SOURCE: entry}
+
+    metrics.write_extra_badges(str(tmp_path), manifest, today="2026-10-16")
+    assert badge(tmp_path, "TWSE_TPEX-new.json") == "2"
+    metrics.write_extra_badges(str(tmp_path), manifest, today="2026-10-17")
+    assert badge(tmp_path, "TWSE_TPEX-new.json") == "0"
+    assert badge(tmp_path, "TWSE_TPEX-pending.json") == "2"
+
+
+def test_update_manifest_parses_only_changed_csvs_and_writes_every_badge(tmp_path, monkeypatch, capsys):
+    names = sorted({source for _, source, _ in metrics.BADGES})
+    for name in names:
+        (tmp_path / name).write_text("\n".join(",".join(row) for row in TABLE) + "\n", encoding='utf-8')
+    metrics.update_manifest(names, str(tmp_path))
+    for name, _, _ in metrics.BADGES:
+        assert badge(tmp_path, name) == "3"
+
+    parsed = []
+    entry = metrics.manifest_entry
+    monkeypatch.setattr(metrics, "manifest_entry", lambda text, rows, *args: parsed.append(rows) or entry(text, rows, *args))
+    (tmp_path / names[0]).write_text("\n".join(",".join(row) for row in TABLE[:2]) + "\n", encoding='utf-8')
+    manifest = metrics.update_manifest(names, str(tmp_path))
+
+    assert len(parsed) == 1
+    assert manifest[names[0]]["rows"] == 1
+    assert "1 of 6 CSVs changed" in capsys.readouterr().out
@@ -0,0 +1,44 @@
+import os
+import shutil
+
+import pytest
+
+import pipeline
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pipeline")
+EXPECTED = os.path.join(FIXTURES, "expected")
+AUCTION = os.path.join(FIXTURES, "auction-company.csv")
+
+
+@pytest.fixture
+def workdir(tmp_path, capsys):
+    """Runs the pipeline once on the fixture sources and returns its working directory."""
+    for name in (pipeline.TWSE_RAW, pipeline.TPEX_RAW):
+        shutil.copy(os.path.join(FIXTURES, name), tmp_path / name)
+    pipeline.run_pipeline(str(tmp_path), auction_source=AUCTION)
+    capsys.readouterr()
+    return tmp_path
+
+
+# The expected files are what the former step-by-step workflow (ConvertDateFormat.py, TWSE-IPO.py,
+# csv-filter.py, csvstack, csvsort -r, duplicate_remover.py, csv-to-md.py) writes for the same sources
+@pytest.mark.parametrize("name", sorted(os.listdir(EXPECTED)))
+def test_output_matches_expected_file(workdir, name):
+    with open(os.path.join(EXPECTED, name), "rb") as expected:
+        assert (workdir / name).read_bytes() == expected.read()
+
+
+def test_every_merge_and_markdown_output_has_an_expected_file():
+    names = set(os.listdir(EXPECTED))
+    for first, second, _, _, deduplicated in pipeline.MERGES:
+        if "filter" in first:
+            assert {first, second} <= names
+        assert deduplicated in names
+    assert {md for md, _ in pipeline.MARKDOWN} <= names
+
+
+def test_rerun_on_its_own_output_is_stable(workdir, capsys):
+    before = {name: (workdir / name).read_bytes() for name in os.listdir(EXPECTED)}
+    pipeline.run_pipeline(str(workdir), auction_source=AUCTION)
+    capsys.readouterr()
+    assert {name: (workdir / name).read_bytes() for name in before} == before
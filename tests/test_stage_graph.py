@@ -0,0 +1,189 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+import stage_graph
+from stage_graph import Node
+
+STAGES = '''
+def upper(source, target):
+    with open(source, encoding='utf-8') as f:
+        text = f.read()
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write(text.upper())
+
+def join(first, second, target):
+    with open(target, 'w', encoding='utf-8') as f:
+        for path in (first, second):
+            with open(path, encoding='utf-8') as source:
+                f.write(source.read())
+
+def fail(*args):
+    raise RuntimeError("boom")
+'''
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A work directory with in.txt and other.txt; the stage functions are a module in it, hashed like the scripts."""
+    (tmp_path / "graph_stages.py").write_text(STAGES, encoding='utf-8')
+    (tmp_path / "in.txt").write_text("a\n", encoding='utf-8')
+    (tmp_path / "other.txt").write_text("b\n", encoding='utf-8')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # The module is edited within the same second, an outdated .pyc would hide that
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    monkeypatch.setattr(stage_graph, "ROOT", str(tmp_path))
+    stage_graph.code_hash.cache_clear()
+    yield tmp_path
+    stage_graph.code_hash.cache_clear()
+
+
+def chain():
+    return [
+        Node("first", "graph_stages", "upper", ["in.txt", "first.txt"], inputs=["in.txt"], outputs=["first.txt"]),
+        Node("second", "graph_stages", "join", ["first.txt", "other.txt", "second.txt"],
+             inputs=["first.txt", "other.txt"], outputs=["second.txt"]),
+    ]
+
+
+def run(nodes, workdir, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return stage_graph.run_graph(nodes, str(workdir), jobs=1, **kwargs)
+
+
+def test_unchanged_nodes_are_skipped(workdir):
+    assert run(chain(), workdir) == {"first": "ran", "second": "ran"}
+    assert (workdir / "second.txt").read_text(encoding='utf-8') == "A\nb\n"
+
+    assert run(chain(), workdir) == {"first": "skipped", "second": "skipped"}
+
+
+def test_changed_input_re_runs_the_node_and_its_dependents(workdir):
+    run(chain(), workdir)
+    (workdir / "other.txt").write_text("c\n", encoding='utf-8')
+    assert run(chain(), workdir) == {"first": "skipped", "second": "ran"}
+
+    (workdir / "in.txt").write_text("d\n", encoding='utf-8')
+    assert run(chain(), workdir) == {"first": "ran", "second": "ran"}
+    assert (workdir / "second.txt").read_text(encoding='utf-8') == "D\nc\n"
+
+
+def test_output_with_the_same_content_stops_the_re_run(workdir):
+    run(chain(), workdir)
+    # Upper-cased, the new input gives the same first.txt
+    (workdir / "in.txt").write_text("A\n", encoding='utf-8')
+    assert run(chain(), workdir) == {"first": "ran", "second": "skipped"}
+
+
+def test_changed_or_missing_output_re_runs_the_node(workdir):
+    run(chain(), workdir)
+    (workdir / "second.txt").write_text("edited", encoding='utf-8')
+    assert run(chain(), workdir)["second"] == "ran"
+    (workdir / "second.txt").unlink()
+    assert run(chain(), workdir)["second"] == "ran"
+
+
+def test_changed_code_re_runs_the_node(workdir):
+    run(chain(), workdir)
+    with open(workdir / "graph_stages.py", 'a', encoding='utf-8') as f:
+        f.write("\n# edited\n")
+    stage_graph.code_hash.cache_clear()
+    assert run(chain(), workdir) == {"first": "ran", "second": "ran"}
+
+
+def test_force_and_always_run_unchanged_nodes(workdir):
+    run(chain(), workdir)
+    assert run(chain(), workdir, force=True) == {"first": "ran", "second": "ran"}
+    nodes = chain()
+    nodes[1].always = True
+    assert run(nodes, workdir) == {"first": "skipped", "second": "ran"}
+
+
+def test_dependents_of_a_failed_node_are_blocked(workdir):
+    nodes = chain() + [Node("third", "graph_stages", "upper", ["second.txt", "third.txt"],
+                            inputs=["second.txt"], outputs=["third.txt"]),
+                       Node("apart", "graph_stages", "upper", ["other.txt", "apart.txt"],
+                            inputs=["other.txt"], outputs=["apart.txt"])]
+    nodes[0].function = "fail"
+
+    status = run(nodes, workdir)
+
+    assert status == {"first": "failed", "second": "blocked", "third": "blocked", "apart": "ran"}
+    assert set(stage_graph.load_state(str(workdir))) == {"apart"}
+
+
+def test_node_that_does_not_write_its_output_fails(workdir):
+    nodes = chain()
+    nodes[0].outputs = ["first.txt", "missing.txt"]
+    status = run(nodes, workdir)
+    assert status == {"first": "failed", "second": "blocked"}
+
+
+def test_dry_run_runs_nothing(workdir):
+    assert run(chain(), workdir, dry_run=True) == {"first": "ran", "second": "ran"}
+    assert not (workdir / "first.txt").exists()
+
+
+def test_resolve_orders_the_nodes_by_their_files():
+    nodes = stage_graph.resolve(list(reversed(chain())))
+    assert [node.name for node in nodes] == ["first", "second"]
+    assert nodes[1].deps == ["first"]
+
+
+def test_resolve_rejects_a_file_written_twice():
+    nodes = chain() + [Node("again", "graph_stages", "upper", ["other.txt", "first.txt"], outputs=["first.txt"])]
+    with pytest.raises(ValueError, match="first.txt is written by both first and again"):
+        stage_graph.resolve(nodes)
+
+
+def test_resolve_rejects_a_cycle_and_unknown_nodes():
+    nodes = chain()
+    nodes[0].inputs.append("second.txt")
+    with pytest.raises(ValueError, match="cycle"):
+        stage_graph.resolve(nodes)
+    with pytest.raises(ValueError, match="unknown"):
+        stage_graph.resolve([Node("lonely", "graph_stages", "upper", after=["nobody"])])
+
+
+def test_critical_path_is_the_slowest_chain():
+    nodes = stage_graph.resolve([
+        Node("a", "m", "f", outputs=["a"]),
+        Node("b", "m", "f", inputs=["a"], outputs=["b"]),
+        Node("c", "m", "f", inputs=["a"], outputs=["c"]),
+        Node("d", "m", "f", inputs=["b", "c"], outputs=["d"]),
+        Node("e", "m", "f", outputs=["e"]),
+    ])
+    durations = {"a": 1.0, "b": 0.5, "c": 2.0, "d": 1.0, "e": 3.5}
+    assert stage_graph.critical_path(nodes, durations) == (["a", "c", "d"], 4.0)
+    # A skipped node (no duration) adds nothing
+    assert stage_graph.critical_path(nodes, {"b": 1.0, "d": 1.0}) == (["a", "b", "d"], 2.0)
+    assert stage_graph.critical_path([], {}) == ([], 0.0)
+
+
+def test_keep_download_copies_only_a_new_download(tmp_path):
+    (tmp_path / stage_graph.WORK_DIR).mkdir()
+    converted, download = tmp_path / stage_graph.TPEX_RAW, tmp_path / stage_graph.TPEX_DOWNLOAD
+    converted.write_text("downloaded", encoding='utf-8')
+
+    stage_graph.keep_download(str(tmp_path), None)
+    assert download.read_text(encoding='utf-8') == "downloaded"
+
+    # convert-tpex rewrote the list: the download stays as it was
+    converted.write_text("converted", encoding='utf-8')
+    record = {"outputs": {stage_graph.TPEX_RAW: stage_graph.content_hash(str(converted))}}
+    stage_graph.keep_download(str(tmp_path), record)
+    assert download.read_text(encoding='utf-8') == "downloaded"
+
+    converted.write_text("downloaded again", encoding='utf-8')
+    stage_graph.keep_download(str(tmp_path), record)
+    assert download.read_text(encoding='utf-8') == "downloaded again"
+
+
+def test_build_graph_resolves():
+    nodes = stage_graph.resolve(stage_graph.build_graph(auction_source="auction.csv"))
+    names = [node.name for node in nodes]
+    assert names.index("convert-tpex") < names.index("filter-tpex") < names.index("merge-filter") < names.index("manifest")
+    assert "auction" in nodes[names.index("dedupe")].deps
@@ -0,0 +1,46 @@
+import io
+
+import pytest
+
+import transcode
+
+# A line with a Hong Kong character (not in CP950) and one with a stray byte
+HKSCS_LINE = "公司,𤾂記,\r\n".encode("big5hkscs")
+STRAY_LINE = b"\xfe" + "結束,x\r\n".encode("cp950")
+DATA = (HKSCS_LINE + STRAY_LINE) * 30
+
+
+def decode(data, chunk_size=transcode.CHUNK_SIZE, errors="replace"):
+    transcoder = transcode.Transcoder(errors=errors)
+    text = "".join(transcode.iter_decoded(io.BytesIO(data), transcoder, chunk_size))
+    return text, transcoder.fallbacks
+
+
+def test_stray_byte_does_not_take_the_next_character():
+    assert decode(b"\xfe" + "結束".encode("cp950")) == ("�結束", {"replace": [0]})
+
+
+def test_hkscs_character_is_decoded_with_its_offset():
+    assert decode("A𤾂結,".encode("big5hkscs")) == ("A𤾂結,", {"big5hkscs": [1]})
+    assert decode("嘅㗎係".encode("big5hkscs"))[0] == "嘅㗎係"
+
+
+@pytest.mark.parametrize("chunk_size", list(range(1, 24)) + [100, 4096])
+def test_chunk_boundaries_do_not_change_the_result(chunk_size):
+    text, fallbacks = decode(DATA, chunk_size)
+
+    assert (text, fallbacks) == decode(DATA)
+    assert text == ("公司,𤾂記,\r\n�結束,x\r\n") * 30
+    assert fallbacks["big5hkscs"][:2] == [5, len(HKSCS_LINE) + len(STRAY_LINE) + 5]
+    assert fallbacks["replace"][:2] == [len(HKSCS_LINE), 2 * len(HKSCS_LINE) + len(STRAY_LINE)]
+
+
+def test_strict_errors_raise_with_the_offset():
+    with pytest.raises(UnicodeDecodeError, match="byte offset 3"):
+        decode("結,".encode("cp950") + b"\xff,", errors="strict")
+
+
+def test_iter_lines_translates_line_ends():
+    lines = list(transcode.iter_lines(io.BytesIO(DATA), transcode.Transcoder(), chunk_size=7))
+    assert lines[:2] == ["公司,𤾂記,\n", "�結束,x\n"]
+    assert len(lines) == 60
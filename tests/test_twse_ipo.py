@@ -0,0 +1,69 @@
+import codecs
+import os
+
+import pytest
+
+import twse_ipo
+
+APPLYLISTING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pipeline", "applylisting.csv")
+TEXT = '"1","5236","凌陽創新","115/04/16","黃洲杰","600,040","","","","","福邦","","櫃轉市",\r\n'
+
+
+@pytest.mark.parametrize("prefix, encoding", [
+    (codecs.BOM_UTF8 + TEXT.encode("utf-8"), "utf-8-sig"),
+    (codecs.BOM_UTF16_LE + TEXT.encode("utf-16-le"), "utf-16"),
+    (codecs.BOM_UTF16_BE + TEXT.encode("utf-16-be"), "utf-16"),
+    # The BOM wins even if the rest would decode as something else
+    (codecs.BOM_UTF8 + TEXT.encode("cp950"), "utf-8-sig"),
+])
+def test_bom(prefix, encoding):
+    assert twse_ipo.sniff_encoding(prefix) == encoding
+
+
+@pytest.mark.parametrize("prefix, encoding", [
+    (TEXT.encode("utf-8"), "utf-8"),
+    (b"1,2,3\r\n", "utf-8"),
+    (b"", "utf-8"),
+    # Cut in the middle of a three-byte character
+    (TEXT.encode("utf-8")[:14], "utf-8"),
+    (TEXT.encode("cp950"), "cp950"),
+    # Cut after the lead byte of a two-byte character
+    (TEXT.encode("cp950")[:13], "cp950"),
+    # 𤾂 is only in Big5-HKSCS
+    ("公司,𤾂記,\r\n".encode("big5hkscs"), "big5hkscs"),
+])
+def test_strict_decodes(prefix, encoding):
+    assert twse_ipo.sniff_encoding(prefix) == encoding
+
+
+@pytest.mark.parametrize("prefix, encoding", [
+    (TEXT.encode("utf-16-le"), "utf-16-le"),
+    (TEXT.encode("utf-16-be"), "utf-16-be"),
+    # Stray null bytes are not UTF-16
+    (TEXT.encode("cp950") + b"\0", "cp950"),
+    (b"\0" + TEXT.encode("utf-8") + b"\0", "utf-8"),
+    (b"\0" * 16, "utf-8"),
+])
+def test_null_bytes(prefix, encoding):
+    assert twse_ipo.sniff_encoding(prefix) == encoding
+
+
+def test_undecodable_prefix_falls_back_to_chardet(monkeypatch):
+    import chardet
+
+    seen = []
+    monkeypatch.setattr(chardet, "detect", lambda prefix: seen.append(prefix) or {"encoding": "latin-1"})
+    assert twse_ipo.sniff_encoding(b"\xff" * 64) == "latin-1"
+    assert seen == [b"\xff" * 64]
+
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "utf-16", "utf-16-le", "utf-16-be"])
+def test_every_detected_encoding_converts_to_the_same_csv(tmp_path, capsys, encoding):
+    with open(APPLYLISTING, "rb") as f:
+        raw = f.read()
+    twse_ipo.process_file(APPLYLISTING, str(tmp_path / "expected.csv"))
+    source = tmp_path / "applylisting.csv"
+    source.write_bytes(raw.decode("cp950").encode(encoding))
+    twse_ipo.process_file(str(source), str(tmp_path / "converted.csv"))
+    assert f"Detected file encoding: {encoding}" in capsys.readouterr().out
+    assert (tmp_path / "converted.csv").read_bytes() == (tmp_path / "expected.csv").read_bytes()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Streaming Big5/CP950 -> UTF-8 transcoder with a fallback chain:
+
+    python ipo.py transcode applylisting.csv -o applylisting-utf8.csv
+    python ipo.py transcode --from cp950,big5hkscs --errors strict < IN > OUT
+
+The input is read in chunks through an incremental decoder of the first
+encoding, so memory stays constant whatever the file size and a multi-byte
+character split between two chunks is still decoded. A byte sequence the
+first encoding cannot decode is tried with the next ones (the default chain
+cp950 -> big5hkscs covers the Hong Kong characters in some company and
+chairman names) and otherwise replaced with U+FFFD, or, with --errors
+strict, stops the transcoding. Every such sequence is reported with its byte
+offset in the input.
+
+CP950 reports a Hong Kong character and a stray byte followed by an ordinary
+character alike, as one invalid byte, so a fallback decode of the two bytes
+is only taken if the bytes after it decode again up to the next byte below
+0x40 (never part of a two-byte character: digits, commas, line ends);
+otherwise the stray byte alone is replaced. The decoder is fed up to the last
+such byte of the input so far, so this does not depend on where the chunks
+end.
+
+twse_ipo.py reads applylisting.csv through iter_lines(), so the conversion
+gets the same fallbacks without an intermediate file.
+"""
+import argparse
+import codecs
+import io
+import re
+import sys
+import threading
+
+# Tried in this order on every undecodable byte sequence
+DEFAULT_ENCODINGS = ["cp950", "big5hkscs"]
+
+CHUNK_SIZE = 64 * 1024
+
+# Offsets listed per encoding in the summary
+REPORT_LIMIT = 20
+
+# The CJK codecs decode at most this many bytes into one character
+MAX_CHAR_BYTES = 2
+
+BIG5_FAMILY = {"big5", "cp950", "big5hkscs"}
+
+# Bytes below 0x40 are a character on their own in every Big5 variant
+SYNC_BYTE = re.compile(rb'[\x00-\x3f]')
+_SYNC_TABLE = bytes(0 if byte < 0x40 else 1 for byte in range(256))
+
+_active = threading.local()
+
+
+def encoding_chain(encoding):
+    """The fallback chain for a detected encoding: the CP950 chain for any Big5 variant, else just the encoding."""
+    if encoding and codecs.lookup(encoding).name in BIG5_FAMILY:
+        return list(DEFAULT_ENCODINGS)
+    return [encoding or DEFAULT_ENCODINGS[0]]
+
+
+class Transcoder:
+    """
+    Decodes a byte stream chunk by chunk with the first encoding, falling back
+    to the others byte sequence by byte sequence.
+
+    Args:
+        encodings (list): The encodings to try, in order
+        errors (str): 'replace' (U+FFFD) or 'strict' (raise) when every encoding fails
+    """
+
+    def __init__(self, encodings=None, errors="replace"):
+        self.encodings = list(encodings or DEFAULT_ENCODINGS)
+        for encoding in self.encodings:
+            codecs.lookup(encoding)
+        if errors not in ("replace", "strict"):
+            raise ValueError(f"errors must be 'replace' or 'strict', not '{errors}'")
+        self.errors = errors
+        self.decoder = codecs.getincrementaldecoder(self.encodings[0])("ipo-fallback")
+        self.offset = 0  # bytes passed to the decoder so far
+        self.held = b""  # bytes after the last byte below 0x40, fed with the next chunk
+        self.base = 0  # input offset of the object the decoder reports errors in
+        # encoding (or 'replace') -> input offsets of the sequences it decoded
+        self.fallbacks = {}
+
+    def decode(self, data, final=False):
+        """Decodes the next chunk; bytes after its last byte below 0x40 are kept for the next call."""
+        data = self.held + data
+        self.held = b""
+        if not final:
+            cut = data.translate(_SYNC_TABLE).rfind(b"\0") + 1
+            # More than CHUNK_SIZE bytes without one (not in a CSV) are decoded as they are
+            if cut or len(data) <= CHUNK_SIZE:
+                data, self.held = data[:cut], data[cut:]
+        pending = self.decoder.getstate()[0]
+        # The decoder reports error positions in its pending bytes followed by data
+        self.base = self.offset - len(pending)
+        self.offset += len(data)
+        _active.transcoder = self
+        try:
+            return self.decoder.decode(data, final)
+        finally:
+            _active.transcoder = None
+
+    def handle(self, exc):
+        """Error handler: decodes the sequence with the next encoding that can, else replaces or raises."""
+        offset = self.base + exc.start
+        for encoding in self.encodings[1:]:
+            for width in range(MAX_CHAR_BYTES, 0, -1):
+                sequence = exc.object[exc.start:exc.start + width]
+                if len(sequence) < width:
+                    continue
+                try:
+                    text = sequence.decode(encoding)
+                except UnicodeDecodeError:
+                    continue
+                if (width > 1 and not self.resumes(exc.object, exc.start + width)
+                        and self.resumes(exc.object, exc.start + 1)):
+                    # A stray byte and the lead byte of the valid character after it
+                    continue
+                self.fallbacks.setdefault(encoding, []).append(offset)
+                return text, exc.start + width
+        if self.errors == "strict":
+            raise UnicodeDecodeError(exc.encoding, exc.object, exc.start, exc.end,
+                                     f"{exc.reason} at byte offset {offset} (tried {', '.join(self.encodings)})")
+        self.fallbacks.setdefault("replace", []).append(offset)
+        return "\ufffd", exc.end
+
+    def resumes(self, data, start):
+        """Whether one of the encodings decodes data from start up to its next byte below 0x40."""
+        match = SYNC_BYTE.search(data, start)
+        sequence = data[start:match.start() if match else len(data)]
+        for encoding in self.encodings:
+            try:
+                sequence.decode(encoding)
+                return True
+            except UnicodeDecodeError:
+                pass
+        return False
+
+    def summary(self):
+        """One line per fallback used, with the byte offsets; empty if the first encoding decoded everything."""
+        lines = []
+        for encoding, offsets in self.fallbacks.items():
+            what = "replaced with U+FFFD" if encoding == "replace" else f"decoded as {encoding}"
+            shown = ", ".join(str(offset) for offset in offsets[:REPORT_LIMIT])
+            more = f" and {len(offsets) - REPORT_LIMIT} more" if len(offsets) > REPORT_LIMIT else ""
+            lines.append(f"{len(offsets)} byte sequences {what} at offsets {shown}{more}")
+        return lines
+
+    def report(self, name, file=None):
+        """Prints the summary lines, prefixed with the name of the input."""
+        for line in self.summary():
+            print(f"{name}: {line}", file=file)
+
+
+def _fallback_handler(exc):
+    transcoder = getattr(_active, "transcoder", None)
+    if transcoder is None or not isinstance(exc, UnicodeDecodeError):
+        raise exc
+    return transcoder.handle(exc)
+
+
+codecs.register_error("ipo-fallback", _fallback_handler)
+
+
+def iter_decoded(stream, transcoder, chunk_size=CHUNK_SIZE):
+    """Yields the text of a binary stream chunk by chunk."""
+    while True:
+        data = stream.read(chunk_size)
+        text = transcoder.decode(data, final=not data)
+        if text:
+            yield text
+        if not data:
+            return
+
+
+def iter_text(stream, transcoder, chunk_size=CHUNK_SIZE):
+    """
+    Yields the text of a binary stream chunk by chunk with \r\n and \r
+    translated to \n, like a file opened in text mode.
+    """
+    newlines = io.IncrementalNewlineDecoder(None, translate=True)
+    for text in iter_decoded(stream, transcoder, chunk_size):
+        text = newlines.decode(text)
+        if text:
+            yield text
+    # A \r at the very end is held back until the decoder is finalized
+    text = newlines.decode("", final=True)
+    if text:
+        yield text
+
+
+def iter_lines(stream, transcoder, chunk_size=CHUNK_SIZE):
+    """
+    Yields the decoded lines of a binary stream ending in \n, as csv.reader
+    reads them from a file opened in text mode.
+    """
+    tail = ""
+    for text in iter_text(stream, transcoder, chunk_size):
+        lines = (tail + text).split("\n")
+        # The last line continues in the next chunk
+        tail = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if tail:
+        yield tail
+
+
+def transcode(source, target, transcoder, chunk_size=CHUNK_SIZE):
+    """
+    Copies a binary stream to another as UTF-8.
+
+    Returns:
+        int: Bytes written
+    """
+    written = 0
+    for text in iter_decoded(source, transcoder, chunk_size):
+        data = text.encode('utf-8')
+        target.write(data)
+        written += len(data)
+    return written
+
+
+def transcode_file(input_file, output_file, encodings=None, errors="replace", chunk_size=CHUNK_SIZE):
+    """
+    Transcodes a file to UTF-8 and prints the fallbacks that were needed.
+
+    Returns:
+        Transcoder: The transcoder, with the offsets of every fallback
+    """
+    transcoder = Transcoder(encodings, errors)
+    with open(input_file, 'rb') as source, open(output_file, 'wb') as target:
+        transcode(source, target, transcoder, chunk_size)
+    transcoder.report(input_file)
+    return transcoder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Transcode a Big5/CP950 file (or stdin) to UTF-8 in constant memory.')
+    parser.add_argument('input', nargs='?', default='-', help='Input file (default: stdin)')
+    parser.add_argument('-o', '--output', default='-', help='Output file (default: stdout)')
+    parser.add_argument('--from', dest='encodings', default=",".join(DEFAULT_ENCODINGS),
+                        help='Comma separated encodings to try, in order (default: %(default)s)')
+    parser.add_argument('--errors', choices=['replace', 'strict'], default='replace',
+                        help='What to do with bytes no encoding can decode (default: replace)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Bytes read at a time')
+    args = parser.parse_args(argv)
+
+    try:
+        transcoder = Transcoder(args.encodings.split(","), args.errors)
+        source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+        target = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+        with source, target:
+            transcode(source, target, transcoder, args.chunk_size)
+    except (OSError, LookupError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    # stdout may be the transcoded text, so the report goes to stderr
+    transcoder.report(args.input, sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
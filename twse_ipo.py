@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+TWSE applylisting.csv (Big5/CP950, ROC dates) -> TWSE-IPO-utf8.csv:
+
+    python ipo.py convert-twse [applylisting.csv] [TWSE-IPO-utf8.csv]
+
+TWSE-IPO.py is a thin wrapper around main().
+"""
+import argparse
+import codecs
+import csv
+
+import instrument
+import transcode
+from ipo_record import IPORecord
+
+# Converts ROC date to Gregorian date in YYYY/MM/DD format (memoized)
+from date_normalizer import roc_to_gregorian as convert_date
+
+# Helper functions
+def clean_numeric_field(num_str):
+    """Cleans numeric fields by removing commas and quotes."""
+    if not num_str or num_str.strip() == "":
+        return ""
+    return num_str.strip().replace('"', '').replace(',', '')
+
+# Only this many leading bytes are used to detect the encoding
+SNIFF_BYTES = 64 * 1024
+
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+def sniff_encoding(prefix):
+    """
+    Detects the encoding from the first bytes of a file.
+
+    A BOM wins; a prefix whose null bytes all fall on odd (even) offsets is
+    UTF-16-LE (-BE) without a BOM. Otherwise the prefix is strictly decoded as
+    UTF-8, as CP950 (Big5 with the Microsoft extensions the TWSE export uses)
+    and as Big5-HKSCS, and only if all fail chardet is run on the prefix.
+    """
+    for bom, encoding in BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    if b'\0' in prefix:
+        # Every ASCII character (digits, commas, quotes) of UTF-16 text has a null byte
+        even, odd = prefix[0::2].count(0), prefix[1::2].count(0)
+        if not even and odd * 8 >= len(prefix):
+            return 'utf-16-le'
+        if not odd and even * 8 >= len(prefix):
+            return 'utf-16-be'
+    for encoding in ('utf-8', 'cp950', 'big5hkscs'):
+        try:
+            # final=False: the prefix may end in the middle of a multi-byte character
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    # chardet is slow to import and almost never needed
+    import chardet
+
+    return chardet.detect(prefix)['encoding']
+
+# Detect encoding of the input file
+def detect_encoding(file_path):
+    """Detects the encoding of a file from its first SNIFF_BYTES bytes."""
+    with open(file_path, 'rb') as f:
+        return sniff_encoding(f.read(SNIFF_BYTES))
+
+HEADER = [
+    "申請日期", "股票代號", "公司名稱", "董事長", "申請時股本",
+    "上櫃審議委員會審議日期", "櫃買董事會通過上櫃日期", "櫃買同意上櫃契約日期或證期局核准上櫃契約日期",
+    "股票上櫃買賣日期", "主辦承銷商", "承銷價", "備註"
+]
+
+def convert_rows(reader):
+    """Yields the cleaned TWSE rows (as IPORecords) for the raw applylisting.csv rows in reader."""
+    for line_number, row in enumerate(reader):
+        # Skip metadata, empty rows, or rows with invalid length
+        if line_number == 0 or len(row) < 13:
+            continue  # Skip header and invalid rows
+
+        # Skip rows where the date fields contain headers or non-date strings
+        if row[3].startswith("申請日期"):
+            print(f"Skipping header row: {row}")
+            continue
+
+        try:
+            # Process and clean each field
+            cleaned_row = [
+                convert_date(row[3]),  # 申請日期
+                row[1].strip(),  # 股票代號
+                row[2].strip(),  # 公司名稱
+                row[4].strip(),  # 董事長
+                clean_numeric_field(row[5]),  # 申請時股本
+                convert_date(row[6]),  # 上市審議日期
+                convert_date(row[7]),  # 交易所董事會通過日期
+                convert_date(row[8]),  # 契約核准日期
+                convert_date(row[9]),  # 股票上市日期
+                row[10].strip().replace('"', ''),  # 主辦承銷商
+                clean_numeric_field(row[11]),  # 承銷價
+                row[12].strip() if len(row) > 12 else ""  # 備註
+            ]
+            yield IPORecord.from_row(cleaned_row)
+        except Exception as e:
+            print(f"Error processing line {line_number + 1}: {e}")
+
+# Main processing function
+def process_file(input_file, output_file, write_header=True):
+    with instrument.stage("detect_encoding"):
+        encoding = detect_encoding(input_file) or 'big5'
+    print(f"Detected file encoding: {encoding}")
+
+    # Big5 is decoded as CP950, then Big5-HKSCS, and only then replaced with U+FFFD
+    transcoder = transcode.Transcoder(transcode.encoding_chain(encoding))
+    with instrument.stage("convert"), open(input_file, 'rb') as infile, open(output_file, mode='w', encoding='utf-8', newline='') as outfile:
+        reader = csv.reader(transcode.iter_lines(infile, transcoder))
+        writer = csv.writer(outfile)
+
+        # Write header if enabled
+        if write_header:
+            writer.writerow(HEADER)
+
+        # Rows are converted and written one at a time, so memory stays flat
+        rows = convert_rows(instrument.counted(reader, "rows_in"))
+        writer.writerows(instrument.counted(rows, "rows_out"))
+    transcoder.report(input_file)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert the TWSE applylisting.csv to UTF-8 with Gregorian dates.')
+    parser.add_argument('input_file', nargs='?', default="applylisting.csv")
+    parser.add_argument('output_file', nargs='?', default="TWSE-IPO-utf8.csv")
+    parser.add_argument('--no-header', action='store_true', help='Do not write the header row')
+    args = parser.parse_args(argv)
+    process_file(args.input_file, args.output_file, write_header=not args.no_header)
+
+if __name__ == "__main__":
+    main()